@@ -0,0 +1 @@
+from assessment_result import *
@@ -0,0 +1,2 @@
+from batch_export import *
+
@@ -0,0 +1 @@
+from compact_schema import *
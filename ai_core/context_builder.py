@@ -0,0 +1 @@
+from context_builder import *
@@ -0,0 +1 @@
+from hedged_calls import *
@@ -0,0 +1 @@
+from json_repair import *
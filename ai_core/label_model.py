@@ -0,0 +1 @@
+from label_model import *
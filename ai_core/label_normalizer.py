@@ -0,0 +1,2 @@
+from label_normalizer import *
+
@@ -0,0 +1 @@
+from llm_cassette import *
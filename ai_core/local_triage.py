@@ -0,0 +1 @@
+from local_triage import *
@@ -0,0 +1 @@
+from model_router import *
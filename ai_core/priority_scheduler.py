@@ -0,0 +1 @@
+from priority_scheduler import *
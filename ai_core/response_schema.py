@@ -0,0 +1 @@
+from response_schema import *
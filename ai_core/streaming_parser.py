@@ -0,0 +1,2 @@
+from streaming_parser import *
+
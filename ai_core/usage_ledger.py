@@ -0,0 +1 @@
+from usage_ledger import *
@@ -0,0 +1 @@
+from workload_generator import *
@@ -0,0 +1,209 @@
+import os
+import time
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+from rate_limiter import RateLimiter
+from model_router import _key_fingerprint
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def current_api_key() -> Optional[str]:
+    """Key the pool assigned to this thread's current model call (None without a pool)"""
+    return getattr(_local, "key", None)
+
+
+def configured_api_keys() -> List[str]:
+    """GOOGLE_API_KEYS (comma-separated) plus GOOGLE_API_KEY, without duplicates"""
+    keys = [k.strip() for k in os.getenv("GOOGLE_API_KEYS", "").split(",")]
+    keys.append((os.getenv("GOOGLE_API_KEY") or "").strip())
+    return list(dict.fromkeys(k for k in keys if k))
+
+
+def is_rate_limit_error(error_str: str) -> bool:
+    return "429" in error_str or "RESOURCE_EXHAUSTED" in error_str
+
+
+def is_auth_error(error_str: str) -> bool:
+    lowered = error_str.lower()
+    return ("401" in error_str or "403" in error_str or "API_KEY_INVALID" in error_str
+            or "PERMISSION_DENIED" in error_str or "api key not valid" in lowered or "api key expired" in lowered)
+
+
+class _PooledKey:
+    """One API key: its own limiter (its own quota) and health"""
+
+    def __init__(self, key: str, limiter: RateLimiter):
+        self.key = key
+        self.fingerprint = _key_fingerprint(key)
+        self.limiter = limiter
+        self.consecutive_failures = 0
+        self.disabled_until = 0.0
+        self.disabled_reason = ""
+        self.calls = 0
+        self.rate_limited = 0
+        self.auth_errors = 0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.disabled_until
+
+
+class ApiKeyPool:
+    """Spread model calls across several Gemini API keys.
+
+    Drop-in for the global RateLimiter (``wait_if_needed``, ``try_acquire``,
+    ``get_status``): each call goes to the healthy key that can be used
+    soonest, least-loaded first, and the chosen key is remembered for the
+    calling thread so the model router builds the client with it. A key that
+    keeps returning 429s is rested for ``cooldown`` seconds; an invalid or
+    revoked key is taken out for ``auth_cooldown``. Quotas add up, so batch
+    throughput scales with the number of keys.
+    """
+
+    def __init__(self, keys: List[str], max_requests_per_minute: int = 15, max_requests_per_day: int = 1000,
+                 delay_between_calls: float = 2.0, failure_threshold: int = 3, cooldown: float = 300,
+                 auth_cooldown: float = 3600):
+        if not keys:
+            raise ValueError("ApiKeyPool needs at least one API key")
+        self.keys = [
+            _PooledKey(k, RateLimiter(max_requests_per_minute, max_requests_per_day, delay_between_calls))
+            for k in dict.fromkeys(keys)
+        ]
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.auth_cooldown = auth_cooldown
+        self.lock = threading.Lock()
+
+    def _pick(self, exclude: Optional[str] = None) -> _PooledKey:
+        now = time.time()
+        with self.lock:
+            candidates = [k for k in self.keys if k.healthy(now) and k.key != exclude]
+            if not candidates:
+                # Everything is resting: use the key that comes back first rather than failing outright
+                others = [k for k in self.keys if k.key != exclude] or self.keys
+                candidates = [min(others, key=lambda k: k.disabled_until)]
+            return min(candidates, key=lambda k: (k.consecutive_failures > 0, k.limiter.time_until_ready(),
+                                                  len(k.limiter.minute_requests) / max(1, k.limiter.max_requests_per_minute)))
+
+    def _entry(self, key: Optional[str]) -> Optional[_PooledKey]:
+        for entry in self.keys:
+            if entry.key == key:
+                return entry
+        return None
+
+    def wait_if_needed(self, exclude: Optional[str] = None):
+        """Choose a key for this thread's next call and wait for that key's limiter"""
+        entry = self._pick(exclude)
+        _local.key = entry.key
+        entry.limiter.wait_if_needed()
+        with self.lock:
+            entry.calls += 1
+
+    def try_acquire(self) -> bool:
+        """Record a call on this thread's key (or any ready key) only if it fits right now"""
+        entry = self._entry(current_api_key()) or self._pick()
+        if entry.limiter.try_acquire():
+            with self.lock:
+                entry.calls += 1
+            return True
+        return False
+
+    def record_success(self):
+        entry = self._entry(current_api_key())
+        if entry is not None:
+            with self.lock:
+                entry.consecutive_failures = 0
+
+    def record_error(self, error_str: str) -> bool:
+        """Count a failed call against this thread's key; True if the error was about the key"""
+        entry = self._entry(current_api_key())
+        if entry is None:
+            return False
+        auth = is_auth_error(error_str)
+        if not auth and not is_rate_limit_error(error_str):
+            return False
+        with self.lock:
+            was_healthy = entry.healthy(time.time())
+            entry.consecutive_failures += 1
+            if auth:
+                entry.auth_errors += 1
+                entry.disabled_until = time.time() + self.auth_cooldown
+                entry.disabled_reason = "auth"
+            else:
+                entry.rate_limited += 1
+                if entry.consecutive_failures >= self.failure_threshold:
+                    entry.disabled_until = time.time() + self.cooldown
+                    entry.disabled_reason = "429"
+            disabled = was_healthy and not entry.healthy(time.time())
+        if disabled:
+            logger.warning(f"API key {entry.fingerprint[:8]} taken out of the pool ({entry.disabled_reason}) "
+                           f"for {entry.disabled_until - time.time():.0f}s")
+        return True
+
+    def switch_key(self) -> bool:
+        """Move this thread to another healthy key; False if there is none to move to"""
+        current = current_api_key()
+        now = time.time()
+        with self.lock:
+            others = any(k.healthy(now) and k.key != current for k in self.keys)
+        if not others:
+            return False
+        self.wait_if_needed(exclude=current)
+        return True
+
+    def get_status(self) -> Dict[str, Any]:
+        """Limiter status summed over the healthy keys, plus per-key health"""
+        now = time.time()
+        keys, total = [], {"minute_requests": 0, "daily_requests": 0, "max_per_minute": 0, "max_per_day": 0,
+                           "queued_calls": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        time_since_last = None
+        with self.lock:
+            entries = [(k, k.healthy(now)) for k in self.keys]
+        for entry, healthy in entries:
+            status = entry.limiter.get_status()
+            for name in ("minute_requests", "daily_requests", "queued_calls", "total_wait_seconds"):
+                total[name] += status[name]
+            total["max_wait_seconds"] = max(total["max_wait_seconds"], status["max_wait_seconds"])
+            if healthy:
+                total["max_per_minute"] += status["max_per_minute"]
+                total["max_per_day"] += status["max_per_day"]
+            time_since_last = min(time_since_last, status["time_since_last"]) if time_since_last is not None else status["time_since_last"]
+            keys.append({
+                "key": entry.fingerprint[:8],
+                "healthy": healthy,
+                "disabled_for": max(0.0, entry.disabled_until - now),
+                "disabled_reason": entry.disabled_reason if not healthy else "",
+                "calls": entry.calls,
+                "rate_limited": entry.rate_limited,
+                "auth_errors": entry.auth_errors,
+                "minute_requests": status["minute_requests"],
+                "daily_requests": status["daily_requests"],
+            })
+        total["time_since_last"] = time_since_last
+        total["keys"] = keys
+        return total
+
+
+def get_key_pool() -> Optional[ApiKeyPool]:
+    """The global key pool, or None when a single key is configured"""
+    from rate_limiter import get_rate_limiter
+    limiter = get_rate_limiter()
+    return limiter if isinstance(limiter, ApiKeyPool) else None
+
+
+def record_key_success():
+    pool = get_key_pool()
+    if pool is not None:
+        pool.record_success()
+
+
+def record_key_error(error_str: str) -> bool:
+    """Report a failed call; True if another key was taken for this thread's retry"""
+    pool = get_key_pool()
+    if pool is None or not pool.record_error(error_str):
+        return False
+    return pool.switch_key()
@@ -0,0 +1,327 @@
+import os
+import glob
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from label_normalizer import HIGH, LEVEL_NAMES, LOW, MIDDLE, PERSONALITY_QUALITIES, get_label_normalizer
+
+# Level codes used in the columnar store (0 means no label for that quality)
+LEVEL_CODES = {"low": LOW, "middle": MIDDLE, "high": HIGH}
+
+_QUALITY_INDEX = {q.lower().replace(' ', '-'): i for i, q in enumerate(PERSONALITY_QUALITIES)}
+
+
+def labels_to_level_codes(labels: List[str]) -> np.ndarray:
+    """Convert 'quality-level' labels into a row of level codes, one per quality"""
+    row = np.zeros(len(PERSONALITY_QUALITIES), dtype=np.int8)
+    for label in labels or []:
+        quality, _, level = str(label).rpartition('-')
+        q_idx = _QUALITY_INDEX.get(quality)
+        code = LEVEL_CODES.get(level)
+        if q_idx is not None and code is not None:
+            row[q_idx] = code
+    return row
+
+
+def _parse_label_cell(value: Any) -> List[str]:
+    """Parse a JSON-encoded label list cell from a reviewed CSV"""
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return []
+    try:
+        parsed = json.loads(value)
+    except json.JSONDecodeError:
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+class _BatchColumns:
+    """Columnar view of a single batch file (and its reviewed CSV, if any)"""
+
+    __slots__ = ("stem", "names", "predicted", "final", "reviewed", "errors", "signature")
+
+    def __init__(self, stem: str, names: List[str], predicted: np.ndarray, final: np.ndarray,
+                 reviewed: np.ndarray, errors: np.ndarray, signature: Tuple):
+        self.stem = stem
+        self.names = names
+        self.predicted = predicted
+        self.final = final
+        self.reviewed = reviewed
+        self.errors = errors
+        self.signature = signature
+
+
+class AssessmentHistory:
+    """Columnar, incrementally refreshed store of historical batch assessments.
+
+    Every ``batch_assessment_*.json``/``.csv`` pair in the assessments directory
+    is ingested once into NumPy arrays of level codes (students x qualities).
+    ``refresh()`` only re-reads files that are new or have changed since the
+    previous call, so it is cheap to call on every Streamlit rerun.
+    """
+
+    def __init__(self, assessments_dir: Optional[str] = None):
+        if assessments_dir is None:
+            try:
+                from config import ASSESSMENTS_DIR
+                assessments_dir = ASSESSMENTS_DIR
+            except ImportError:
+                assessments_dir = "assessments"
+        self.assessments_dir = assessments_dir
+        self.qualities = list(PERSONALITY_QUALITIES)
+        self._batches: Dict[str, _BatchColumns] = {}
+        self._skipped: Dict[str, Tuple] = {}
+        self._columns = None
+
+    def _discover(self) -> Dict[str, Dict[str, str]]:
+        """Map batch stems to their JSON/CSV files"""
+        found: Dict[str, Dict[str, str]] = {}
+        for ext in ("json", "csv"):
+            pattern = os.path.join(self.assessments_dir, f"batch_assessment_*.{ext}")
+            for path in glob.glob(pattern):
+                stem = os.path.splitext(os.path.basename(path))[0]
+                found.setdefault(stem, {})[ext] = path
+        return found
+
+    @staticmethod
+    def _signature(paths: Dict[str, str]) -> Tuple:
+        sig = []
+        for ext in ("json", "csv"):
+            path = paths.get(ext)
+            if path:
+                st = os.stat(path)
+                sig.append((ext, st.st_mtime_ns, st.st_size))
+        return tuple(sig)
+
+    def _ingest(self, stem: str, paths: Dict[str, str], signature: Tuple) -> Optional[_BatchColumns]:
+        """Read one batch into columnar arrays"""
+        n_qualities = len(self.qualities)
+        errors = None
+        names: List[str] = []
+        predicted_rows: List[np.ndarray] = []
+        final_rows: List[np.ndarray] = []
+
+        records = None
+        if "json" in paths:
+            try:
+                with open(paths["json"], 'r', encoding='utf-8') as f:
+                    records = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Skipping unreadable batch file {paths['json']}: {e}")
+                records = None
+            if not isinstance(records, list):
+                records = None
+
+        if "csv" in paths:
+            try:
+                df = pd.read_csv(paths["csv"])
+            except Exception as e:
+                print(f"Skipping unreadable review file {paths['csv']}: {e}")
+                df = None
+            if df is not None:
+                for _, row in df.iterrows():
+                    names.append(str(row.get('Name', '')).strip())
+                    predicted_rows.append(labels_to_level_codes(_parse_label_cell(row.get('Predicted Labels'))))
+                    final_rows.append(labels_to_level_codes(_parse_label_cell(row.get('Final Labels'))))
+                reviewed = np.ones(len(names), dtype=bool)
+                if records is not None and len(records) == len(names):
+                    errors = np.array([bool(r.get('error')) for r in records], dtype=bool)
+
+        if not names and records is not None:
+            names = [str(r.get('name', '')).strip() for r in records]
+            predicted_rows = [get_label_normalizer().level_matrix(records)]
+            final_rows = [np.zeros((len(names), n_qualities), dtype=np.int8)]
+            reviewed = np.zeros(len(names), dtype=bool)
+            errors = np.array([bool(r.get('error')) for r in records], dtype=bool)
+
+        if not names:
+            return None
+
+        if errors is None:
+            errors = np.zeros(len(names), dtype=bool)
+        return _BatchColumns(
+            stem=stem,
+            names=names,
+            predicted=np.vstack(predicted_rows),
+            final=np.vstack(final_rows),
+            reviewed=reviewed,
+            errors=errors,
+            signature=signature,
+        )
+
+    def refresh(self) -> int:
+        """Ingest new or changed batch files; returns the number of batches (re)loaded"""
+        if not os.path.isdir(self.assessments_dir):
+            if self._batches:
+                self._batches = {}
+                self._columns = None
+            return 0
+
+        discovered = self._discover()
+        changed = 0
+        for stem in list(self._batches):
+            if stem not in discovered:
+                del self._batches[stem]
+                changed += 1
+        loaded = 0
+        for stem, paths in discovered.items():
+            signature = self._signature(paths)
+            current = self._batches.get(stem)
+            if current is not None and current.signature == signature:
+                continue
+            if self._skipped.get(stem) == signature:
+                continue
+            batch = self._ingest(stem, paths, signature)
+            if batch is None:
+                # Remember empty/unreadable files so they are not re-read every refresh
+                self._skipped[stem] = signature
+                if self._batches.pop(stem, None) is None:
+                    continue
+            else:
+                self._skipped.pop(stem, None)
+                self._batches[stem] = batch
+                loaded += 1
+            changed += 1
+        if changed:
+            self._columns = None
+        return loaded
+
+    def columns(self) -> Dict[str, Any]:
+        """Concatenated columns across all batches (cached until the next change)"""
+        if self._columns is None:
+            stems = sorted(self._batches)
+            batches = [self._batches[s] for s in stems]
+            n_qualities = len(self.qualities)
+            if batches:
+                cohort = np.concatenate([np.full(len(b.names), i, dtype=np.int32) for i, b in enumerate(batches)])
+                predicted = np.vstack([b.predicted for b in batches])
+                final = np.vstack([b.final for b in batches])
+                reviewed = np.concatenate([b.reviewed for b in batches])
+                errors = np.concatenate([b.errors for b in batches])
+                names = [n for b in batches for n in b.names]
+            else:
+                cohort = np.zeros(0, dtype=np.int32)
+                predicted = np.zeros((0, n_qualities), dtype=np.int8)
+                final = np.zeros((0, n_qualities), dtype=np.int8)
+                reviewed = np.zeros(0, dtype=bool)
+                errors = np.zeros(0, dtype=bool)
+                names = []
+            self._columns = {
+                "cohorts": stems,
+                "cohort": cohort,
+                "predicted": predicted,
+                "final": final,
+                "reviewed": reviewed,
+                "errors": errors,
+                "names": names,
+            }
+        return self._columns
+
+    def _codes(self, source: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (level codes, row mask) for 'predicted' or 'final' labels"""
+        cols = self.columns()
+        if source == "predicted":
+            return cols["predicted"], np.ones(len(cols["names"]), dtype=bool)
+        if source == "final":
+            return cols["final"], cols["reviewed"]
+        raise ValueError(f"Unknown label source: {source}")
+
+    def _cohort_keys(self, cohort_by: str) -> Tuple[List[str], np.ndarray]:
+        cols = self.columns()
+        if cohort_by == "batch":
+            return [s.replace("batch_assessment_", "") for s in cols["cohorts"]], cols["cohort"]
+        if cohort_by == "date":
+            dates = [s.replace("batch_assessment_", "")[:8] for s in cols["cohorts"]]
+            unique_dates = sorted(set(dates))
+            remap = np.array([unique_dates.index(d) for d in dates], dtype=np.int32)
+            return unique_dates, remap[cols["cohort"]] if len(cols["cohort"]) else cols["cohort"]
+        raise ValueError(f"Unknown cohort grouping: {cohort_by}")
+
+    def summary(self) -> Dict[str, int]:
+        """Headline counts for the ingested history"""
+        cols = self.columns()
+        return {
+            "batches": len(cols["cohorts"]),
+            "students": len(cols["names"]),
+            "reviewed_students": int(cols["reviewed"].sum()),
+            "failed_students": int(cols["errors"].sum()),
+            "predicted_labels": int(np.count_nonzero(cols["predicted"])),
+        }
+
+    def label_distribution(self, source: str = "predicted") -> pd.DataFrame:
+        """Count of students per quality x level"""
+        codes, mask = self._codes(source)
+        codes = codes[mask]
+        n_qualities = len(self.qualities)
+        n_levels = len(LEVEL_NAMES)
+        flat = (np.arange(n_qualities, dtype=np.int64)[None, :] * n_levels + codes).ravel()
+        counts = np.bincount(flat, minlength=n_qualities * n_levels).reshape(n_qualities, n_levels)
+        return pd.DataFrame(counts[:, 1:], index=self.qualities, columns=LEVEL_NAMES[1:])
+
+    def level_distribution(self, source: str = "predicted") -> pd.Series:
+        """Total number of labels per level across all qualities"""
+        codes, mask = self._codes(source)
+        counts = np.bincount(codes[mask].ravel(), minlength=len(LEVEL_NAMES))
+        return pd.Series(counts[1:], index=LEVEL_NAMES[1:])
+
+    def cohort_distribution(self, source: str = "predicted", cohort_by: str = "batch",
+                            level: Optional[str] = None) -> pd.DataFrame:
+        """Labelled students per cohort x quality, optionally restricted to one level"""
+        codes, mask = self._codes(source)
+        keys, cohort = self._cohort_keys(cohort_by)
+        n_qualities = len(self.qualities)
+        if level is None:
+            hits = codes > 0
+        else:
+            hits = codes == LEVEL_CODES[level.strip().lower()]
+        hits &= mask[:, None]
+        rows, q_idx = np.nonzero(hits)
+        flat = cohort[rows].astype(np.int64) * n_qualities + q_idx
+        counts = np.bincount(flat, minlength=len(keys) * n_qualities).reshape(len(keys), n_qualities)
+        students = np.bincount(cohort[mask], minlength=len(keys))
+        df = pd.DataFrame(counts, index=keys, columns=self.qualities)
+        df.insert(0, "Students", students)
+        return df
+
+    def agreement(self) -> pd.DataFrame:
+        """Predicted-vs-final agreement per quality over reviewed students"""
+        cols = self.columns()
+        mask = cols["reviewed"]
+        predicted = cols["predicted"][mask]
+        final = cols["final"][mask]
+        labelled = (predicted > 0) | (final > 0)
+        agree = (predicted == final) & labelled
+        added = (predicted == 0) & (final > 0)
+        removed = (predicted > 0) & (final == 0)
+        changed = (predicted > 0) & (final > 0) & (predicted != final)
+        n_labelled = labelled.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = np.where(n_labelled > 0, agree.sum(axis=0) / n_labelled, np.nan)
+        return pd.DataFrame({
+            "Labelled": n_labelled,
+            "Agreed": agree.sum(axis=0),
+            "Added by reviewer": added.sum(axis=0),
+            "Removed by reviewer": removed.sum(axis=0),
+            "Level changed": changed.sum(axis=0),
+            "Agreement rate": rate,
+        }, index=self.qualities)
+
+    def overall_agreement(self) -> Dict[str, float]:
+        """Student-level and label-level agreement across all reviewed students"""
+        cols = self.columns()
+        mask = cols["reviewed"]
+        predicted = cols["predicted"][mask]
+        final = cols["final"][mask]
+        if not len(predicted):
+            return {"reviewed_students": 0, "exact_match_rate": float('nan'), "label_agreement_rate": float('nan')}
+        labelled = (predicted > 0) | (final > 0)
+        n_labelled = int(labelled.sum())
+        return {
+            "reviewed_students": int(len(predicted)),
+            "exact_match_rate": float(np.all(predicted == final, axis=1).mean()),
+            "label_agreement_rate": float(((predicted == final) & labelled).sum() / n_labelled) if n_labelled else float('nan'),
+        }
@@ -0,0 +1,104 @@
+import json
+import time
+from typing import Any, Dict, List, Optional
+from urllib import error, request
+from urllib.parse import urlencode
+
+
+class AssessmentServiceError(Exception):
+    """Raised when the assessment service is unreachable or returns an error"""
+
+
+class AssessmentServiceClient:
+    """Thin HTTP client for the local assessment service.
+
+    Mirrors the parts of PersonalityAssessmentSystem and JobManager the
+    frontend uses, so the Streamlit app can talk to a shared warm backend
+    instead of loading its own models.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[float] = None):
+        if base_url is None:
+            try:
+                from config import ASSESSMENT_SERVICE_URL
+                base_url = ASSESSMENT_SERVICE_URL
+            except ImportError:
+                base_url = "http://127.0.0.1:8502"
+        try:
+            from config import ASSESSMENT_TIMEOUT, ASSESSMENT_CLIENT_HEADROOM
+        except ImportError:
+            ASSESSMENT_TIMEOUT, ASSESSMENT_CLIENT_HEADROOM = 120, 90
+        # The service's deadline starts after its rate limiter wait, so the client allows extra time
+        self.headroom = ASSESSMENT_CLIENT_HEADROOM
+        if timeout is None:
+            timeout = ASSESSMENT_TIMEOUT + self.headroom
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None,
+                 query: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        url = f"{self.base_url}{path}"
+        if query:
+            url = f"{url}?{urlencode(query)}"
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        req = request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+        try:
+            with request.urlopen(req, timeout=timeout or self.timeout) as resp:
+                return json.loads(resp.read().decode("utf-8"))
+        except error.HTTPError as e:
+            try:
+                detail = json.loads(e.read().decode("utf-8")).get("error", "")
+            except Exception:
+                detail = e.reason
+            raise AssessmentServiceError(f"Service returned {e.code}: {detail}") from e
+        except (error.URLError, OSError) as e:
+            raise AssessmentServiceError(f"Could not reach assessment service at {self.base_url}: {e}") from e
+
+    def health(self) -> Dict[str, Any]:
+        return self._request("GET", "/health", timeout=5)
+
+    def get_status(self) -> Dict[str, Any]:
+        return self._request("GET", "/status", timeout=5)
+
+    def assess_student_personality(self, observations: str) -> Dict[str, Any]:
+        """Assess one student on the service (same return shape as the in-process system)"""
+        return self._request("POST", "/assess", {"observations": observations})
+
+    def submit(self, students: List[Dict[str, Any]], label: Optional[str] = None, owner: Optional[str] = None,
+               wait: Optional[float] = None) -> str:
+        """Submit a batch job and return its ID (``owner`` groups jobs for fair sharing).
+
+        With ``wait`` the service holds the reply for up to that many seconds while the
+        job runs; the request timeout covers that wait plus headroom.
+        """
+        payload = {"students": students, "label": label, "owner": owner}
+        if wait is None:
+            return self._request("POST", "/batch", payload)["job_id"]
+        payload.update(wait=True, timeout=wait)
+        return self._request("POST", "/batch", payload, timeout=wait + self.headroom)["job_id"]
+
+    def snapshot(self, job_id: str, include_results: bool = False, since: int = 0) -> Optional[Dict[str, Any]]:
+        query = {"results": 1, "since": since} if include_results else None
+        try:
+            return self._request("GET", f"/jobs/{job_id}", query=query, timeout=10)
+        except AssessmentServiceError as e:
+            if "404" in str(e):
+                return None
+            raise
+
+    def cancel(self, job_id: str) -> bool:
+        return bool(self._request("POST", f"/jobs/{job_id}/cancel", {}, timeout=10).get("cancelled"))
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return self._request("GET", "/jobs", timeout=10)["jobs"]
+
+    def batch_assess_students(self, students_data: List[Dict[str, str]], poll_interval: float = 2.0) -> List[Dict[str, Any]]:
+        """Run a batch on the service and block until it finishes"""
+        job_id = self.submit(students_data)
+        while True:
+            snapshot = self.snapshot(job_id)
+            if snapshot is None:
+                raise AssessmentServiceError(f"Job {job_id} disappeared from the service")
+            if snapshot["status"] in ("completed", "failed", "cancelled"):
+                return self.snapshot(job_id, include_results=True)["results"]
+            time.sleep(poll_interval)
@@ -0,0 +1,235 @@
+import json
+from enum import IntEnum
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from compact_schema import NOT_OBSERVED_REASONING
+from label_normalizer import (
+    HIGH, LEVEL_NAMES, LOW, MIDDLE, NOT_OBSERVED, LabelNormalizer, get_label_normalizer
+)
+
+# Keys of an assessment dict held as levels/reasons/summary rather than in ``meta``
+_ITEM_KEYS = ("assessments", "summary")
+
+
+class Level(IntEnum):
+    """Assessment level; values are the level IDs used by labels, analytics and exports"""
+    NOT_OBSERVED = NOT_OBSERVED
+    LOW = LOW
+    MIDDLE = MIDDLE
+    HIGH = HIGH
+
+    @property
+    def text(self) -> str:
+        """Level as written in results and prompts ("NOT OBSERVED", "LOW", ...)"""
+        return LEVEL_NAMES[self]
+
+
+class StudentAssessment:
+    """One student's assessment, normalized once: a level code per quality ID.
+
+    ``levels`` holds one ``Level`` code per quality (``PERSONALITY_QUALITIES``
+    order) in a 20-byte ``bytes``; ``reasons`` is the matching reasoning and
+    ``confidences`` the per-item confidence of local-tier results (None when
+    no item had one). Keys other than assessments/summary (source,
+    confidence, fallback_reason...) ride along in ``meta``. ``to_dict`` gives
+    the legacy result dict.
+    """
+
+    __slots__ = ("levels", "reasons", "summary", "meta", "confidences")
+
+    def __init__(self, levels: bytes, reasons: Tuple[str, ...], summary: str = "",
+                 meta: Optional[Dict[str, Any]] = None,
+                 confidences: Optional[Tuple[Optional[float], ...]] = None):
+        self.levels = levels
+        self.reasons = reasons
+        self.summary = summary
+        self.meta = meta or {}
+        self.confidences = confidences
+
+    @classmethod
+    def from_dict(cls, result: Dict[str, Any], normalizer: Optional[LabelNormalizer] = None) -> "StudentAssessment":
+        """Normalize a result dict; unknown qualities are dropped and later observed items win"""
+        normalizer = normalizer or get_label_normalizer()
+        n = len(normalizer.qualities)
+        levels, reasons, confidences = bytearray(n), [""] * n, [None] * n
+        for q_id, l_id, item in normalizer.recognised_items(result):
+            # Same precedence as LabelNormalizer.level_matrix: NOT OBSERVED never hides a rating
+            if l_id != NOT_OBSERVED or levels[q_id] == NOT_OBSERVED:
+                levels[q_id] = l_id
+                reasons[q_id] = str(item.get("reasoning", "") or "")
+                confidence = item.get("confidence")
+                confidences[q_id] = float(confidence) if isinstance(confidence, (int, float)) and not isinstance(confidence, bool) else None
+        meta = {k: v for k, v in result.items() if k not in _ITEM_KEYS}
+        return cls(bytes(levels), tuple(reasons), str(result.get("summary", "") or ""), meta,
+                   tuple(confidences) if any(c is not None for c in confidences) else None)
+
+    def level(self, quality_id: int) -> Level:
+        return Level(self.levels[quality_id])
+
+    def observed(self) -> List[Tuple[int, Level]]:
+        """(quality ID, level) for every quality rated LOW/MIDDLE/HIGH"""
+        return [(q_id, Level(code)) for q_id, code in enumerate(self.levels) if code != NOT_OBSERVED]
+
+    def labels(self, normalizer: Optional[LabelNormalizer] = None) -> List[str]:
+        """'quality-level' labels for observed qualities, in quality order"""
+        normalizer = normalizer or get_label_normalizer()
+        return [normalizer.label(q_id, level) for q_id, level in self.observed()]
+
+    def to_dict(self, normalizer: Optional[LabelNormalizer] = None) -> "AssessmentDict":
+        """Legacy result dict: every quality once, canonical names and level strings"""
+        qualities = (normalizer or get_label_normalizer()).qualities
+        assessments = []
+        for q_id, (quality, code) in enumerate(zip(qualities, self.levels)):
+            item = {
+                "quality": quality,
+                "level": LEVEL_NAMES[code],
+                "reasoning": self.reasons[q_id] or (NOT_OBSERVED_REASONING if code == NOT_OBSERVED else ""),
+            }
+            if self.confidences is not None and self.confidences[q_id] is not None:
+                item["confidence"] = self.confidences[q_id]
+            assessments.append(item)
+        return AssessmentDict({"assessments": assessments, "summary": self.summary, **self.meta}, self)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+
+class AssessmentDict(dict):
+    """Legacy result dict that carries the ``StudentAssessment`` it was built from.
+
+    Callers keep using it as a plain dict (JSON, UI, exports); batch code
+    takes ``.student`` instead of normalizing the dict again. Edits to the
+    dict (e.g. in review) are not reflected in ``.student``, so consumers
+    check ``is_current()`` and re-normalize an edited dict.
+    """
+
+    def __init__(self, result: Dict[str, Any], student: StudentAssessment):
+        super().__init__(result)
+        self.student = student
+
+    def is_current(self, normalizer: Optional[LabelNormalizer] = None) -> bool:
+        """True while the dict still holds exactly what ``.student`` would give"""
+        return self == self.student.to_dict(normalizer)
+
+
+def canonical_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a parsed result dict once at parse time (errors pass through unchanged)"""
+    if not isinstance(result, dict) or result.get("error") or not isinstance(result.get("assessments"), list):
+        return result
+    if isinstance(result, AssessmentDict) and result.is_current():
+        return result
+    return StudentAssessment.from_dict(result).to_dict()
+
+
+class BatchAssessments:
+    """Array-backed batch results: an (n_students, n_qualities) int8 level matrix plus side lists.
+
+    Holds the batch result records used across the app (student_id, name,
+    observations, assessment, error) without keeping a dict per quality per
+    student. Assessments without items (errors, fallbacks) are kept as-is;
+    ``record(i)`` rebuilds the legacy record at the edges.
+    """
+
+    def __init__(self, normalizer: Optional[LabelNormalizer] = None, capacity: int = 64):
+        self.normalizer = normalizer or get_label_normalizer()
+        self._levels = np.zeros((max(1, capacity), len(self.normalizer.qualities)), dtype=np.int8)
+        self._size = 0
+        self.student_ids: List[str] = []
+        self.names: List[str] = []
+        self.observations: List[str] = []
+        self.errors: List[Optional[str]] = []
+        self.reasons: List[Optional[Tuple[str, ...]]] = []
+        self.confidences: List[Optional[Tuple[Optional[float], ...]]] = []
+        self.summaries: List[str] = []
+        # Assessment keys beyond the items (source, confidence...), or the whole dict when it has no items
+        self.meta: List[Optional[Dict[str, Any]]] = []
+        self.raw: List[Optional[Dict[str, Any]]] = []
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], normalizer: Optional[LabelNormalizer] = None) -> "BatchAssessments":
+        batch = cls(normalizer, capacity=len(records))
+        for record in records:
+            batch.append(record)
+        return batch
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, record: Dict[str, Any]):
+        """Add one batch result record.
+
+        The assessment may be a ``StudentAssessment``, a canonical
+        ``AssessmentDict`` (its student is taken as-is unless the dict was
+        edited since) or a raw result dict (normalized here, once).
+        """
+        if self._size == len(self._levels):
+            grown = np.zeros((2 * len(self._levels), self._levels.shape[1]), dtype=np.int8)
+            grown[:self._size] = self._levels
+            self._levels = grown
+        assessment = record.get("assessment")
+        self.student_ids.append(record.get("student_id"))
+        self.names.append(record.get("name"))
+        self.observations.append(record.get("observations"))
+        self.errors.append(record.get("error"))
+        if isinstance(assessment, AssessmentDict) and assessment.is_current(self.normalizer):
+            student = assessment.student
+        elif isinstance(assessment, StudentAssessment):
+            student = assessment
+        elif isinstance(assessment, dict) and isinstance(assessment.get("assessments"), list) and not assessment.get("error"):
+            student = StudentAssessment.from_dict(assessment, self.normalizer)
+        else:
+            student = None
+        if student is not None:
+            self._levels[self._size] = np.frombuffer(student.levels, dtype=np.int8)
+            self.reasons.append(student.reasons)
+            self.confidences.append(student.confidences)
+            self.summaries.append(student.summary)
+            self.meta.append(student.meta)
+            self.raw.append(None)
+        else:
+            self.reasons.append(None)
+            self.confidences.append(None)
+            self.summaries.append("")
+            self.meta.append(None)
+            self.raw.append(assessment)
+        self._size += 1
+
+    def assessment(self, index: int) -> Optional[StudentAssessment]:
+        """Canonical assessment of one student (None for errors and item-less results)"""
+        if self.reasons[index] is None:
+            return None
+        return StudentAssessment(self._levels[index].tobytes(), self.reasons[index], self.summaries[index],
+                                 self.meta[index], self.confidences[index])
+
+    def record(self, index: int) -> Dict[str, Any]:
+        """Legacy batch result record for one student"""
+        record = {"student_id": self.student_ids[index], "name": self.names[index],
+                  "observations": self.observations[index]}
+        student = self.assessment(index)
+        if student is not None:
+            record["assessment"] = student.to_dict(self.normalizer)
+        elif self.raw[index] is not None:
+            record["assessment"] = self.raw[index]
+        if self.errors[index] is not None:
+            record["error"] = self.errors[index]
+        return record
+
+    def records(self, since: int = 0) -> List[Dict[str, Any]]:
+        return [self.record(i) for i in range(since, self._size)]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.records())
+
+    def failed_count(self) -> int:
+        return sum(1 for e in self.errors if e)
+
+    def level_matrix(self) -> np.ndarray:
+        """Level IDs as an (n_students, n_qualities) int8 array (a view; do not modify)"""
+        return self._levels[:self._size]
+
+    def label_lists(self) -> List[List[str]]:
+        """Labels for every student (errored and item-less results get none)"""
+        return [[] if self.errors[i] or self.reasons[i] is None else self.assessment(i).labels(self.normalizer)
+                for i in range(self._size)]
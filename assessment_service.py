@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Local HTTP assessment service
+Holds one warm PersonalityAssessmentSystem (embedding model, vector index and
+rate limiter) that several Streamlit instances and scripts can share.
+
+Endpoints:
+    GET  /health                    service readiness
+    GET  /status                    rate limiter and job counts
+    POST /assess                    {"observations": "..."} -> assessment
+    POST /batch                     {"students": [...], "label": "...", "wait": false, "timeout": N} -> job
+    GET  /jobs                      all known jobs
+    GET  /jobs/<id>?results=1&since=N   job status, progress and (partial) results
+    POST /jobs/<id>/cancel          request cancellation
+"""
+
+import os
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from personality_assessment import PersonalityAssessmentSystem
+from rate_limiter import get_rate_limiter
+from job_queue import FINISHED_STATES, get_job_manager
+from json_repair import get_repair_stats
+from llm_cassette import get_cassette
+from usage_ledger import get_usage_ledger
+from priority_scheduler import PRIORITY_BATCH, get_scheduler
+from circuit_breaker import get_circuit_breaker
+from hedged_calls import get_hedged_invoker
+
+
+class AssessmentService:
+    """Shared, process-wide assessment backend used by the HTTP handler"""
+
+    def __init__(self, system: Optional[PersonalityAssessmentSystem] = None):
+        self.system = system
+        self.ready = system is not None and system.vector_store is not None
+        self.error = None
+        self._init_lock = threading.Lock()
+
+    def initialize(self):
+        """Load the embedding model and build the vector database once"""
+        with self._init_lock:
+            if self.ready:
+                return
+            try:
+                system = self.system or PersonalityAssessmentSystem()
+                system.setup_vector_database()
+                self.system = system
+                self.ready = True
+                self.error = None
+            except Exception as e:
+                self.error = str(e)
+                raise
+
+    def health(self) -> Dict[str, Any]:
+        return {"status": "ok" if self.ready else "initializing", "ready": self.ready, "error": self.error}
+
+    def status(self) -> Dict[str, Any]:
+        jobs = get_job_manager().list_jobs()
+        return {
+            "rate_limiter": get_rate_limiter().get_status(),
+            "json_repair": get_repair_stats().snapshot(),
+            "model_calls": get_hedged_invoker().get_status(),
+            "models": self.system.model_router.get_status() if self.ready else None,
+            "cassette": get_cassette().get_status() if get_cassette() is not None else None,
+            "usage": get_usage_ledger().summary() if get_usage_ledger() is not None else None,
+            "scheduler": get_scheduler().get_status() if get_scheduler() is not None else None,
+            "circuit": get_circuit_breaker().get_status() if get_circuit_breaker() is not None else None,
+            "jobs_running": len([j for j in jobs if j['status'] not in FINISHED_STATES]),
+            "jobs_total": len(jobs),
+        }
+
+    def assess(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        observations = payload.get("observations", "")
+        if not observations:
+            raise ValueError("'observations' is required")
+        return self.system.assess_student_personality(observations)
+
+    def submit_batch(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        students = payload.get("students")
+        if not isinstance(students, list):
+            raise ValueError("'students' must be a list of {id, name, observations} objects")
+        manager = get_job_manager()
+        job_id = manager.submit(self.system, students, label=payload.get("label"), owner=payload.get("owner"),
+                                priority=payload.get("priority") or PRIORITY_BATCH)
+        if payload.get("wait"):
+            # Bounded, so the reply (finished or not) reaches the client before it gives up;
+            # an unfinished job is then polled by its ID
+            try:
+                from config import ASSESSMENT_TIMEOUT
+            except ImportError:
+                ASSESSMENT_TIMEOUT = 120
+            manager.wait(job_id, timeout=float(payload.get("timeout") or ASSESSMENT_TIMEOUT))
+            return self.job(job_id, include_results=True)
+        return self.job(job_id)
+
+    def job(self, job_id: str, include_results: bool = False, since: int = 0) -> Optional[Dict[str, Any]]:
+        snapshot = get_job_manager().snapshot(job_id, include_results=include_results, since=since)
+        if snapshot is not None:
+            # Callers may run from another working directory
+            snapshot['export_paths'] = {fmt: os.path.abspath(p) for fmt, p in snapshot['export_paths'].items()}
+        return snapshot
+
+
+class AssessmentRequestHandler(BaseHTTPRequestHandler):
+    """JSON-over-HTTP front end for AssessmentService"""
+
+    service: AssessmentService = None
+    server_version = "PersonalityAssessmentService/1.0"
+
+    def _send(self, status: int, body: Any):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        payload = json.loads(self.rfile.read(length).decode("utf-8"))
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object")
+        return payload
+
+    def _route(self) -> Tuple[str, Dict[str, Any]]:
+        parsed = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        return parsed.path.rstrip("/") or "/", query
+
+    def _require_ready(self) -> bool:
+        if not self.service.ready:
+            self._send(503, {"error": "Assessment system is not initialized", "detail": self.service.error})
+            return False
+        return True
+
+    def do_GET(self):
+        path, query = self._route()
+        try:
+            if path == "/health":
+                return self._send(200, self.service.health())
+            if path == "/status":
+                return self._send(200, self.service.status())
+            if path == "/jobs":
+                return self._send(200, {"jobs": get_job_manager().list_jobs()})
+            if path.startswith("/jobs/"):
+                job_id = path.split("/")[2]
+                snapshot = self.service.job(
+                    job_id,
+                    include_results=query.get("results") in ("1", "true"),
+                    since=int(query.get("since", 0))
+                )
+                if snapshot is None:
+                    return self._send(404, {"error": f"Unknown job: {job_id}"})
+                return self._send(200, snapshot)
+            return self._send(404, {"error": f"Unknown endpoint: {path}"})
+        except Exception as e:
+            return self._send(500, {"error": str(e)})
+
+    def do_POST(self):
+        path, _ = self._route()
+        try:
+            payload = self._read_json()
+        except (ValueError, json.JSONDecodeError) as e:
+            return self._send(400, {"error": f"Invalid JSON body: {e}"})
+        try:
+            if path == "/assess":
+                if not self._require_ready():
+                    return
+                return self._send(200, self.service.assess(payload))
+            if path == "/batch":
+                if not self._require_ready():
+                    return
+                return self._send(202, self.service.submit_batch(payload))
+            if path.startswith("/jobs/") and path.endswith("/cancel"):
+                job_id = path.split("/")[2]
+                return self._send(200, {"job_id": job_id, "cancelled": get_job_manager().cancel(job_id)})
+            return self._send(404, {"error": f"Unknown endpoint: {path}"})
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+        except Exception as e:
+            return self._send(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        print(f"[assessment-service] {self.address_string()} - {format % args}")
+
+
+def create_server(host: str, port: int, service: Optional[AssessmentService] = None) -> ThreadingHTTPServer:
+    """Build (but do not start) the HTTP server around a shared service instance"""
+    handler = type("BoundAssessmentRequestHandler", (AssessmentRequestHandler,), {"service": service or AssessmentService()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    """Start the local assessment service"""
+    try:
+        from config import ASSESSMENT_SERVICE_HOST, ASSESSMENT_SERVICE_PORT
+    except ImportError:
+        ASSESSMENT_SERVICE_HOST, ASSESSMENT_SERVICE_PORT = "127.0.0.1", 8502
+
+    parser = argparse.ArgumentParser(description="Local HTTP assessment service")
+    parser.add_argument("--host", default=ASSESSMENT_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=ASSESSMENT_SERVICE_PORT)
+    args = parser.parse_args()
+
+    print("Personality Assessment Service")
+    print("=" * 50)
+    if not os.getenv("GOOGLE_API_KEY"):
+        print("ERROR: GOOGLE_API_KEY not found in environment variables")
+        print("Please create a .env file with your Google API key:")
+        print("GOOGLE_API_KEY=your_api_key_here")
+        return
+
+    service = AssessmentService()
+    print("Initializing assessment system (embedding model + vector database)...")
+    service.initialize()
+
+    server = create_server(args.host, args.port, service)
+    print(f"Serving on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nService stopped by user")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+from api_key_pool import *
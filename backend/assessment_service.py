@@ -0,0 +1,2 @@
+from assessment_service import *
+
@@ -0,0 +1,2 @@
+from work_queue import *
+
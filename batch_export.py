@@ -0,0 +1,247 @@
+import os
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from label_normalizer import LEVEL_NAMES as LEVELS, PERSONALITY_QUALITIES, get_label_normalizer
+
+
+def result_source(result: Dict[str, Any]) -> Tuple[str, str]:
+    """(source, fallback_reason) of one batch result.
+
+    Source is the tier that produced the labels: "llm" for Gemini answers,
+    the local tier's ``source`` ("local_triage", "label_model") otherwise,
+    and "" for errors. The fallback reason says why Gemini was bypassed.
+    """
+    assessment = result.get('assessment')
+    if result.get('error') or not isinstance(assessment, dict) or assessment.get('error'):
+        return "", ""
+    return str(assessment.get('source') or "llm"), str(assessment.get('fallback_reason') or "")
+
+
+def result_to_long_rows(result: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Flatten one batch result into columns with one row per quality.
+
+    Qualities the model did not rate are emitted as NOT OBSERVED so every
+    student contributes exactly ``len(PERSONALITY_QUALITIES)`` rows.
+    """
+    n_qualities = len(PERSONALITY_QUALITIES)
+    level_codes = [0] * n_qualities
+    reasoning = [""] * n_qualities
+    error = result.get('error') or ""
+    assessment = result.get('assessment') or {}
+    if not error and isinstance(assessment, dict):
+        error = assessment.get('error') or ""
+        if not error:
+            for q_id, l_id, reason in get_label_normalizer().items(assessment):
+                level_codes[q_id] = l_id
+                reasoning[q_id] = reason
+    student_id = str(result.get('student_id', ''))
+    name = str(result.get('name', ''))
+    source, fallback_reason = result_source(result)
+    return {
+        "student_id": [student_id] * n_qualities,
+        "name": [name] * n_qualities,
+        "quality": list(range(n_qualities)),
+        "level": level_codes,
+        "reasoning": reasoning,
+        "error": [str(error)] * n_qualities,
+        "source": [source] * n_qualities,
+        "fallback_reason": [fallback_reason] * n_qualities,
+    }
+
+
+class StreamingJSONWriter:
+    """Write the legacy batch JSON list one result at a time"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+        self._file.write("[")
+        self._count = 0
+
+    def write(self, result: Dict[str, Any]):
+        self._file.write(",\n" if self._count else "\n")
+        self._file.write(json.dumps(result, ensure_ascii=False))
+        self._file.flush()
+        self._count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.write("\n]\n")
+            self._file.close()
+            self._file = None
+
+
+class ParquetBatchWriter:
+    """Write batch results as a long Parquet table (student x quality) in row groups"""
+
+    def __init__(self, path: str, row_group_size: int = 2000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        self.path = path
+        # Flush roughly every `row_group_size` long rows
+        self.row_group_size = max(1, row_group_size)
+        self._quality_dictionary = pa.array(PERSONALITY_QUALITIES, type=pa.string())
+        self._level_dictionary = pa.array(LEVELS, type=pa.string())
+        self._schema = pa.schema([
+            ("student_id", pa.string()),
+            ("name", pa.string()),
+            ("quality", pa.dictionary(pa.int8(), pa.string())),
+            ("level", pa.dictionary(pa.int8(), pa.string())),
+            ("reasoning", pa.string()),
+            ("error", pa.string()),
+            ("source", pa.string()),
+            ("fallback_reason", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+        self._buffer: Dict[str, List[Any]] = {name: [] for name in self._schema.names}
+        self._buffered_rows = 0
+
+    def write(self, result: Dict[str, Any]):
+        rows = result_to_long_rows(result)
+        for key, values in rows.items():
+            self._buffer[key].extend(values)
+        self._buffered_rows += len(rows["quality"])
+        if self._buffered_rows >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffered_rows:
+            return
+        pa = self._pa
+        columns = [
+            pa.array(self._buffer["student_id"], type=pa.string()),
+            pa.array(self._buffer["name"], type=pa.string()),
+            pa.DictionaryArray.from_arrays(pa.array(self._buffer["quality"], type=pa.int8()), self._quality_dictionary),
+            pa.DictionaryArray.from_arrays(pa.array(self._buffer["level"], type=pa.int8()), self._level_dictionary),
+            pa.array(self._buffer["reasoning"], type=pa.string()),
+            pa.array(self._buffer["error"], type=pa.string()),
+            pa.array(self._buffer["source"], type=pa.string()),
+            pa.array(self._buffer["fallback_reason"], type=pa.string()),
+        ]
+        self._writer.write_table(pa.Table.from_arrays(columns, schema=self._schema))
+        self._buffer = {name: [] for name in self._schema.names}
+        self._buffered_rows = 0
+
+    def close(self):
+        if self._writer is not None:
+            self._flush()
+            self._writer.close()
+            self._writer = None
+
+
+class ExcelBatchWriter:
+    """Stream one row per student into a write-only Excel workbook for reviewers"""
+
+    def __init__(self, path: str):
+        try:
+            from openpyxl import Workbook
+        except ImportError as e:
+            raise ImportError("Excel export requires openpyxl (pip install openpyxl)") from e
+        self.path = path
+        # write-only workbooks keep rows out of memory until save
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("Batch Assessment")
+        self._sheet.append(["Student ID", "Name", "Observations", "Predicted Labels"] + PERSONALITY_QUALITIES
+                           + ["Summary", "Source", "Fallback Reason", "Error"])
+
+    def write(self, result: Dict[str, Any]):
+        rows = result_to_long_rows(result)
+        assessment = result.get('assessment') or {}
+        labels = [] if rows["error"][0] else get_label_normalizer().labels(assessment)
+        levels = [LEVELS[code] if code else "" for code in rows["level"]]
+        summary = assessment.get('summary', '') if isinstance(assessment, dict) else ''
+        self._sheet.append(
+            [rows["student_id"][0], rows["name"][0], str(result.get('observations', '') or ''), ", ".join(labels)]
+            + levels
+            + [str(summary or ''), rows["source"][0], rows["fallback_reason"][0], rows["error"][0]]
+        )
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.save(self.path)
+            self._workbook = None
+
+
+_WRITERS = {
+    "json": (StreamingJSONWriter, "json"),
+    "parquet": (ParquetBatchWriter, "parquet"),
+    "excel": (ExcelBatchWriter, "xlsx"),
+}
+
+
+class BatchExportSession:
+    """Fan each batch result out to all configured export writers as it arrives"""
+
+    def __init__(self, timestamp: str, output_dir: Optional[str] = None, formats: Optional[List[str]] = None):
+        if output_dir is None:
+            try:
+                from config import ASSESSMENTS_DIR
+                output_dir = ASSESSMENTS_DIR
+            except ImportError:
+                output_dir = "assessments"
+        if formats is None:
+            try:
+                from config import BATCH_EXPORT_FORMATS
+                formats = BATCH_EXPORT_FORMATS
+            except ImportError:
+                formats = ["json"]
+        try:
+            from config import PARQUET_ROW_GROUP_SIZE
+            row_group_size = PARQUET_ROW_GROUP_SIZE
+        except ImportError:
+            row_group_size = 2000
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.paths: Dict[str, str] = {}
+        self._writers = {}
+        for fmt in formats:
+            if fmt not in _WRITERS:
+                print(f"Unknown export format '{fmt}', skipping")
+                continue
+            writer_cls, ext = _WRITERS[fmt]
+            path = os.path.join(output_dir, f"batch_assessment_{timestamp}.{ext}")
+            try:
+                if writer_cls is ParquetBatchWriter:
+                    writer = writer_cls(path, row_group_size=row_group_size)
+                else:
+                    writer = writer_cls(path)
+            except ImportError as e:
+                print(f"Skipping {fmt} export: {e}")
+                continue
+            self._writers[fmt] = writer
+            self.paths[fmt] = path
+
+    def write(self, result: Dict[str, Any]):
+        for fmt, writer in list(self._writers.items()):
+            try:
+                writer.write(result)
+            except Exception as e:
+                # One broken export must not lose the others (or the batch)
+                print(f"Error writing {fmt} export, disabling it: {e}")
+                self._close_writer(fmt)
+
+    def _close_writer(self, fmt: str):
+        writer = self._writers.pop(fmt, None)
+        if writer is None:
+            return
+        try:
+            writer.close()
+        except Exception as e:
+            print(f"Error closing {fmt} export: {e}")
+
+    def close(self) -> Dict[str, str]:
+        for fmt in list(self._writers):
+            self._close_writer(fmt)
+        return self.paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,138 @@
+import re
+import time
+import threading
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# Status codes count only where a status goes (message start, "status 503", "code: 429", "HTTP 502",
+# "Error 500"), so numbers inside model output or settings ("position 500") are not outages
+_OUTAGE_PATTERN = re.compile(
+    r"(?:^\s*|\b(?:status|code|HTTP|Error)\W{1,3})(?:429|500|502|503|504)\b"
+    r"|RESOURCE_EXHAUSTED|UNAVAILABLE|DEADLINE_EXCEEDED|ResourceExhausted|TooManyRequests|ServiceUnavailable"
+    r"|InternalServerError|DeadlineExceeded|timed out|Timeout|Connection(Error| reset| refused| aborted)"
+)
+
+
+def is_outage_error(error_str: str) -> bool:
+    """True for errors that say Gemini itself is unreachable or out of quota (not bad output)"""
+    return bool(_OUTAGE_PATTERN.search(error_str))
+
+
+class CircuitBreaker:
+    """Fail fast while Gemini is down or out of quota.
+
+    Closed: calls go through; ``failure_threshold`` consecutive outage errors
+    open the circuit. Open: calls are refused at once (callers use the local
+    tier or defer the student) until ``recovery_timeout`` has passed.
+    Half-open: up to ``half_open_probes`` probe calls go through; a success
+    closes the circuit, a failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 60, half_open_probes: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_probes = half_open_probes
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.last_error = ""
+        self._probes_in_flight = 0
+        self._probe_started = 0.0
+        self.stats = {"opened": 0, "rejected": 0, "probes": 0}
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a call may go to Gemini now (possibly as a half-open probe)"""
+        with self.lock:
+            now = time.time()
+            if self.state == CIRCUIT_OPEN and now - self.opened_at >= self.recovery_timeout:
+                self.state = CIRCUIT_HALF_OPEN
+                self._probes_in_flight = 0
+                logger.info("Gemini circuit half-open; sending a probe request")
+            if self.state == CIRCUIT_CLOSED:
+                return True
+            if self.state == CIRCUIT_HALF_OPEN:
+                # A probe that never reported back (e.g. crashed before the call) stops blocking after a while
+                if self._probes_in_flight < self.half_open_probes or now - self._probe_started > self.recovery_timeout:
+                    self._probes_in_flight += 1
+                    self._probe_started = now
+                    self.stats["probes"] += 1
+                    return True
+            self.stats["rejected"] += 1
+            return False
+
+    def is_open(self) -> bool:
+        with self.lock:
+            return self.state == CIRCUIT_OPEN
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe may be sent (0 unless open)"""
+        with self.lock:
+            if self.state != CIRCUIT_OPEN:
+                return 0.0
+            return max(0.0, self.recovery_timeout - (time.time() - self.opened_at))
+
+    def record_success(self):
+        with self.lock:
+            if self.state != CIRCUIT_CLOSED:
+                logger.info("Gemini circuit closed; calls resume")
+            self.state = CIRCUIT_CLOSED
+            self.consecutive_failures = 0
+            self._probes_in_flight = 0
+
+    def record_failure(self, error_str: str):
+        with self.lock:
+            self.consecutive_failures += 1
+            self.last_error = error_str[:200]
+            if self.state == CIRCUIT_HALF_OPEN or (self.state == CIRCUIT_CLOSED
+                                                   and self.consecutive_failures >= self.failure_threshold):
+                self.state = CIRCUIT_OPEN
+                self.opened_at = time.time()
+                self._probes_in_flight = 0
+                self.stats["opened"] += 1
+                logger.warning(f"Gemini circuit open for {self.recovery_timeout:.0f}s after "
+                               f"{self.consecutive_failures} outage errors: {self.last_error}")
+
+    def record_result(self, error_str: Optional[str] = None):
+        """Count a finished call: outage errors are failures, anything Gemini answered is a success"""
+        if error_str and is_outage_error(error_str):
+            self.record_failure(error_str)
+        else:
+            self.record_success()
+
+    def get_status(self) -> Dict[str, Any]:
+        retry_after = self.retry_after()
+        with self.lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_after": retry_after,
+                "last_error": self.last_error,
+                **self.stats,
+            }
+
+
+# Global circuit breaker (one per process, shared by all assessment paths)
+_circuit_breaker = None
+_circuit_breaker_lock = threading.Lock()
+
+def get_circuit_breaker() -> Optional[CircuitBreaker]:
+    """Get the global circuit breaker, or None when ENABLE_CIRCUIT_BREAKER is off"""
+    global _circuit_breaker
+    try:
+        from config import ENABLE_CIRCUIT_BREAKER, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT, CIRCUIT_HALF_OPEN_PROBES
+    except ImportError:
+        ENABLE_CIRCUIT_BREAKER, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT, CIRCUIT_HALF_OPEN_PROBES = True, 5, 60, 1
+    if not ENABLE_CIRCUIT_BREAKER:
+        return None
+    with _circuit_breaker_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT, CIRCUIT_HALF_OPEN_PROBES)
+    return _circuit_breaker
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compact response format benchmark
+Compares output size and generation latency of the verbose assessment format
+against the compact wire format (short quality codes, L/M/H levels, NOT
+OBSERVED omitted, capped reasoning).
+
+Usage:
+    python compact_benchmark.py                      # offline: re-encode stored assessments
+    python compact_benchmark.py --live students.csv --limit 5
+"""
+
+import os
+import json
+import glob
+import time
+import argparse
+import statistics
+from typing import Any, Dict, Iterator, List
+
+from compact_schema import compact_from_result
+from context_builder import count_tokens
+
+
+def iter_stored_assessments(assessments_dir: str) -> Iterator[Dict[str, Any]]:
+    """Yield every successful assessment result saved in the assessments directory"""
+    for path in sorted(glob.glob(os.path.join(assessments_dir, "*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        records = data if isinstance(data, list) else [data]
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+            result = record.get("assessment", record)
+            if isinstance(result, dict) and result.get("assessments"):
+                yield result
+
+
+def offline_benchmark(assessments_dir: str, reasoning_words: int) -> Dict[str, Any]:
+    """Output token counts of stored verbose responses versus their compact encoding"""
+    verbose_tokens, compact_tokens = [], []
+    for result in iter_stored_assessments(assessments_dir):
+        verbose = {"assessments": result["assessments"], "summary": result.get("summary", "")}
+        verbose_tokens.append(count_tokens(json.dumps(verbose, indent=2, ensure_ascii=False)))
+        compact = compact_from_result(result, reasoning_words)
+        compact_tokens.append(count_tokens(json.dumps(compact, ensure_ascii=False)))
+    return {"verbose_tokens": verbose_tokens, "compact_tokens": compact_tokens}
+
+
+def live_benchmark(csv_path: str, limit: int) -> Dict[str, Any]:
+    """Run each student through both formats and measure latency and output tokens"""
+    import pandas as pd
+    from personality_assessment import PersonalityAssessmentSystem, _message_text
+
+    df = pd.read_csv(csv_path).head(limit)
+    system = PersonalityAssessmentSystem()
+    system.setup_vector_database()
+    retriever = system._get_retriever()
+
+    stats = {f"{fmt}_{metric}": [] for fmt in ("verbose", "compact") for metric in ("tokens", "latency", "failures")}
+    for _, row in df.iterrows():
+        observations = str(row.get("Observations", "") or "")
+        if not observations:
+            continue
+        for fmt in ("verbose", "compact"):
+            chain, parser = system._build_assessment_chain(retriever, compact=(fmt == "compact"))
+            start = time.perf_counter()
+            try:
+                message = chain.invoke(observations)
+            except Exception as e:
+                print(f"{fmt} call failed for {row.get('Name', '')}: {e}")
+                stats[f"{fmt}_failures"].append(1)
+                continue
+            stats[f"{fmt}_latency"].append(time.perf_counter() - start)
+            text = _message_text(message)
+            usage = getattr(message, "usage_metadata", None) or {}
+            stats[f"{fmt}_tokens"].append(usage.get("output_tokens") or count_tokens(text))
+            try:
+                parser.parse(text)
+            except Exception:
+                stats[f"{fmt}_failures"].append(1)
+    return stats
+
+
+def _describe(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    return f"mean {statistics.mean(values):.1f}  median {statistics.median(values):.1f}  max {max(values):.1f}"
+
+
+def main():
+    """Print the verbose vs compact comparison"""
+    try:
+        from config import ASSESSMENTS_DIR, COMPACT_REASONING_WORDS
+    except ImportError:
+        ASSESSMENTS_DIR, COMPACT_REASONING_WORDS = "assessments", 12
+
+    parser = argparse.ArgumentParser(description="Benchmark the compact assessment response format")
+    parser.add_argument("--live", metavar="CSV", help="Call Gemini for students in this CSV (Name, Observations)")
+    parser.add_argument("--limit", type=int, default=5, help="Students to assess in live mode")
+    parser.add_argument("--assessments-dir", default=ASSESSMENTS_DIR)
+    parser.add_argument("--reasoning-words", type=int, default=COMPACT_REASONING_WORDS)
+    args = parser.parse_args()
+
+    if args.live:
+        stats = live_benchmark(args.live, args.limit)
+        print(f"Live benchmark ({args.limit} students)")
+        print("=" * 50)
+        for fmt in ("verbose", "compact"):
+            print(f"{fmt:8s} output tokens: {_describe(stats[f'{fmt}_tokens'])}")
+            print(f"{fmt:8s} latency (s):   {_describe(stats[f'{fmt}_latency'])}")
+            print(f"{fmt:8s} failures:      {len(stats[f'{fmt}_failures'])}")
+        verbose, compact = stats["verbose_latency"], stats["compact_latency"]
+    else:
+        stats = offline_benchmark(args.assessments_dir, args.reasoning_words)
+        print(f"Offline benchmark ({len(stats['verbose_tokens'])} stored assessments)")
+        print("=" * 50)
+        print(f"verbose output tokens: {_describe(stats['verbose_tokens'])}")
+        print(f"compact output tokens: {_describe(stats['compact_tokens'])}")
+        verbose, compact = stats["verbose_tokens"], stats["compact_tokens"]
+
+    if verbose and compact:
+        print(f"compact / verbose: {statistics.mean(compact) / statistics.mean(verbose):.2f}")
+
+
+if __name__ == "__main__":
+    main()
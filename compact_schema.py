@@ -0,0 +1,140 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from label_normalizer import (
+    HIGH, INVALID_ID, LEVEL_NAMES, LOW, MIDDLE, NOT_OBSERVED, PERSONALITY_QUALITIES,
+    get_label_normalizer
+)
+
+# Short codes the model uses instead of full quality names
+QUALITY_CODES = {
+    "Adaptability": "AD",
+    "Academic achievement": "AA",
+    "Boldness": "BO",
+    "Competition": "CO",
+    "Creativity": "CR",
+    "Enthusiasm": "EN",
+    "Excitability": "EX",
+    "General ability": "GA",
+    "Guilt proneness": "GP",
+    "Individualism": "IN",
+    "Innovation": "IV",
+    "Leadership": "LE",
+    "Maturity": "MA",
+    "Mental health": "MH",
+    "Morality": "MO",
+    "Self control": "SC",
+    "Sensitivity": "SE",
+    "Self sufficiency": "SS",
+    "Social warmth": "SW",
+    "Tension": "TE",
+}
+
+LEVEL_CODES = {"L": LOW, "M": MIDDLE, "H": HIGH}
+_LEVEL_LETTERS = {level_id: code for code, level_id in LEVEL_CODES.items()}
+
+NOT_OBSERVED_REASONING = "No clear evidence observed"
+
+_CODE_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+
+
+def quality_codes(qualities: Optional[List[str]] = None) -> Dict[str, str]:
+    """Code -> quality name for the configured qualities (unknown qualities get Q1, Q2...)"""
+    codes = {}
+    for i, quality in enumerate(qualities or PERSONALITY_QUALITIES):
+        codes[QUALITY_CODES.get(quality, f"Q{i + 1}")] = quality
+    return codes
+
+
+def compact_format_instructions(qualities: Optional[List[str]] = None, reasoning_words: int = 12) -> str:
+    """Output format section of the compact assessment prompt"""
+    legend = ", ".join(f"{code}={quality}" for code, quality in quality_codes(qualities).items())
+    if reasoning_words > 0:
+        entry = '["CODE", "L|M|H", "reason"]'
+        reasoning = f"reason is at most {reasoning_words} words, citing the observed behaviour."
+        example = '{"a": [["LE", "H", "organised group work"], ["SW", "M", "helps peers"]], "s": "Confident, helpful student."}'
+    else:
+        entry = '["CODE", "L|M|H"]'
+        reasoning = "Do not include reasons."
+        example = '{"a": [["LE", "H"], ["SW", "M"]], "s": "Confident, helpful student."}'
+    return (
+        f"Quality codes: {legend}\n"
+        f"Levels: L=LOW, M=MIDDLE, H=HIGH.\n"
+        f"Respond with ONLY a JSON object {{\"a\": [{entry}, ...], \"s\": \"one-sentence summary\"}}.\n"
+        f"List only qualities with clear evidence; omit every quality that is not observed. {reasoning}\n"
+        f"Example: {example}"
+    )
+
+
+def expand_compact_item(entry: Any, codes: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Turn one compact ``[code, level, reason?]`` entry into an AssessmentItem dict"""
+    if isinstance(entry, dict):
+        entry = [entry.get("q", ""), entry.get("l", ""), entry.get("r", "")]
+    if not isinstance(entry, (list, tuple)) or len(entry) < 2:
+        raise ValueError(f"Compact entry must be [code, level, reason]: {entry!r}")
+    codes = codes if codes is not None else quality_codes()
+    code, level = str(entry[0]).strip(), str(entry[1]).strip()
+
+    quality = codes.get(code.upper())
+    if quality is None:
+        # The model occasionally writes the full name instead of the code
+        normalizer = get_label_normalizer()
+        q_id = normalizer.quality_id(code)
+        if q_id == INVALID_ID:
+            raise ValueError(f"Unknown quality code: {code!r}")
+        quality = normalizer.qualities[q_id]
+
+    level_id = LEVEL_CODES.get(level.upper())
+    if level_id is None:
+        level_id = get_label_normalizer().level_id(level)
+        if level_id == INVALID_ID:
+            raise ValueError(f"Unknown level code: {level!r}")
+
+    reasoning = str(entry[2]).strip() if len(entry) > 2 and entry[2] is not None else ""
+    return {"quality": quality, "level": LEVEL_NAMES[level_id], "reasoning": reasoning}
+
+
+def expand_compact_result(payload: Any, qualities: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Expand a compact response (text or parsed JSON) into the AssessmentResult shape.
+
+    Omitted qualities come back as NOT OBSERVED items, so the result has the
+    same shape as a verbose response.
+    """
+    if isinstance(payload, str):
+        payload = json.loads(_CODE_FENCE.sub("", payload.strip()))
+    if not isinstance(payload, dict) or not isinstance(payload.get("a", []), list):
+        raise ValueError('Compact response must be an object with an "a" list')
+
+    qualities = list(qualities or PERSONALITY_QUALITIES)
+    codes = quality_codes(qualities)
+    observed = {}
+    for entry in payload.get("a", []):
+        item = expand_compact_item(entry, codes)
+        observed[item["quality"]] = item
+
+    assessments = []
+    for quality in qualities:
+        assessments.append(observed.pop(quality, None) or {
+            "quality": quality,
+            "level": LEVEL_NAMES[NOT_OBSERVED],
+            "reasoning": NOT_OBSERVED_REASONING
+        })
+    # Qualities resolved by name that are outside the configured list
+    assessments.extend(observed.values())
+    return {"assessments": assessments, "summary": str(payload.get("s", "") or "")}
+
+
+def compact_from_result(result: Dict[str, Any], reasoning_words: int = 12) -> Dict[str, Any]:
+    """Encode an AssessmentResult dict in the compact wire format (used by the benchmark)"""
+    normalizer = get_label_normalizer()
+    entries = []
+    for q_id, l_id, reasoning in normalizer.items(result):
+        if l_id == NOT_OBSERVED:
+            continue
+        quality = normalizer.qualities[q_id]
+        entry = [QUALITY_CODES.get(quality, f"Q{q_id + 1}"), _LEVEL_LETTERS[l_id]]
+        if reasoning_words > 0:
+            entry.append(" ".join(reasoning.split()[:reasoning_words]))
+        entries.append(entry)
+    return {"a": entries, "s": result.get("summary", "")}
@@ -7,6 +7,8 @@ Modify these settings to customize the system behavior
 # Use a supported Gemini model identifier (seen in your key's list)
 GEMINI_MODEL = "gemini-2.5-flash"
 GEMINI_TEMPERATURE = 0.1  # Lower = more consistent, Higher = more creative
+MODEL_PROBE_CACHE = "model_probe.json"  # Usable models per API key, probed once and cached here
+MODEL_PROBE_TTL = 86400  # Re-probe available models after this many seconds
 
 # Rate Limiting Configuration
 ENABLE_RATE_LIMITING = True
@@ -16,6 +18,14 @@ MAX_REQUESTS_PER_DAY = 10000  # Updated for paid tier
 RETRY_ON_RATE_LIMIT = True
 MAX_RETRIES = 3
 RETRY_DELAY = 15  # Reduced retry delay for paid tier
+# API key pool: set GOOGLE_API_KEYS=key1,key2,... in .env; limits above then apply per key
+KEY_POOL_FAILURE_THRESHOLD = 3  # Consecutive 429s before a key is rested
+KEY_POOL_COOLDOWN = 300  # Seconds a rate-limited key stays out of the pool
+KEY_POOL_AUTH_COOLDOWN = 3600  # Seconds an invalid/revoked key stays out of the pool
+ENABLE_CIRCUIT_BREAKER = True  # Fail fast (local tier or deferred) while Gemini is down or out of quota
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive outage errors (429/5xx/timeouts) that open the circuit
+CIRCUIT_RECOVERY_TIMEOUT = 60  # Seconds the circuit stays open before a probe request is let through
+CIRCUIT_HALF_OPEN_PROBES = 1  # Probe requests allowed at once while half-open
 
 # Hugging Face Embeddings Configuration
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # Fast and effective embeddings
@@ -27,7 +37,37 @@ CHUNK_OVERLAP = 200  # Overlap between chunks for better context
 
 # Assessment Configuration
 MAX_RETRIEVAL_RESULTS = 10  # Number of context chunks to retrieve
-ASSESSMENT_TIMEOUT = 120  # Maximum time for assessment in seconds
+CONTEXT_TOKEN_BUDGET = 1500  # Max tokens of retrieved context per prompt, packed by relevance
+CONTEXT_MIN_OVERLAP_CHARS = 30  # Shortest repeated span between chunks that is removed
+TOKEN_ENCODING = "cl100k_base"  # tiktoken encoding used to count prompt tokens
+ASSESSMENT_TIMEOUT = 120  # Maximum time for assessment in seconds (retries included; enforced per call)
+ENABLE_HEDGED_REQUESTS = False  # Send one duplicate request when a call runs longer than usual
+HEDGE_LATENCY_PERCENTILE = 95  # Hedge once a call is slower than this percentile of recent calls
+HEDGE_MIN_SAMPLES = 20  # Completed calls needed before the percentile is trusted
+HEDGE_MIN_DELAY = 5.0  # Never hedge earlier than this many seconds
+HEDGE_MODEL = ""  # Model for hedged requests (e.g. "gemini-2.0-flash"); empty uses the same model
+MODEL_CALL_THREADS = 16  # Worker threads that run deadline-bounded model calls
+LLM_BACKEND = "gemini"  # "fake" = in-process fake Gemini with injected faults (see fake_gemini.py); no API key or quota used
+FAKE_GEMINI_PROFILE = "healthy"  # Fault profile of the fake backend: healthy, slow_tail, quota_pressure, quota_exhausted, malformed_output, model_missing
+FAKE_GEMINI_TIME_SCALE = 1.0  # Multiplier for the fake backend's simulated latencies
+LLM_CASSETTE_MODE = "off"  # "record" = save every Gemini response; "replay" = serve saved responses offline (no API key)
+LLM_CASSETTE_PATH = "cassettes/default.jsonl"  # Cassette file (prompt hash, response text, token usage, latency)
+LLM_CASSETTE_REPLAY_LATENCY = False  # Sleep for each response's recorded latency when replaying
+
+# Local Triage Configuration (reference-sheet embeddings, no Gemini call)
+LOCAL_TRIAGE_MODE = "fallback"  # "off"; "fallback" = only when Gemini quota is exhausted; "route" = also skip Gemini when confident
+LOCAL_TRIAGE_CONFIDENCE = 0.9  # Minimum confidence (weakest of the 20 qualities) to skip Gemini in "route" mode
+LOCAL_TRIAGE_MIN_OBSERVED = 1  # Observed qualities required before a local result may replace Gemini
+LOCAL_TRIAGE_OBSERVE_THRESHOLD = 0.45  # Cosine similarity a descriptor must beat for a quality to count as observed
+LOCAL_TRIAGE_TEMPERATURE = 0.05  # Softmax temperature turning similarities into confidences
+LABEL_MODEL_PATH = "label_model.npz"  # Supervised label model (python label_model.py train); preferred over triage when present
+
+# Response Format Configuration
+ENABLE_STREAMING_ASSESSMENT = False  # Show individual results quality by quality as they are generated
+STREAM_MAX_PREAMBLE_CHARS = 2000  # Abort a stream that has not started the "assessments" array by then
+USE_COMPACT_RESPONSE_FORMAT = False  # Short quality codes, L/M/H levels, NOT OBSERVED omitted (fewer output tokens)
+COMPACT_REASONING_WORDS = 12  # Word cap for reasoning in the compact format; 0 drops reasoning entirely
+USE_NATIVE_RESPONSE_SCHEMA = False  # Pass the assessment schema to Gemini (enum levels) instead of format instructions; overrides the compact format
 
 # Personality Qualities (20 qualities as specified)
 PERSONALITY_QUALITIES = [
@@ -70,6 +110,14 @@ GOOGLE_SHEETS_RANGE = "Sheet1!A:D"  # Adjust based on actual sheet structure
 STREAMLIT_PORT = 8501
 STREAMLIT_HOST = "localhost"
 STREAMLIT_TITLE = "🎓 Personality Assessment System for Rural Students"
+REVIEW_PAGE_SIZE = 25  # Rows sent to the browser per page in paginated review mode
+REVIEW_PAGINATION_THRESHOLD = 50  # Batches larger than this open in paginated review mode
+
+# Local Assessment Service Configuration
+ASSESSMENT_SERVICE_HOST = "127.0.0.1"
+ASSESSMENT_SERVICE_PORT = 8502
+ASSESSMENT_SERVICE_URL = ""  # e.g. "http://127.0.0.1:8502"; empty runs the assessment system inside Streamlit
+ASSESSMENT_CLIENT_HEADROOM = 90  # Seconds a service client waits beyond ASSESSMENT_TIMEOUT (rate limiter and scheduler wait come first)
 
 # Assessment Prompt Templates
 ASSESSMENT_PROMPT_TEMPLATE = """You are an expert personality assessor for rural students. Your task is to evaluate a student's personality traits based on observer notes.
@@ -107,10 +155,37 @@ Remember: Only assess qualities that are clearly demonstrated in the observation
 # Batch Processing Configuration
 BATCH_SIZE = 10  # Process students in batches of this size
 BATCH_DELAY = 1  # Delay between batches in seconds (to avoid rate limits)
+JOB_WORKERS = 2  # Background worker threads running batch jobs
+JOB_HISTORY_LIMIT = 50  # Finished jobs kept in memory for polling/reattaching
+ENABLE_PRIORITY_SCHEDULER = True  # Admit interactive > batch > background calls to the rate limiter; batches share fairly
+
+# SQLite Work Queue Configuration (multi-process / multi-machine batch workers)
+WORK_QUEUE_PATH = "work_queue.sqlite3"
+WORK_QUEUE_VISIBILITY_TIMEOUT = 300  # Seconds a leased student stays invisible to other workers
+WORK_QUEUE_MAX_ATTEMPTS = 3  # Attempts per student before it is marked dead
+WORK_QUEUE_RETRY_BACKOFF = 30  # Seconds (x attempt number) before a failed student is retried
+WORK_QUEUE_JOURNAL_MODE = "WAL"  # Use "DELETE" when the queue file is on a network share
+
+# Usage Ledger Configuration (tokens and cost per assessment)
+USAGE_LEDGER_PATH = "usage_ledger.sqlite3"  # SQLite ledger of per-assessment token usage; empty disables it
+USAGE_ESTIMATE_WINDOW = 200  # Recent assessments averaged for pre-flight batch estimates
+# USD per million (input, output) tokens; check current Gemini API pricing before relying on estimates
+MODEL_PRICING = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-001": (0.10, 0.40),
+    "gemini-flash-latest": (0.30, 2.50),
+    "gemini-pro-latest": (1.25, 10.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
 
 # Export Configuration
-EXPORT_FORMATS = ["json", "csv", "excel"]
+EXPORT_FORMATS = ["json", "csv", "excel", "parquet"]
 DEFAULT_EXPORT_FORMAT = "json"
+BATCH_EXPORT_FORMATS = ["json", "parquet", "excel"]  # Written incrementally while a batch runs
+PARQUET_ROW_GROUP_SIZE = 2000  # Student x quality rows buffered per Parquet row group
 
 # Logging Configuration
 LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR
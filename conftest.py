@@ -0,0 +1,30 @@
+"""
+Shared pytest fixtures
+"""
+
+import time
+
+import pytest
+
+
+class FakeClock:
+    """Stand-in for the time module whose time() only moves when a test advances ``now``"""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """Factory: fake_clock(module) replaces ``module.time`` with one FakeClock and returns it"""
+    clock = FakeClock()
+
+    def install(*modules):
+        for module in modules:
+            monkeypatch.setattr(module, "time", clock)
+        return clock
+
+    return install
@@ -0,0 +1,123 @@
+import logging
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_encodings: Dict[str, Any] = {}
+
+
+def _get_encoding(encoding_name: str):
+    """Cached tiktoken encoding, or None when tiktoken or its data file is unavailable"""
+    if encoding_name not in _encodings:
+        try:
+            import tiktoken
+            _encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            logger.warning(f"tiktoken encoding {encoding_name!r} unavailable ({e}); estimating tokens as chars/4")
+            _encodings[encoding_name] = None
+    return _encodings[encoding_name]
+
+
+def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
+    """Number of tokens in text (tiktoken, or a ~4 chars/token estimate as fallback)"""
+    encoding = _get_encoding(encoding_name)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int, encoding_name: str = "cl100k_base") -> str:
+    """Cut text down to at most max_tokens tokens"""
+    encoding = _get_encoding(encoding_name)
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:max_tokens])
+    return text[:max_tokens * 4]
+
+
+def _overlap(left: str, right: str, min_chars: int) -> int:
+    """Length of the longest suffix of left that is also a prefix of right"""
+    for size in range(min(len(left), len(right)), min_chars - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class ContextAssembler:
+    """Turn retrieved chunks into a deduplicated, token-bounded context string.
+
+    Chunks arrive in relevance order. Text a chunk shares with an already kept
+    chunk (the splitter's CHUNK_OVERLAP at either end, or a whole repeated
+    chunk) is removed, then chunks are packed in that order until the token
+    budget is used up; the chunk that crosses the budget is truncated.
+    """
+
+    def __init__(self, token_budget: int = 1500, encoding_name: str = "cl100k_base",
+                 min_overlap_chars: int = 30, separator: str = "\n\n"):
+        self.token_budget = token_budget
+        self.encoding_name = encoding_name
+        self.min_overlap_chars = min_overlap_chars
+        self.separator = separator
+
+    def _dedupe(self, text: str, kept: List[str]) -> str:
+        for other in kept:
+            if text in other:
+                return ""
+            cut = _overlap(other, text, self.min_overlap_chars)
+            if cut:
+                text = text[cut:]
+            cut = _overlap(text, other, self.min_overlap_chars)
+            if cut:
+                text = text[:-cut]
+        return text.strip()
+
+    def assemble(self, documents: List[Any]) -> Tuple[str, Dict[str, int]]:
+        """Return (context text, stats) for documents ordered by relevance"""
+        texts = [(getattr(doc, "page_content", doc) or "").strip() for doc in documents]
+        kept: List[str] = []
+        used = 0
+        separator_tokens = count_tokens(self.separator, self.encoding_name)
+        truncated = False
+        for text in texts:
+            text = self._dedupe(text, kept)
+            if not text:
+                continue
+            cost = count_tokens(text, self.encoding_name) + (separator_tokens if kept else 0)
+            remaining = self.token_budget - used
+            if cost > remaining:
+                room = remaining - (separator_tokens if kept else 0)
+                if room > 0:
+                    kept.append(truncate_to_tokens(text, room, self.encoding_name))
+                    used += count_tokens(kept[-1], self.encoding_name) + (separator_tokens if len(kept) > 1 else 0)
+                truncated = True
+                break
+            kept.append(text)
+            used += cost
+
+        context = self.separator.join(kept)
+        stats = {
+            "chunks_retrieved": len(documents),
+            "chunks_used": len(kept),
+            "raw_tokens": count_tokens(self.separator.join(texts), self.encoding_name),
+            "context_tokens": count_tokens(context, self.encoding_name),
+            "truncated": int(truncated),
+        }
+        return context, stats
+
+
+# Global context assembler instance
+_context_assembler = None
+
+def get_context_assembler() -> ContextAssembler:
+    """Get the global context assembler configured from config.py"""
+    global _context_assembler
+    if _context_assembler is None:
+        try:
+            from config import CONTEXT_TOKEN_BUDGET, TOKEN_ENCODING, CONTEXT_MIN_OVERLAP_CHARS
+            _context_assembler = ContextAssembler(
+                token_budget=CONTEXT_TOKEN_BUDGET,
+                encoding_name=TOKEN_ENCODING,
+                min_overlap_chars=CONTEXT_MIN_OVERLAP_CHARS
+            )
+        except ImportError:
+            _context_assembler = ContextAssembler()
+    return _context_assembler
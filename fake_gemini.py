@@ -0,0 +1,208 @@
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from compact_schema import quality_codes
+from response_schema import schema_errors
+from context_builder import count_tokens
+from label_normalizer import PERSONALITY_QUALITIES
+
+# Fault profiles for the fake backend; unspecified settings use FakeGeminiBackend defaults
+FAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    "healthy": {},
+    "slow_tail": {"latency_median": 3.0, "latency_sigma": 0.9},
+    "quota_pressure": {"rate_429": 0.3},
+    "quota_exhausted": {"rate_429": 1.0},
+    "malformed_output": {"malformed_rate": 0.2, "truncated_rate": 0.1},
+    "model_missing": {"unavailable_models": ["gemini-2.5-flash", "gemini-2.0-flash"]},
+}
+
+
+class FakeGeminiError(Exception):
+    """Error raised by the fake backend; messages mimic the Gemini API so retry logic treats them alike"""
+
+
+def _corrupt(text: str, rng: random.Random) -> str:
+    """A malformed-but-recognisable version of a JSON response"""
+    corruptions = [
+        lambda t: f"Here is the assessment:\n```json\n{t}\n```",
+        lambda t: t.replace("}", ",}", 1).replace("]", ",]", 1),
+        lambda t: t.replace('"', "'"),
+        lambda t: t.replace('"', "“", 2),
+        lambda t: "I cannot assess this student reliably.",
+    ]
+    return rng.choice(corruptions)(text)
+
+
+class FakeGeminiBackend:
+    """In-process stand-in for the Gemini API with injectable faults.
+
+    Every call sleeps for a log-normal latency (``latency_median`` seconds,
+    spread ``latency_sigma``, all scaled by ``time_scale``), then fails with a
+    429 at ``rate_429``, with NotFound for ``unavailable_models``, or answers
+    with plausible assessment JSON that is malformed at ``malformed_rate`` or
+    cut off at ``truncated_rate``. Compact-format prompts get compact answers.
+    With a ``response_schema`` the answer is built from (and checked against)
+    the schema's enums, as Gemini's constrained decoding would, so it is never
+    malformed - only truncation can still cut it off. Counters in ``stats``
+    let scenarios measure wasted calls.
+    """
+
+    def __init__(self, latency_median: float = 1.5, latency_sigma: float = 0.3, rate_429: float = 0.0,
+                 unavailable_models: Optional[List[str]] = None, malformed_rate: float = 0.0,
+                 truncated_rate: float = 0.0, time_scale: float = 1.0, seed: Optional[int] = None,
+                 qualities: Optional[List[str]] = None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.rate_429 = rate_429
+        self.unavailable_models = set(unavailable_models or [])
+        self.malformed_rate = malformed_rate
+        self.truncated_rate = truncated_rate
+        self.time_scale = time_scale
+        self.qualities = list(qualities or PERSONALITY_QUALITIES)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    @classmethod
+    def from_profile(cls, profile: str, **overrides) -> "FakeGeminiBackend":
+        if profile not in FAULT_PROFILES:
+            raise ValueError(f"Unknown fault profile {profile!r}; expected one of {', '.join(FAULT_PROFILES)}")
+        return cls(**dict(FAULT_PROFILES[profile], **overrides))
+
+    def _count(self, *keys: str):
+        with self._lock:
+            self.stats.update(keys)
+
+    def _draw(self) -> Tuple[float, float, float]:
+        """Latency plus two uniform draws (fault, corruption) from the shared RNG"""
+        with self._lock:
+            latency = self.latency_median * math.exp(self.latency_sigma * self._rng.gauss(0, 1))
+            return latency * self.time_scale, self._rng.random(), self._rng.random()
+
+    def _answer(self, prompt: str) -> str:
+        with self._lock:
+            rng = random.Random(self._rng.random())
+        observed = rng.sample(self.qualities, rng.randint(2, 6))
+        levels = [rng.choice(["LOW", "MIDDLE", "HIGH"]) for _ in observed]
+        if "Quality codes:" in prompt:
+            codes = {quality: code for code, quality in quality_codes(self.qualities).items()}
+            payload = {"a": [[codes[q], l[0], "observed in class"] for q, l in zip(observed, levels)],
+                       "s": "Synthetic assessment."}
+            return json.dumps(payload)
+        items = [{"quality": q, "level": l, "reasoning": "Observed in class"} for q, l in zip(observed, levels)]
+        items += [{"quality": q, "level": "NOT OBSERVED", "reasoning": "No clear evidence observed"}
+                  for q in self.qualities if q not in observed]
+        return json.dumps({"assessments": items, "summary": "Synthetic assessment."}, indent=2)
+
+    def _schema_answer(self, schema: Dict[str, Any]) -> str:
+        item = schema["properties"]["assessments"]["items"]["properties"]
+        qualities, levels = item["quality"]["enum"], [l for l in item["level"]["enum"] if l != "NOT OBSERVED"]
+        with self._lock:
+            rng = random.Random(self._rng.random())
+        observed = rng.sample(qualities, min(len(qualities), rng.randint(2, 6)))
+        items = [{"quality": q, "level": rng.choice(levels), "reasoning": "Observed in class"} for q in observed]
+        items += [{"quality": q, "level": "NOT OBSERVED", "reasoning": "No clear evidence observed"}
+                  for q in qualities if q not in observed]
+        payload = {"assessments": items, "summary": "Synthetic assessment."}
+        errors = schema_errors(payload, schema)
+        if errors:
+            raise FakeGeminiError(f"400 Invalid response schema: {'; '.join(errors[:3])}")
+        return json.dumps(payload)
+
+    def respond(self, model: str, prompt: str,
+                response_schema: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, int], float]:
+        """(response text, usage metadata, latency) for one call, or raise the injected error"""
+        latency, fault, corruption = self._draw()
+        self._count("calls", f"calls:{model}")
+        if model in self.unavailable_models:
+            self._count("not_found")
+            raise FakeGeminiError(f"404 models/{model} is not found for API version v1beta, "
+                                  f"or is not supported for generateContent.")
+        time.sleep(latency)
+        if fault < self.rate_429:
+            self._count("errors_429")
+            raise FakeGeminiError("429 Resource has been exhausted (e.g. check quota).")
+
+        text = self._schema_answer(response_schema) if response_schema is not None else self._answer(prompt)
+        if corruption < self.truncated_rate:
+            self._count("truncated")
+            text = text[:max(1, int(len(text) * (0.3 + 0.6 * fault)))]
+        elif corruption < self.truncated_rate + self.malformed_rate and response_schema is None:
+            self._count("malformed")
+            with self._lock:
+                text = _corrupt(text, self._rng)
+        else:
+            self._count("ok")
+        usage = {"input_tokens": count_tokens(prompt), "output_tokens": count_tokens(text)}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        with self._lock:
+            self.stats.update({"input_tokens": usage["input_tokens"], "output_tokens": usage["output_tokens"]})
+        return text, usage, latency
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats)
+
+
+class FakeGeminiChatModel(BaseChatModel):
+    """Chat model served by the global FakeGeminiBackend (a drop-in for ChatGoogleGenerativeAI)"""
+
+    model_name: str = "gemini-2.5-flash"
+    stream_chunk_chars: int = 120
+    response_schema: Optional[Dict[str, Any]] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    @staticmethod
+    def _prompt_text(messages: List[BaseMessage]) -> str:
+        return "\n".join(m.content if isinstance(m.content, str) else str(m.content) for m in messages)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        text, usage, _ = get_fake_backend().respond(self.model_name, self._prompt_text(messages), self.response_schema)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        # The whole latency is spent before the first chunk; chunks then arrive back to back
+        text, usage, _ = get_fake_backend().respond(self.model_name, self._prompt_text(messages), self.response_schema)
+        pieces = [text[i:i + self.stream_chunk_chars] for i in range(0, len(text), self.stream_chunk_chars)] or [""]
+        for i, piece in enumerate(pieces):
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=piece, usage_metadata=usage if i == len(pieces) - 1 else None))
+
+
+# Global fake backend (used when LLM_BACKEND is "fake")
+_fake_backend = None
+_fake_backend_lock = threading.Lock()
+
+def get_fake_backend() -> FakeGeminiBackend:
+    """Get the global fake backend, built from FAKE_GEMINI_PROFILE on first use"""
+    global _fake_backend
+    with _fake_backend_lock:
+        if _fake_backend is None:
+            try:
+                from config import FAKE_GEMINI_PROFILE, FAKE_GEMINI_TIME_SCALE
+            except ImportError:
+                FAKE_GEMINI_PROFILE, FAKE_GEMINI_TIME_SCALE = "healthy", 1.0
+            _fake_backend = FakeGeminiBackend.from_profile(FAKE_GEMINI_PROFILE, time_scale=FAKE_GEMINI_TIME_SCALE)
+    return _fake_backend
+
+def configure_fake_backend(profile: str, **overrides) -> FakeGeminiBackend:
+    """Replace the global fake backend (fresh counters) with one built from a fault profile"""
+    global _fake_backend
+    backend = FakeGeminiBackend.from_profile(profile, **overrides)
+    with _fake_backend_lock:
+        _fake_backend = backend
+    return backend
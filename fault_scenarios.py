@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Fault-injection scenarios against the fake Gemini backend
+Runs the same batch through the real assessment path (rate limiter, retries,
+model routing, JSON repair, local fallback) once per fault profile and
+reports batch completion time and wasted model calls. No API key or quota
+is used. ``--formats prompt schema`` also compares format instructions in the
+prompt against native structured output (the fake backend enforces the
+response schema the way Gemini does).
+
+Usage:
+    python fault_scenarios.py                              # all profiles, 10 students
+    python fault_scenarios.py --profiles quota_pressure malformed_output --students 20
+    python fault_scenarios.py --time-scale 0.05 --json scenario_results.json
+    python fault_scenarios.py --profiles malformed_output --formats prompt schema
+"""
+
+import os
+import glob
+import json
+import time
+import argparse
+from typing import Any, Dict, List
+
+import pandas as pd
+
+import config
+from fake_gemini import FAULT_PROFILES, configure_fake_backend
+from json_repair import get_repair_stats
+
+
+def load_students(assessments_dir: str, limit: int) -> List[Dict[str, str]]:
+    """Students from the newest reviewed batch, repeated up to ``limit``"""
+    paths = sorted(glob.glob(os.path.join(assessments_dir, "batch_assessment_*.csv")), key=os.path.getmtime)
+    observations = []
+    if paths:
+        df = pd.read_csv(paths[-1])
+        observations = [str(o) for o in df["Observations"].dropna() if str(o).strip()]
+    if not observations:
+        observations = ["Student was quiet but completed the worksheet carefully and helped a classmate."]
+    return [{"id": f"student_{i + 1}", "name": f"Student {i + 1}", "observations": observations[i % len(observations)]}
+            for i in range(limit)]
+
+
+def run_scenario(system, profile: str, students: List[Dict[str, str]], time_scale: float, seed: int,
+                 response_format: str = "prompt") -> Dict[str, Any]:
+    """Assess the batch under one fault profile ("prompt" format instructions or native "schema" output)"""
+    config.USE_NATIVE_RESPONSE_SCHEMA = response_format == "schema"
+    backend = configure_fake_backend(profile, time_scale=time_scale, seed=seed)
+    system.model_router.probe()  # forget models marked unavailable by the previous scenario
+    repair_before = get_repair_stats().snapshot()
+
+    start = time.perf_counter()
+    results = system.batch_assess_students(students)
+    elapsed = time.perf_counter() - start
+
+    outcomes = {"llm": 0, "local": 0, "failed": 0}
+    for record in results:
+        assessment = record.get("assessment") or {}
+        if record.get("error") or assessment.get("error"):
+            outcomes["failed"] += 1
+        elif str(assessment.get("source", "")).startswith(("local", "label")):
+            outcomes["local"] += 1
+        else:
+            outcomes["llm"] += 1
+
+    stats = backend.get_status()
+    repair_after = get_repair_stats().snapshot()
+    calls = stats.get("calls", 0)
+    return {
+        "profile": profile,
+        "format": response_format,
+        "students": len(students),
+        "seconds": round(elapsed, 2),
+        "seconds_per_student": round(elapsed / max(1, len(students)), 3),
+        "model_calls": calls,
+        "wasted_calls": calls - outcomes["llm"],
+        "errors_429": stats.get("errors_429", 0),
+        "not_found": stats.get("not_found", 0),
+        "malformed": stats.get("malformed", 0),
+        "truncated": stats.get("truncated", 0),
+        "repaired": repair_after["repaired"] - repair_before["repaired"],
+        "prompt_tokens_per_call": round(stats.get("input_tokens", 0) / max(1, stats.get("ok", 0) + stats.get("malformed", 0)
+                                                                       + stats.get("truncated", 0))),
+        "output_tokens": stats.get("output_tokens", 0),
+        **outcomes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure batch behaviour under injected Gemini faults")
+    parser.add_argument("--profiles", nargs="+", default=list(FAULT_PROFILES), choices=list(FAULT_PROFILES))
+    parser.add_argument("--students", type=int, default=10)
+    parser.add_argument("--formats", nargs="+", default=["prompt"], choices=["prompt", "schema"],
+                        help="Response formats to compare: format instructions in the prompt, or a native response schema")
+    parser.add_argument("--time-scale", type=float, default=0.1,
+                        help="Scale for simulated latency, RATE_LIMIT_DELAY and RETRY_DELAY")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", default=None, help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    # Route every model call to the fake backend and shrink waits for quick runs
+    config.LLM_BACKEND = "fake"
+    config.LLM_CASSETTE_MODE = "off"
+    config.RATE_LIMIT_DELAY *= args.time_scale
+    config.RETRY_DELAY *= args.time_scale
+
+    from personality_assessment import PersonalityAssessmentSystem
+    system = PersonalityAssessmentSystem()
+    system.setup_vector_database()
+
+    students = load_students(config.ASSESSMENTS_DIR, args.students)
+    results = [run_scenario(system, profile, students, args.time_scale, args.seed, fmt)
+               for profile in args.profiles for fmt in args.formats]
+
+    print("\nFault scenario results")
+    print("=" * 112)
+    print(f"{'profile':<18}{'format':<8}{'seconds':>9}{'s/student':>11}{'calls':>7}{'wasted':>8}{'429':>6}"
+          f"{'404':>6}{'bad':>6}{'fixed':>7}{'prompt tok':>12}{'llm':>6}{'local':>7}{'failed':>8}")
+    for r in results:
+        print(f"{r['profile']:<18}{r['format']:<8}{r['seconds']:>9.2f}{r['seconds_per_student']:>11.3f}{r['model_calls']:>7}"
+              f"{r['wasted_calls']:>8}{r['errors_429']:>6}{r['not_found']:>6}{r['malformed'] + r['truncated']:>6}"
+              f"{r['repaired']:>7}{r['prompt_tokens_per_call']:>12}{r['llm']:>6}{r['local']:>7}{r['failed']:>8}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
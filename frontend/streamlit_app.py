@@ -3,6 +3,8 @@ import pandas as pd
 import json
 import os
 import sys
+import time
+import uuid
 from datetime import datetime
 
 # Ensure project root is on sys.path so sibling packages import correctly
@@ -13,7 +15,13 @@ if _PROJECT_ROOT not in sys.path:
 
 from ai_core.personality_assessment import PersonalityAssessmentSystem
 from ai_core.csv_reference_processor import CSVReferenceProcessor
-import re
+from ai_core.assessment_result import BatchAssessments
+from ai_core.assessment_analytics import AssessmentHistory
+from ai_core.json_repair import get_repair_stats
+from ai_core.usage_ledger import estimate_batch, get_usage_ledger
+from ai_core.batch_export import result_source
+from backend.job_queue import FINISHED_STATES, JOB_COMPLETED, get_job_manager
+from backend.assessment_client import AssessmentServiceClient
 from config import PERSONALITY_QUALITIES
 
 # Page configuration
@@ -37,6 +45,42 @@ if 'review_df' not in st.session_state:
     st.session_state.review_df = None
 if 'saved_batch_json' not in st.session_state:
     st.session_state.saved_batch_json = None
+if 'saved_batch_exports' not in st.session_state:
+    st.session_state.saved_batch_exports = {}
+if 'assessment_history' not in st.session_state:
+    st.session_state.assessment_history = None
+if 'active_job_id' not in st.session_state:
+    st.session_state.active_job_id = None
+if 'loaded_job_id' not in st.session_state:
+    st.session_state.loaded_job_id = None
+if 'submitted_job_ids' not in st.session_state:
+    st.session_state.submitted_job_ids = []
+if 'session_id' not in st.session_state:
+    # Batches from one session share a fair-share flow in the priority scheduler
+    st.session_state.session_id = uuid.uuid4().hex[:12]
+if 'job_auto_refresh' not in st.session_state:
+    st.session_state.job_auto_refresh = False
+if 'review_page' not in st.session_state:
+    st.session_state.review_page = 1
+if 'review_page_editor' not in st.session_state:
+    st.session_state.review_page_editor = None
+
+def get_service_url():
+    """Assessment service URL from the environment or config (empty means in-process)."""
+    try:
+        from config import ASSESSMENT_SERVICE_URL
+    except ImportError:
+        ASSESSMENT_SERVICE_URL = ""
+    return os.getenv("ASSESSMENT_SERVICE_URL", ASSESSMENT_SERVICE_URL)
+
+def using_service():
+    return isinstance(st.session_state.assessment_system, AssessmentServiceClient)
+
+def job_backend():
+    """Where batch jobs live: the shared service, or this process's job manager."""
+    if using_service():
+        return st.session_state.assessment_system
+    return get_job_manager()
 
 def main():
     st.title("🎓 Personality Assessment System for Students")
@@ -46,23 +90,41 @@ def main():
     with st.sidebar:
         st.header("⚙️ System Setup")
         
-        # Check API key
-        api_key = st.text_input("Google API Key", type="password", help="Enter your Google API key for Gemini")
-        
-        if api_key:
-            os.environ["GOOGLE_API_KEY"] = api_key
-            
-            if st.button("🚀 Initialize System", type="primary"):
-                with st.spinner("Setting up the assessment system..."):
+        service_url = get_service_url()
+        if service_url:
+            # Shared local service: models, index and rate limiter live in one backend process
+            st.caption(f"Assessment service: {service_url}")
+            if st.button("🔌 Connect to Service", type="primary"):
+                with st.spinner("Connecting to the assessment service..."):
                     try:
-                        system = PersonalityAssessmentSystem()
-                        system.setup_vector_database()
-                        st.session_state.assessment_system = system
+                        client = AssessmentServiceClient(service_url)
+                        health = client.health()
+                        if not health.get('ready'):
+                            raise RuntimeError(health.get('error') or "service is still initializing")
+                        st.session_state.assessment_system = client
                         st.session_state.system_ready = True
-                        st.success("✅ System initialized successfully!")
+                        st.success("✅ Connected to assessment service!")
                     except Exception as e:
-                        st.error(f"❌ Setup failed: {str(e)}")
+                        st.error(f"❌ Connection failed: {str(e)}")
                         st.session_state.system_ready = False
+        else:
+            # Check API key
+            api_key = st.text_input("Google API Key", type="password", help="Enter your Google API key for Gemini")
+            
+            if api_key:
+                os.environ["GOOGLE_API_KEY"] = api_key
+                
+                if st.button("🚀 Initialize System", type="primary"):
+                    with st.spinner("Setting up the assessment system..."):
+                        try:
+                            system = PersonalityAssessmentSystem()
+                            system.setup_vector_database()
+                            st.session_state.assessment_system = system
+                            st.session_state.system_ready = True
+                            st.success("✅ System initialized successfully!")
+                        except Exception as e:
+                            st.error(f"❌ Setup failed: {str(e)}")
+                            st.session_state.system_ready = False
         
         # System status
         if st.session_state.system_ready:
@@ -72,9 +134,12 @@ def main():
         
         # Rate limiting status
         try:
-            from backend.rate_limiter import get_rate_limiter
-            rate_limiter = get_rate_limiter()
-            status = rate_limiter.get_status()
+            if using_service():
+                status = st.session_state.assessment_system.get_status()['rate_limiter']
+            else:
+                from backend.rate_limiter import get_rate_limiter
+                rate_limiter = get_rate_limiter()
+                status = rate_limiter.get_status()
             
             st.markdown("---")
             st.markdown("### 🚦 Rate Limiting Status")
@@ -88,14 +153,49 @@ def main():
                 st.warning("⚠️ Approaching rate limit")
             elif status['daily_requests'] >= status['max_per_day'] * 0.8:
                 st.warning("⚠️ Approaching daily limit")
+            
+            # Per-key health when several API keys are pooled
+            if status.get('keys'):
+                healthy = sum(1 for k in status['keys'] if k['healthy'])
+                st.caption(f"🔑 {healthy}/{len(status['keys'])} API keys healthy")
+                for k in status['keys']:
+                    state = "✅" if k['healthy'] else f"⏸️ {k['disabled_reason']} ({k['disabled_for']:.0f}s)"
+                    st.caption(f"`{k['key']}` {state} · {k['calls']} calls · {k['rate_limited']} × 429")
         except Exception as e:
             st.info("Rate limiting status unavailable")
         
+        # Circuit breaker: open means Gemini calls fail fast to the local tier / deferred retry
+        try:
+            if using_service():
+                circuit = st.session_state.assessment_system.get_status().get('circuit')
+            else:
+                from ai_core.circuit_breaker import get_circuit_breaker
+                circuit = get_circuit_breaker().get_status() if get_circuit_breaker() is not None else None
+            if circuit:
+                if circuit['state'] == "open":
+                    st.error(f"🔴 Gemini circuit open — retrying in {circuit['retry_after']:.0f}s; "
+                             "students use the local tier or are deferred")
+                    if circuit['last_error']:
+                        st.caption(f"Last error: {circuit['last_error'][:120]}")
+                elif circuit['state'] == "half_open":
+                    st.warning("🟡 Gemini circuit half-open — probing")
+                else:
+                    st.caption(f"🟢 Gemini circuit closed ({circuit['consecutive_failures']}/"
+                               f"{circuit['failure_threshold']} recent failures)")
+        except Exception:
+            pass
+        
         st.markdown("---")
         st.markdown("### 📊 Quick Stats")
         if st.session_state.system_ready:
+            if using_service():
+                st.info("Connected to shared assessment service")
             st.info("Vector database loaded with reference data")
-            st.info("Using Gemini 2.x + Hugging Face All-MiniLM-L6-v2")
+            if using_service():
+                st.info("Using Gemini 2.x + Hugging Face All-MiniLM-L6-v2")
+            else:
+                model = st.session_state.assessment_system.model_router.primary_model() or "no usable Gemini model"
+                st.info(f"Using {model} + Hugging Face All-MiniLM-L6-v2")
         else:
             st.info("System needs initialization")
     
@@ -105,7 +205,7 @@ def main():
         return
     
     # Main tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["🔍 Individual Assessment", "👥 Batch Assessment", "📁 Export Template", "📋 System Info"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["🔍 Individual Assessment", "👥 Batch Assessment", "📈 Analytics", "📁 Export Template", "📋 System Info"])
     
     with tab1:
         individual_assessment_tab()
@@ -114,10 +214,18 @@ def main():
         batch_assessment_tab()
     
     with tab3:
-        export_template_tab()
+        analytics_tab()
     
     with tab4:
+        export_template_tab()
+    
+    with tab5:
         system_info_tab()
+    
+    # Poll running background jobs without blocking the rest of the page
+    if st.session_state.job_auto_refresh:
+        time.sleep(2)
+        st.rerun()
 
 def individual_assessment_tab():
     st.header("🔍 Individual Student Assessment")
@@ -178,6 +286,8 @@ def batch_assessment_tab():
             st.subheader("📋 Data Preview")
             st.dataframe(df.head(), width='stretch')
             
+            render_batch_estimate(df)
+            
             if st.button("🚀 Start Batch Assessment", type="primary"):
                 process_batch_assessment(df)
                 
@@ -191,6 +301,9 @@ def batch_assessment_tab():
     if st.button("📝 Create Entry Form"):
         manual_batch_form(num_students)
 
+    st.markdown("---")
+    render_job_panel()
+
     st.markdown("---")
     st.subheader("🧐 Review Session")
     col_a, col_b = st.columns([1, 1])
@@ -205,11 +318,90 @@ def batch_assessment_tab():
             st.session_state.batch_results = None
             st.session_state.batch_timestamp = None
             st.session_state.saved_batch_json = None
+            st.session_state.saved_batch_exports = {}
+            st.session_state.review_page = 1
+            st.session_state.review_page_editor = None
             st.rerun()
 
     if st.session_state.review_df is not None:
         render_review_interface()
 
+def analytics_tab():
+    st.header("📈 Assessment Analytics")
+    
+    # Keep one columnar history per session; refresh() only reads new/changed batch files
+    if st.session_state.assessment_history is None:
+        st.session_state.assessment_history = AssessmentHistory()
+    history = st.session_state.assessment_history
+    
+    try:
+        history.refresh()
+    except Exception as e:
+        st.error(f"❌ Could not load assessment history: {str(e)}")
+        return
+    
+    summary = history.summary()
+    if summary['students'] == 0:
+        st.info("No batch assessments found yet. Run a batch assessment to populate analytics.")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Batches", summary['batches'])
+    with col2:
+        st.metric("Students", summary['students'])
+    with col3:
+        st.metric("Reviewed", summary['reviewed_students'])
+    with col4:
+        st.metric("Failed", summary['failed_students'])
+    
+    col_a, col_b = st.columns(2)
+    with col_a:
+        source = st.radio(
+            "Labels",
+            options=["predicted", "final"],
+            format_func=lambda x: "Predicted (model)" if x == "predicted" else "Final (reviewed)",
+            horizontal=True
+        )
+    with col_b:
+        cohort_by = st.radio(
+            "Cohort",
+            options=["batch", "date"],
+            format_func=lambda x: "Per batch" if x == "batch" else "Per day",
+            horizontal=True
+        )
+    
+    st.subheader("📊 Label Distribution by Quality")
+    distribution = history.label_distribution(source)
+    st.bar_chart(distribution)
+    st.dataframe(distribution, width='stretch')
+    
+    st.subheader("🎚️ Level Distribution")
+    st.dataframe(history.level_distribution(source).rename("Labels").to_frame().T, width='stretch')
+    
+    st.subheader("👥 Labelled Students per Cohort")
+    level_filter = st.selectbox("Level", ["All levels", "LOW", "MIDDLE", "HIGH"])
+    cohorts = history.cohort_distribution(
+        source=source,
+        cohort_by=cohort_by,
+        level=None if level_filter == "All levels" else level_filter
+    )
+    st.dataframe(cohorts, width='stretch')
+    
+    st.subheader("🤝 Predicted vs Final Agreement")
+    overall = history.overall_agreement()
+    if overall['reviewed_students'] == 0:
+        st.info("No reviewed batches yet. Finalize a review session to measure agreement.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Reviewed Students", overall['reviewed_students'])
+        with col2:
+            st.metric("Unchanged Rows", f"{overall['exact_match_rate']:.0%}")
+        with col3:
+            st.metric("Label Agreement", f"{overall['label_agreement_rate']:.0%}")
+        st.dataframe(history.agreement(), width='stretch')
+
 def export_template_tab():
     st.header("📁 Export Reference Sheet Template")
     
@@ -276,123 +468,297 @@ def system_info_tab():
             st.info(f"📁 Assessment files: {assessment_files}")
         else:
             st.info("📁 Assessment files: 0")
+        
+        st.subheader("🩹 JSON Repair")
+        try:
+            if using_service():
+                repair = st.session_state.assessment_system.get_status().get('json_repair', {})
+            else:
+                repair = get_repair_stats().snapshot()
+            if repair.get('responses'):
+                rcol1, rcol2, rcol3 = st.columns(3)
+                rcol1.metric("Responses", repair['responses'])
+                rcol2.metric("Needed Repair", repair['repair_attempts'])
+                rate = repair['repair_success_rate']
+                rcol3.metric("Repair Success", f"{rate:.0%}" if rate is not None else "n/a")
+                if repair['steps']:
+                    st.caption("Repairs applied: " + ", ".join(f"{k} ({v})" for k, v in sorted(repair['steps'].items())))
+            else:
+                st.info("No model responses parsed yet")
+        except Exception:
+            st.info("Repair statistics unavailable")
+        
+        st.subheader("💰 Token Usage (24h)")
+        try:
+            if using_service():
+                usage = st.session_state.assessment_system.get_status().get('usage') or {}
+            else:
+                ledger = get_usage_ledger()
+                usage = ledger.summary() if ledger is not None else {}
+            if usage.get('assessments'):
+                ucol1, ucol2, ucol3 = st.columns(3)
+                ucol1.metric("Assessments", usage['assessments'])
+                ucol2.metric("Tokens", f"{usage['prompt_tokens'] + usage['output_tokens']:,}")
+                ucol3.metric("Cost", f"${usage['cost_usd']:.4f}")
+                st.caption(f"{usage['llm_calls']} Gemini calls, {usage['retries']} retries, "
+                           f"{usage['fallback_calls']} fallback calls")
+            else:
+                st.info("No assessments recorded in the last 24 hours")
+        except Exception:
+            st.info("Usage ledger unavailable")
+
+def streaming_enabled():
+    """Stream individual assessments when running the assessment system in-process"""
+    try:
+        from config import ENABLE_STREAMING_ASSESSMENT
+    except ImportError:
+        ENABLE_STREAMING_ASSESSMENT = False
+    return ENABLE_STREAMING_ASSESSMENT and not using_service() and hasattr(st.session_state.assessment_system, 'stream_student_personality')
+
+def stream_assessment(observations):
+    """Run a streamed assessment, showing each quality as soon as it is generated"""
+    st.caption("🔍 Analyzing student behavior and assessing personality traits...")
+    live = st.container()
+    result = None
+    for event in st.session_state.assessment_system.stream_student_personality(observations):
+        if event['type'] == 'item':
+            item = event['item']
+            with live:
+                st.write(f"**{item.get('quality', '')}**: {item.get('level', '')}")
+        elif event['type'] == 'aborted':
+            with live:
+                st.warning(f"⚠️ Streaming stopped early ({event['reason']}); retrying without streaming...")
+        elif event['type'] == 'result':
+            result = event['result']
+    return result or {"error": "No assessment returned", "observations": observations}
 
 def perform_assessment(student_name, observations):
     """Perform individual student assessment"""
     try:
-        with st.spinner("🔍 Analyzing student behavior and assessing personality traits..."):
-            result = st.session_state.assessment_system.assess_student_personality(observations)
+        if streaming_enabled():
+            result = stream_assessment(observations)
+        else:
+            with st.spinner("🔍 Analyzing student behavior and assessing personality traits..."):
+                result = st.session_state.assessment_system.assess_student_personality(observations)
         
-        # Display results
-        st.subheader(f"📊 Assessment Results for {student_name}")
+        render_assessment_result(student_name, observations, result)
+    except Exception as e:
+        st.error(f"❌ Assessment failed: {str(e)}")
+
+def render_assessment_result(student_name, observations, result):
+    """Display (and save) a completed individual assessment"""
+    # Display results
+    st.subheader(f"📊 Assessment Results for {student_name}")
+    
+    if result.get('error'):
+        error_msg = result['error']
+        if "429" in error_msg and "quota" in error_msg.lower():
+            st.error("❌ Rate limit exceeded! Please wait a moment and try again.")
+            st.info("💡 Tips to avoid rate limits:")
+            st.info("• Wait 1-2 minutes between assessments")
+            st.info("• Consider upgrading to a paid API plan")
+            st.info("• Use batch processing for multiple students")
+        else:
+            st.error(f"❌ Assessment failed: {error_msg}")
+        return
+    
+    if result.get('raw_response'):
+        st.warning("⚠️ Raw response received (JSON parsing failed)")
+        st.code(result['raw_response'])
+        return
+    
+    if result.get('source') == 'local_triage':
+        st.info(f"🧭 Assessed locally from the reference sheet (confidence {result.get('confidence', 0):.0%}), without a Gemini call")
+        if result.get('fallback_reason'):
+            st.warning(f"⚠️ Gemini unavailable: {result['fallback_reason']}")
+    elif result.get('source') == 'label_model':
+        st.info(f"🧠 Predicted by the local label model trained on reviewed assessments (confidence {result.get('confidence', 0):.0%}), without a Gemini call")
+        if result.get('fallback_reason'):
+            st.warning(f"⚠️ Gemini unavailable: {result['fallback_reason']}")
+    
+    if result.get('assessments'):
+        # Group assessments by level
+        levels = ['HIGH', 'MIDDLE', 'LOW', 'NOT OBSERVED']
+        grouped = {level: [] for level in levels}
         
-        if result.get('error'):
-            error_msg = result['error']
-            if "429" in error_msg and "quota" in error_msg.lower():
-                st.error("❌ Rate limit exceeded! Please wait a moment and try again.")
-                st.info("💡 Tips to avoid rate limits:")
-                st.info("• Wait 1-2 minutes between assessments")
-                st.info("• Consider upgrading to a paid API plan")
-                st.info("• Use batch processing for multiple students")
-            else:
-                st.error(f"❌ Assessment failed: {error_msg}")
-            return
+        for assessment in result['assessments']:
+            grouped.setdefault(assessment['level'], []).append(assessment)
         
-        if result.get('raw_response'):
-            st.warning("⚠️ Raw response received (JSON parsing failed)")
-            st.code(result['raw_response'])
-            return
+        # Display in columns
+        cols = st.columns(4)
+        for i, level in enumerate(levels):
+            with cols[i]:
+                st.metric(
+                    label=level,
+                    value=len(grouped[level]),
+                    delta=f"{len(grouped[level])} qualities"
+                )
         
-        if result.get('assessments'):
-            # Group assessments by level
-            levels = ['HIGH', 'MIDDLE', 'LOW', 'NOT OBSERVED']
-            grouped = {level: [] for level in levels}
-            
-            for assessment in result['assessments']:
-                grouped[assessment['level']].append(assessment)
-            
-            # Display in columns
-            cols = st.columns(4)
-            for i, level in enumerate(levels):
-                with cols[i]:
-                    st.metric(
-                        label=level,
-                        value=len(grouped[level]),
-                        delta=f"{len(grouped[level])} qualities"
-                    )
-            
-            # Detailed breakdown
-            st.subheader("📋 Detailed Assessment")
-            for level in levels:
-                if grouped[level]:
-                    with st.expander(f"{level} ({len(grouped[level])} qualities)"):
-                        for assessment in grouped[level]:
-                            st.write(f"**{assessment['quality']}**")
-                            if assessment.get('reasoning'):
-                                st.write(f"*{assessment['reasoning']}*")
-                            st.divider()
-            
-            # Summary
-            if result.get('summary'):
-                st.subheader("📝 Overall Summary")
-                st.info(result['summary'])
-            
-            # Save assessment
-            save_assessment(student_name, observations, result)
-        else:
-            st.warning("No assessment data available")
-            
+        # Detailed breakdown
+        st.subheader("📋 Detailed Assessment")
+        for level in levels:
+            if grouped[level]:
+                with st.expander(f"{level} ({len(grouped[level])} qualities)"):
+                    for assessment in grouped[level]:
+                        st.write(f"**{assessment['quality']}**")
+                        if assessment.get('reasoning'):
+                            st.write(f"*{assessment['reasoning']}*")
+                        st.divider()
+        
+        # Summary
+        if result.get('summary'):
+            st.subheader("📝 Overall Summary")
+            st.info(result['summary'])
+        
+        # Save assessment
+        save_assessment(student_name, observations, result)
+    else:
+        st.warning("No assessment data available")
+
+def render_batch_estimate(df):
+    """Pre-flight tokens, cost and time for a batch, from recent usage and the rate limits"""
+    if 'Observations' not in df.columns:
+        return
+    try:
+        estimate = estimate_batch(df['Observations'].tolist())
     except Exception as e:
-        st.error(f"❌ Assessment failed: {str(e)}")
+        st.info(f"Batch estimate unavailable: {e}")
+        return
+    st.subheader("🧮 Batch Estimate")
+    ecol1, ecol2, ecol3, ecol4 = st.columns(4)
+    ecol1.metric("Gemini Calls", f"~{estimate['llm_calls']}")
+    ecol2.metric("Tokens", f"~{estimate['prompt_tokens'] + estimate['output_tokens']:,}")
+    ecol3.metric("Est. Cost", f"~${estimate['cost_usd']:.2f}")
+    ecol4.metric("Est. Time", f"~{estimate['seconds'] / 60:.0f} min")
+    st.caption(f"Based on {estimate['basis']} with {estimate['model']}: "
+               f"{estimate['prompt_tokens']:,} prompt + {estimate['output_tokens']:,} output tokens")
+    if estimate['exceeds_daily_quota']:
+        st.warning(f"⚠️ This batch needs more requests than the {estimate['daily_quota_remaining']} left in today's quota")
 
 def process_batch_assessment(df):
-    """Process batch assessment from CSV"""
+    """Submit a batch assessment from CSV as a background job"""
     try:
-        results = []
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
+        students = []
         for idx, row in df.iterrows():
-            status_text.text(f"Assessing {row['Name']} ({idx + 1}/{len(df)})")
-            
-            try:
-                result = st.session_state.assessment_system.assess_student_personality(row['Observations'])
-                results.append({
-                    'student_id': f"student_{idx+1}",
-                    'name': row['Name'],
-                    'observations': row['Observations'],
-                    'assessment': result
-                })
-            except Exception as e:
-                results.append({
-                    'student_id': f"student_{idx+1}",
-                    'name': row['Name'],
-                    'observations': row.get('Observations', ''),
-                    'error': str(e)
-                })
-            
-            progress_bar.progress((idx + 1) / len(df))
+            students.append({
+                'id': f"student_{idx+1}",
+                'name': row['Name'],
+                'observations': row.get('Observations', '')
+            })
         
-        # Persist results to session and render review UI
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        st.session_state.batch_results = results
-        st.session_state.batch_timestamp = timestamp
-
-        os.makedirs("assessments", exist_ok=True)
-        filename = f"batch_assessment_{timestamp}.json"
-        with open(f"assessments/{filename}", 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
-        st.session_state.saved_batch_json = filename
-
-        # Build and persist review dataframe
-        st.session_state.review_df = build_review_dataframe(results)
-
-        # Trigger rerun so the tab renders the review interface once
+        # The job runs on a worker thread, so reruns and refreshes no longer interrupt it
+        label = f"{len(students)} students ({datetime.now().strftime('%H:%M')})"
+        if using_service():
+            job_id = st.session_state.assessment_system.submit(students, label=label, owner=st.session_state.session_id)
+        else:
+            job_id = get_job_manager().submit(st.session_state.assessment_system, students, label=label,
+                                              owner=st.session_state.session_id)
+        st.session_state.active_job_id = job_id
+        st.session_state.submitted_job_ids.append(job_id)
         st.rerun()
         
     except Exception as e:
         st.error(f"❌ Batch assessment failed: {str(e)}")
 
+def load_job_into_review(job_id):
+    """Load a finished (or partial) job's results into the review session"""
+    snapshot = job_backend().snapshot(job_id, include_results=True)
+    if snapshot is None:
+        st.error(f"❌ Job {job_id} not found")
+        return
+    results = snapshot['results']
+    export_paths = snapshot['export_paths']
+    
+    # Persist results to session and render review UI
+    st.session_state.batch_results = results
+    st.session_state.batch_timestamp = snapshot.get('export_stem') or snapshot['timestamp']
+    st.session_state.saved_batch_exports = export_paths
+    st.session_state.saved_batch_json = os.path.basename(export_paths['json']) if 'json' in export_paths else None
+
+    # Build and persist review dataframe
+    st.session_state.review_df = build_review_dataframe(results)
+    st.session_state.review_page = 1
+    st.session_state.review_page_editor = None
+    st.session_state.loaded_job_id = job_id
+
+def render_job_panel():
+    """Show background batch jobs: progress, partial results, cancel and reattach."""
+    st.subheader("⏳ Batch Jobs")
+    st.session_state.job_auto_refresh = False
+    manager = job_backend()
+    jobs = manager.list_jobs()
+    
+    # Reattach to any job in this server process (e.g. after a browser refresh)
+    if jobs:
+        job_ids = [j['job_id'] for j in jobs]
+        current = st.session_state.active_job_id
+        selected = st.selectbox(
+            "Job",
+            job_ids,
+            index=job_ids.index(current) if current in job_ids else 0,
+            format_func=lambda jid: next(f"{j['job_id']} · {j['label']} · {j['status']}" for j in jobs if j['job_id'] == jid)
+        )
+        if selected != current:
+            st.session_state.active_job_id = selected
+            current = selected
+    else:
+        st.info("No batch jobs yet. Start a batch assessment to create one.")
+        return
+    
+    snapshot = manager.snapshot(current) if current else None
+    if snapshot is None:
+        st.warning("Selected job is no longer available.")
+        st.session_state.active_job_id = None
+        return
+    
+    st.progress(snapshot['progress'])
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("Status", snapshot['status'].title())
+    with col2:
+        st.metric("Assessed", f"{snapshot['completed']}/{snapshot['total']}")
+    with col3:
+        st.metric("Failed", snapshot['failed'])
+    with col4:
+        st.metric("Deferred", snapshot.get('deferred', 0),
+                  help="Students put off while Gemini is unavailable; retried once the circuit breaker allows calls.")
+    with col5:
+        if snapshot['started_at']:
+            end = snapshot['finished_at'] or time.time()
+            st.metric("Elapsed", f"{end - snapshot['started_at']:.0f}s")
+    if snapshot['current_student']:
+        st.caption(f"Assessing {snapshot['current_student']}...")
+    elif snapshot.get('deferred') and snapshot['status'] not in FINISHED_STATES:
+        st.caption(f"⏸️ Waiting for Gemini to recover before retrying {snapshot['deferred']} deferred students...")
+    if snapshot['error']:
+        st.error(f"❌ Batch assessment failed: {snapshot['error']}")
+    
+    if snapshot['status'] not in FINISHED_STATES:
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            if st.button("🔄 Refresh Progress"):
+                st.rerun()
+        with col_b:
+            if st.button("⏹️ Cancel Job", disabled=snapshot['cancel_requested']):
+                manager.cancel(current)
+                st.rerun()
+        with col_c:
+            # Polling happens at the end of main() so the other tabs still render
+            st.session_state.job_auto_refresh = st.toggle("Auto-refresh", value=True)
+        return
+    
+    # Finished: this session's completed jobs load straight into review once;
+    # other sessions' jobs and partial results load on request
+    if st.session_state.loaded_job_id != current:
+        if snapshot['status'] == JOB_COMPLETED and current in st.session_state.submitted_job_ids:
+            load_job_into_review(current)
+            st.rerun()
+        elif snapshot['completed'] and st.button(
+            "📥 Review Results" if snapshot['status'] == JOB_COMPLETED else "📥 Review Partial Results"
+        ):
+            load_job_into_review(current)
+            st.rerun()
+
 def manual_batch_form(num_students):
     """Create manual batch entry form"""
     st.subheader(f"✏️ Manual Entry for {num_students} Students")
@@ -416,26 +782,144 @@ def manual_batch_form(num_students):
 def build_review_dataframe(results):
     """Construct review dataframe from batch results."""
     review_rows = []
-    for r in results:
-        name_val = r.get('name', '')
-        obs_val = r.get('observations', '')
-        if r.get('error'):
-            predicted = []
-        else:
-            predicted = extract_predicted_labels(r.get('assessment', {}))
+    # Canonical assessments (from jobs and the parser) are reused; only raw dicts are normalized here
+    predicted_lists = BatchAssessments.from_records(results).label_lists()
+    for r, predicted in zip(results, predicted_lists):
+        source, fallback_reason = result_source(r)
         review_rows.append({
-            'Name': name_val,
-            'Observations': obs_val,
+            'Name': r.get('name', ''),
+            'Observations': r.get('observations', ''),
+            'Source': source,
+            'Fallback Reason': fallback_reason,
             'Predicted Labels': predicted,
             'Final Labels': list(predicted),
             'Approved': False
         })
     return pd.DataFrame(review_rows)
 
+def review_column_config():
+    """Column configuration shared by the full and paginated review editors."""
+    return {
+        "Source": st.column_config.TextColumn(
+            help="Where the predicted labels came from: llm (Gemini), local_triage or label_model.",
+            disabled=True
+        ),
+        "Fallback Reason": st.column_config.TextColumn(
+            help="Why Gemini was bypassed for this row, if it was.",
+            disabled=True
+        ),
+        "Predicted Labels": st.column_config.ListColumn(
+            help="Model-predicted labels (quality-level).",
+            width="medium"
+        ),
+        "Final Labels": st.column_config.ListColumn(
+            help="Edit labels as needed before approval.",
+            width="medium"
+        ),
+        "Approved": st.column_config.CheckboxColumn(help="Tick after reviewing this row.")
+    }
+
+def filter_review_rows(review_df, unapproved_only=False, quality=None, level=None, name_query=""):
+    """Return the row IDs (index labels) of review_df matching the server-side filters."""
+    mask = pd.Series(True, index=review_df.index)
+    if unapproved_only:
+        mask &= ~review_df["Approved"].astype(bool)
+    if name_query and name_query.strip():
+        mask &= review_df["Name"].astype(str).str.contains(name_query.strip(), case=False, regex=False)
+    if quality or level:
+        quality_key = quality.lower().replace(' ', '-') if quality else None
+        level_key = level.lower() if level else None
+
+        def _matches(labels):
+            for label in labels or []:
+                q, _, lvl = str(label).rpartition('-')
+                if (quality_key is None or q == quality_key) and (level_key is None or lvl == level_key):
+                    return True
+            return False
+
+        mask &= review_df["Final Labels"].apply(_matches)
+    return review_df.index[mask]
+
+def merge_review_edits(review_df, edited_rows, row_ids):
+    """Apply data_editor edits (keyed by page position) to review_df by row ID."""
+    for position, changes in (edited_rows or {}).items():
+        position = int(position)
+        if position >= len(row_ids):
+            continue
+        row_id = row_ids[position]
+        if row_id not in review_df.index:
+            continue
+        for column, value in changes.items():
+            if column in review_df.columns:
+                review_df.at[row_id, column] = value
+    return review_df
+
+def render_review_page(timestamp):
+    """Render one filtered page of the review table and merge edits back into the session store."""
+    review_df = st.session_state.review_df
+    try:
+        from config import REVIEW_PAGE_SIZE
+    except ImportError:
+        REVIEW_PAGE_SIZE = 25
+
+    # Apply edits made on the previously rendered page before re-filtering, so rows
+    # that drop out of the filter (e.g. just approved) keep their changes
+    previous = st.session_state.review_page_editor
+    if previous:
+        editor_state = st.session_state.get(previous["key"])
+        if editor_state:
+            merge_review_edits(review_df, editor_state.get("edited_rows"), previous["row_ids"])
+
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 2])
+    with col1:
+        unapproved_only = st.checkbox("Unapproved only", value=False)
+    with col2:
+        quality = st.selectbox("Quality", ["All qualities"] + list(PERSONALITY_QUALITIES))
+    with col3:
+        level = st.selectbox("Level", ["All levels", "LOW", "MIDDLE", "HIGH"], key="review_level_filter")
+    with col4:
+        name_query = st.text_input("Search name", placeholder="Type part of a student's name")
+
+    matching = filter_review_rows(
+        review_df,
+        unapproved_only=unapproved_only,
+        quality=None if quality == "All qualities" else quality,
+        level=None if level == "All levels" else level,
+        name_query=name_query
+    )
+    total_pages = max(1, -(-len(matching) // REVIEW_PAGE_SIZE))
+    page = st.number_input("Page", min_value=1, max_value=total_pages,
+                           value=min(st.session_state.review_page, total_pages), step=1)
+    st.session_state.review_page = int(page)
+    start = (int(page) - 1) * REVIEW_PAGE_SIZE
+    row_ids = list(matching[start:start + REVIEW_PAGE_SIZE])
+    approved_count = int(review_df["Approved"].sum())
+    st.caption(f"Showing {len(row_ids)} of {len(matching)} matching rows "
+               f"(page {int(page)}/{total_pages}) · {approved_count}/{len(review_df)} approved")
+
+    # A new widget key whenever the page's rows change keeps positional edits aligned with row IDs
+    editor_key = f"review_page_{timestamp}_{abs(hash(tuple(row_ids)))}"
+    page_df = review_df.loc[row_ids]
+    st.data_editor(
+        page_df,
+        key=editor_key,
+        width='stretch',
+        num_rows="fixed",
+        disabled=["Name", "Observations", "Source", "Fallback Reason", "Predicted Labels"],
+        column_config=review_column_config()
+    )
+    editor_state = st.session_state.get(editor_key)
+    if editor_state:
+        merge_review_edits(review_df, editor_state.get("edited_rows"), row_ids)
+    st.session_state.review_page_editor = {"key": editor_key, "row_ids": row_ids}
+    st.session_state.review_df = review_df
+
+    return review_df, [int(i) for i in row_ids]
+
 def render_review_interface():
     """Render the persistent reviewer interface using session state."""
     results = st.session_state.batch_results or []
-    timestamp = st.session_state.batch_timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = st.session_state.batch_timestamp or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     review_df = st.session_state.review_df
     if review_df is not None and 'Error' in review_df.columns:
         review_df = review_df.drop(columns=['Error'])
@@ -453,28 +937,55 @@ def render_review_interface():
         if st.session_state.saved_batch_json:
             st.info(f"Saved JSON: {st.session_state.saved_batch_json}")
 
+    export_mimes = {
+        'parquet': ("⬇️ Download Parquet", "application/octet-stream"),
+        'excel': ("⬇️ Download Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    }
+    exports = {
+        fmt: path for fmt, path in (st.session_state.saved_batch_exports or {}).items()
+        if fmt in export_mimes and os.path.exists(path)
+    }
+    if exports:
+        export_cols = st.columns(len(exports))
+        for col, (fmt, path) in zip(export_cols, exports.items()):
+            with col:
+                label, mime = export_mimes[fmt]
+                with open(path, "rb") as ef:
+                    st.download_button(label=label, data=ef.read(), file_name=os.path.basename(path), mime=mime, key=f"download_{fmt}")
+
     st.markdown("---")
     st.subheader("🧐 Review and Approve Predicted Labels")
     show_debug = st.toggle("Show raw assessments (debug)", value=False)
 
-    edited_df = st.data_editor(
-        review_df,
-        key=f"review_editor_{timestamp}",
-        width='stretch',
-        num_rows="fixed",
-        column_config={
-            "Predicted Labels": st.column_config.ListColumn(
-                help="Model-predicted labels (quality-level).",
-                width="medium"
-            ),
-            "Final Labels": st.column_config.ListColumn(
-                help="Edit labels as needed before approval.",
-                width="medium"
-            ),
-            "Approved": st.column_config.CheckboxColumn(help="Tick after reviewing this row.")
-        }
+    try:
+        from config import REVIEW_PAGINATION_THRESHOLD
+    except ImportError:
+        REVIEW_PAGINATION_THRESHOLD = 50
+    paginated = st.toggle(
+        "Paginated review",
+        value=len(review_df) > REVIEW_PAGINATION_THRESHOLD,
+        help="Only send one filtered page of rows to the browser. Recommended for large batches."
     )
 
+    full_editor_key = f"review_editor_{timestamp}"
+    if paginated:
+        # Edits made in the full editor before switching modes go into the session store first;
+        # dropping its state keeps them from being applied again over later page edits
+        editor_state = st.session_state.pop(full_editor_key, None)
+        if editor_state:
+            merge_review_edits(review_df, editor_state.get("edited_rows"), list(review_df.index))
+            st.session_state.review_df = review_df
+        edited_df, debug_rows = render_review_page(timestamp)
+    else:
+        edited_df = st.data_editor(
+            review_df,
+            key=full_editor_key,
+            width='stretch',
+            num_rows="fixed",
+            column_config=review_column_config()
+        )
+        debug_rows = range(len(results))
+
     all_approved = bool(len(edited_df) > 0 and edited_df["Approved"].all())
     if not all_approved:
         st.info("Review rows and tick 'Approved' for each before finalizing.")
@@ -482,7 +993,10 @@ def render_review_interface():
     if show_debug and results:
         st.markdown("---")
         with st.expander("Raw assessment data by row"):
-            for i, r in enumerate(results):
+            for i in debug_rows:
+                if i >= len(results):
+                    continue
+                r = results[i]
                 st.write(f"Row {i+1}: {r.get('name','')}")
                 if r.get('error'):
                     st.error(r.get('error'))
@@ -492,12 +1006,15 @@ def render_review_interface():
                     st.warning("No assessment returned for this row.")
 
     if st.button("✅ Finalize & Download CSV", type="primary", disabled=not all_approved):
-        # Persist final edits once
+        # Persist final edits once (paginated mode already edits the session store in place)
         st.session_state.review_df = edited_df
         export_df = edited_df[["Name", "Observations", "Final Labels"]].copy()
         export_df["Predicted Labels"] = edited_df["Predicted Labels"].apply(lambda x: json.dumps(x, ensure_ascii=False))
         export_df["Final Labels"] = export_df["Final Labels"].apply(lambda x: json.dumps(x, ensure_ascii=False))
-        export_df = export_df[["Name", "Observations", "Predicted Labels", "Final Labels"]]
+        # Reviews loaded before the Source column existed export it empty
+        for column in ("Source", "Fallback Reason"):
+            export_df[column] = edited_df[column] if column in edited_df.columns else ""
+        export_df = export_df[["Name", "Observations", "Source", "Fallback Reason", "Predicted Labels", "Final Labels"]]
 
         csv_bytes = export_df.to_csv(index=False).encode('utf-8')
         csv_name = f"batch_assessment_{timestamp}.csv"
@@ -514,69 +1031,6 @@ def render_review_interface():
             mime="text/csv"
         )
 
-def _normalize_quality(text: str, allowed: set) -> str:
-    t = text.lower().strip()
-    # keep letters and spaces
-    t = re.sub(r"[^a-z\s]", " ", t)
-    # collapse spaces and hyphenate
-    t = "-".join([p for p in t.split() if p])
-    if t in allowed:
-        return t
-    # token overlap fallback
-    tokens = set(t.split("-"))
-    best = None
-    best_score = 0
-    for a in allowed:
-        score = len(tokens.intersection(set(a.split("-"))))
-        if score > best_score:
-            best, best_score = a, score
-    return best if best and best_score > 0 else ""
-
-def extract_predicted_labels(assessment_result):
-    """Return normalized labels in 'quality-level' format, filtering invalid/duplicate entries."""
-    # Allowed levels mapping
-    level_map = {
-        'low': 'low',
-        'middle': 'middle',
-        'mid': 'middle',
-        'medium': 'middle',
-        'high': 'high',
-        'not observed': 'not observed',
-        'not_observed': 'not observed',
-        'notobserved': 'not observed',
-        'na': 'not observed',
-        'n/a': 'not observed'
-    }
-    # Allowed qualities set (normalized hyphen-case) from config
-    allowed_qualities = set([q.lower().replace(' ', '-') for q in PERSONALITY_QUALITIES])
-    try:
-        items = assessment_result.get('assessments', [])
-    except AttributeError:
-        return []
-    labels = []
-    for item in items:
-        try:
-            q_raw = str(item.get('quality', ''))
-            q_norm = _normalize_quality(q_raw, allowed_qualities)
-            l_raw = str(item.get('level', '')).strip().lower()
-            # extract clean level even if noisy text like "Level: HIGH" or "high." etc.
-            m = re.search(r"low|middle|mid|medium|high|not\s*observed|n/?a", l_raw)
-            key = m.group(0) if m else l_raw
-            key = key.replace('  ', ' ').replace('_', ' ')
-            l_norm = level_map.get(key, level_map.get(key.strip(), key.strip()))
-            if q_norm in allowed_qualities and l_norm in ('low', 'middle', 'high'):
-                labels.append(f"{q_norm}-{l_norm}")
-        except Exception:
-            continue
-    # Deduplicate while preserving order
-    seen = set()
-    deduped = []
-    for lab in labels:
-        if lab not in seen:
-            seen.add(lab)
-            deduped.append(lab)
-    return deduped
-
 def save_assessment(student_name, observations, result):
     """Save individual assessment to file"""
     try:
@@ -0,0 +1,144 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+from rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a model call does not finish before its deadline"""
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 1) -> Optional[float]:
+        """Latency at the given percentile, or None with too few samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+class HedgedInvoker:
+    """Run model calls with a hard deadline and optional hedging.
+
+    The call runs on a worker thread so the caller can stop waiting when the
+    deadline passes. With hedging enabled, a call still running after the
+    observed ``hedge_percentile`` latency triggers one duplicate call (same or
+    faster model); whichever finishes first wins. Each hedge takes a rate
+    limiter slot without waiting, and is skipped when none is free, so hedges
+    never push the app past its quota. Abandoned calls cannot be killed; they
+    finish in the background and are bounded by the client's own timeout.
+    """
+
+    def __init__(self, hedging: bool = False, hedge_percentile: float = 95, hedge_min_samples: int = 20,
+                 hedge_min_delay: float = 5.0, max_workers: int = 16):
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-call")
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "deadline_exceeded": 0, "hedges_fired": 0, "hedges_won": 0, "hedges_skipped_quota": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None if hedging is off or not yet calibrated"""
+        if not self.hedging:
+            return None
+        observed = self.latency.percentile(self.hedge_percentile, self.hedge_min_samples)
+        if observed is None:
+            return None
+        return max(self.hedge_min_delay, observed)
+
+    def _timed(self, fn: Callable[[], Any]):
+        start = time.perf_counter()
+        result = fn()
+        self.latency.record(time.perf_counter() - start)
+        return result
+
+    def invoke(self, call: Callable[[], Any], timeout: float, hedge: Optional[Callable[[], Any]] = None) -> Any:
+        """Return the first successful result, or raise DeadlineExceeded after ``timeout`` seconds"""
+        self._count("calls")
+        deadline = time.monotonic() + timeout
+        primary = self._executor.submit(self._timed, call)
+        pending = {primary}
+
+        delay = self.hedge_delay() if hedge is not None else None
+        if delay is not None and delay < timeout:
+            done, _ = wait(pending, timeout=delay)
+            if not done:
+                if get_rate_limiter().try_acquire():
+                    self._count("hedges_fired")
+                    logger.info(f"Model call exceeded {delay:.1f}s; sending hedged request")
+                    pending.add(self._executor.submit(self._timed, hedge))
+                else:
+                    self._count("hedges_skipped_quota")
+
+        error = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self._count("hedges_won")
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        self._count("deadline_exceeded")
+        raise DeadlineExceeded(f"Model call did not finish within {timeout:.1f} seconds")
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            status = dict(self.stats)
+        status["p50_latency"] = self.latency.percentile(50)
+        status["hedge_delay"] = self.hedge_delay()
+        return status
+
+
+# Global hedged invoker instance
+_hedged_invoker = None
+_hedged_invoker_lock = threading.Lock()
+
+def get_hedged_invoker() -> HedgedInvoker:
+    """Get the global invoker configured from config.py"""
+    global _hedged_invoker
+    with _hedged_invoker_lock:
+        if _hedged_invoker is None:
+            try:
+                from config import (ENABLE_HEDGED_REQUESTS, HEDGE_LATENCY_PERCENTILE, HEDGE_MIN_SAMPLES,
+                                    HEDGE_MIN_DELAY, MODEL_CALL_THREADS)
+                _hedged_invoker = HedgedInvoker(
+                    hedging=ENABLE_HEDGED_REQUESTS,
+                    hedge_percentile=HEDGE_LATENCY_PERCENTILE,
+                    hedge_min_samples=HEDGE_MIN_SAMPLES,
+                    hedge_min_delay=HEDGE_MIN_DELAY,
+                    max_workers=MODEL_CALL_THREADS
+                )
+            except ImportError:
+                _hedged_invoker = HedgedInvoker()
+    return _hedged_invoker
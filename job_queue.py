@@ -0,0 +1,300 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from assessment_result import BatchAssessments
+from batch_export import BatchExportSession
+from priority_scheduler import PRIORITIES, PRIORITY_BATCH, scheduling
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+
+def is_deferred(record: Dict[str, Any]) -> bool:
+    """True for a result the circuit breaker put off (Gemini down, no local result to fall back on)"""
+    assessment = record.get('assessment')
+    return isinstance(assessment, dict) and bool(assessment.get('deferred'))
+
+
+def assess_student_record(system, student: Dict[str, Any], index: int,
+                          local_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Assess one student and return the batch result record used across the app"""
+    student_id = student.get('id') or f"student_{index+1}"
+    name = student.get('name', f'Student {index+1}')
+    observations = student.get('observations', '')
+    if not observations:
+        return {
+            'student_id': student_id,
+            'name': name,
+            'observations': observations,
+            'error': "No observations provided"
+        }
+    try:
+        if local_result is not None:
+            result = system.assess_student_personality(observations, local_result=local_result)
+        else:
+            result = system.assess_student_personality(observations)
+        return {
+            'student_id': student_id,
+            'name': name,
+            'observations': observations,
+            'assessment': result
+        }
+    except Exception as e:
+        return {
+            'student_id': student_id,
+            'name': name,
+            'observations': observations,
+            'error': str(e)
+        }
+
+
+class BatchJob:
+    """State of one background batch assessment"""
+
+    def __init__(self, job_id: str, students: List[Dict[str, Any]], label: Optional[str] = None,
+                 owner: Optional[str] = None, priority: str = PRIORITY_BATCH, weight: float = 1.0):
+        self.job_id = job_id
+        self.label = label or f"{len(students)} students"
+        self.owner = owner
+        self.priority = priority
+        self.weight = weight
+        self.students = students
+        self.status = JOB_QUEUED
+        self.total = len(students)
+        # Students with a final result; some may still be held back from results to keep student order
+        self.completed = 0
+        # Students put off by the circuit breaker and not answered yet
+        self.deferred = 0
+        self.current_student = None
+        # Normalized once on arrival; snapshots rebuild the legacy records
+        self.results = BatchAssessments(capacity=len(students))
+        self.error = None
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # File stem for exports and the reviewed CSV; the job ID keeps same-second jobs apart
+        self.export_stem = f"{self.timestamp}_{job_id}"
+        self.export_paths: Dict[str, str] = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+
+    def snapshot(self, include_results: bool = False, since: int = 0) -> Dict[str, Any]:
+        """Copy of the job state that is safe to hand to another thread or session"""
+        with self.lock:
+            snap = {
+                'job_id': self.job_id,
+                'label': self.label,
+                'priority': self.priority,
+                'status': self.status,
+                'total': self.total,
+                'completed': self.completed,
+                'progress': (self.completed / self.total) if self.total else 1.0,
+                'current_student': self.current_student,
+                'failed': self.results.failed_count(),
+                'deferred': self.deferred,
+                'error': self.error,
+                'timestamp': self.timestamp,
+                'export_stem': self.export_stem,
+                'export_paths': dict(self.export_paths),
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'cancel_requested': self.cancel_event.is_set(),
+            }
+            if include_results:
+                snap['results'] = self.results.records(since)
+                snap['results_offset'] = since
+        return snap
+
+
+class JobManager:
+    """Run batch assessments on worker threads, independent of Streamlit script reruns"""
+
+    def __init__(self, max_workers: int = 2, history_limit: int = 50):
+        self.max_workers = max_workers
+        self.history_limit = history_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-job")
+        self._jobs: Dict[str, BatchJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, system, students: List[Dict[str, Any]], label: Optional[str] = None,
+               export: bool = True, on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+               owner: Optional[str] = None, priority: str = PRIORITY_BATCH, weight: float = 1.0) -> str:
+        """Queue a batch for background assessment and return its job ID.
+
+        Jobs with the same ``owner`` (e.g. a Streamlit session) form one fair-share flow
+        in the priority scheduler; ``weight`` scales that flow's share.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {', '.join(PRIORITIES)}")
+        job = BatchJob(uuid.uuid4().hex[:12], students, label, owner=owner, priority=priority, weight=weight)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        self._executor.submit(self._run, job, system, export, on_result)
+        return job.job_id
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.status in FINISHED_STATES]
+        excess = len(self._jobs) - self.history_limit
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(0, excess)]:
+            del self._jobs[job.job_id]
+
+    def _run(self, job: BatchJob, system, export: bool, on_result):
+        with job.lock:
+            if job.cancel_event.is_set():
+                job.status = JOB_CANCELLED
+                job.finished_at = time.time()
+                return
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+
+        export_session = None
+        try:
+            # Inside the try: an unwritable export directory fails the job instead of the worker thread
+            export_session = BatchExportSession(job.export_stem) if export else None
+            with scheduling(job.priority, flow=job.owner or job.job_id, weight=job.weight):
+                self._assess_students(job, system, export_session, on_result)
+        except Exception as e:
+            with job.lock:
+                job.error = str(e)
+                job.status = JOB_FAILED
+        finally:
+            paths = export_session.close() if export_session is not None else {}
+            with job.lock:
+                job.export_paths = paths
+                job.current_student = None
+                if job.status == JOB_RUNNING:
+                    job.status = JOB_CANCELLED if job.cancel_event.is_set() else JOB_COMPLETED
+                job.finished_at = time.time()
+
+    def _assess_students(self, job: BatchJob, system, export_session, on_result):
+        # In "route" mode local triage scores the whole class in one pass when the system supports it
+        if hasattr(system, 'batch_local_results'):
+            local_results = system.batch_local_results([s.get('observations', '') for s in job.students])
+        else:
+            local_results = [None] * len(job.students)
+        # Results reach the job, the export and on_result in student order: a deferred
+        # student holds back the students after it until its retry settles
+        deferred, held, next_index = [], {}, 0
+        for idx, student in enumerate(job.students):
+            if job.cancel_event.is_set():
+                break
+            with job.lock:
+                job.current_student = student.get('name', f'Student {idx+1}')
+            record = assess_student_record(system, student, idx, local_results[idx])
+            if is_deferred(record):
+                # Retried once the circuit allows calls again
+                retry_at = time.time() + float(record['assessment'].get('retry_after') or 0)
+                deferred.append((retry_at, idx, student, record))
+                with job.lock:
+                    job.deferred += 1
+                continue
+            with job.lock:
+                job.completed += 1
+            held[idx] = record
+            next_index = self._release(job, held, next_index, export_session, on_result)
+
+        for retry_at, idx, student, record in deferred:
+            wait = retry_at - time.time()
+            if not job.cancel_event.is_set() and wait > 0:
+                with job.lock:
+                    job.current_student = None
+                job.cancel_event.wait(wait)
+            if not job.cancel_event.is_set():
+                with job.lock:
+                    job.current_student = student.get('name', f'Student {idx+1}')
+                record = assess_student_record(system, student, idx, local_results[idx])
+                if not is_deferred(record):
+                    with job.lock:
+                        job.deferred -= 1
+            # Still-deferred (or cancelled) students keep their deferred result
+            with job.lock:
+                job.completed += 1
+            held[idx] = record
+            next_index = self._release(job, held, next_index, export_session, on_result)
+        # Students after a cancellation were never assessed; the rest go out in order
+        for idx in sorted(held):
+            self._add_result(job, held[idx], export_session, on_result)
+
+    def _release(self, job: BatchJob, held: Dict[int, Dict[str, Any]], next_index: int,
+                 export_session, on_result) -> int:
+        """Add held results from ``next_index`` up to the first missing student; returns that student's index"""
+        while next_index in held:
+            self._add_result(job, held.pop(next_index), export_session, on_result)
+            next_index += 1
+        return next_index
+
+    def _add_result(self, job: BatchJob, record: Dict[str, Any], export_session, on_result):
+        if export_session is not None:
+            export_session.write(record)
+        with job.lock:
+            job.results.append(record)
+        if on_result is not None:
+            try:
+                on_result(record)
+            except Exception as e:
+                print(f"Job {job.job_id} result callback failed: {e}")
+
+    def _get(self, job_id: str) -> Optional[BatchJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def snapshot(self, job_id: str, include_results: bool = False, since: int = 0) -> Optional[Dict[str, Any]]:
+        """Status, progress and (optionally) results of a job, or None if unknown"""
+        job = self._get(job_id)
+        return job.snapshot(include_results=include_results, since=since) if job else None
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation; the worker stops before the next student"""
+        job = self._get(job_id)
+        if job is None:
+            return False
+        with job.lock:
+            if job.status in FINISHED_STATES:
+                return False
+            job.cancel_event.set()
+        return True
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Snapshots of all known jobs, newest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j.snapshot() for j in sorted(jobs, key=lambda j: j.created_at, reverse=True)]
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll_interval: float = 0.5) -> Optional[Dict[str, Any]]:
+        """Block until a job finishes (or the timeout expires) and return its snapshot"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            snap = self.snapshot(job_id)
+            if snap is None or snap['status'] in FINISHED_STATES:
+                return snap
+            if deadline is not None and time.time() >= deadline:
+                return snap
+            time.sleep(poll_interval)
+
+
+# Global job manager instance (shared by every Streamlit session in this process)
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+def get_job_manager() -> JobManager:
+    """Get the global job manager instance"""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            try:
+                from config import JOB_WORKERS, JOB_HISTORY_LIMIT
+                _job_manager = JobManager(max_workers=JOB_WORKERS, history_limit=JOB_HISTORY_LIMIT)
+            except ImportError:
+                _job_manager = JobManager()
+    return _job_manager
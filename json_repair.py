@@ -0,0 +1,254 @@
+import json
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from label_normalizer import INVALID_ID, LEVEL_NAMES, get_label_normalizer
+from compact_schema import expand_compact_result
+
+
+class RepairError(ValueError):
+    """Raised when a model response cannot be repaired into a valid assessment"""
+
+
+_FENCE = re.compile(r"```[a-zA-Z]*[ \t]*\r?\n?(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+# 'value' in a structural position (after { [ , : and before , : } ])
+_SINGLE_QUOTED = re.compile(r"([{\[,:]\s*)'((?:[^'\\]|\\.)*)'(?=\s*[,:}\]])")
+_PY_LITERALS = re.compile(r"(:\s*)(None|True|False)\b")
+_JSON_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+# bare key in a structural position (after { or , and before :)
+_UNQUOTED_KEY = re.compile(r"([{,]\s*)([A-Za-z_][\w-]*)(\s*:)")
+_PY_JSON = {"None": "null", "True": "true", "False": "false"}
+
+
+def _loads(text: str) -> Optional[Any]:
+    try:
+        # strict=False accepts raw newlines inside strings
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return None
+
+
+def _strip_fences(text: str) -> str:
+    if "```" not in text:
+        return text
+    m = _FENCE.search(text)
+    return m.group(1) if m else text
+
+
+def _extract_object(text: str) -> str:
+    """Outermost {...} object; runs to the end of the text if it was cut off"""
+    start = text.find("{")
+    if start == -1:
+        raise RepairError("No JSON object in response")
+    depth, in_string, escape = 0, False, False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def _single_quotes(text: str) -> str:
+    def _requote(m):
+        inner = m.group(2).replace("\\'", "'").replace('"', '\\"')
+        return f'{m.group(1)}"{inner}"'
+    return _SINGLE_QUOTED.sub(_requote, text)
+
+
+def _quote_keys(text: str) -> str:
+    """Quote bare object keys, leaving the contents of strings alone"""
+    parts, last = [], 0
+    for m in _JSON_STRING.finditer(text):
+        parts.append(_UNQUOTED_KEY.sub(r'\1"\2"\3', text[last:m.start()]))
+        parts.append(m.group(0))
+        last = m.end()
+    parts.append(_UNQUOTED_KEY.sub(r'\1"\2"\3', text[last:]))
+    return "".join(parts)
+
+
+def _close_truncated(text: str) -> str:
+    """Close an unterminated string and any open arrays/objects of a cut-off response"""
+    stack, in_string, escape = [], False, False
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    if not stack:
+        return text
+    # Drop a dangling comma or a key that never got its value
+    text = re.sub(r'(,\s*"[^"]*"\s*:?\s*|,\s*)$', "", text.rstrip())
+    return text + "".join(reversed(stack))
+
+
+_TEXT_REPAIRS = [
+    ("smart_quotes", lambda t: t.translate(_SMART_QUOTES)),
+    ("trailing_commas", lambda t: _TRAILING_COMMA.sub(r"\1", t)),
+    ("single_quotes", _single_quotes),
+    ("unquoted_keys", _quote_keys),
+    ("python_literals", lambda t: _PY_LITERALS.sub(lambda m: m.group(1) + _PY_JSON[m.group(2)], t)),
+    ("close_truncated", _close_truncated),
+]
+
+
+def _parse_json(text: str, steps: List[str]) -> Any:
+    """Apply text repairs in order until the response parses"""
+    stripped = _strip_fences(text)
+    if stripped != text:
+        steps.append("strip_fences")
+    extracted = _extract_object(stripped)
+    if extracted.strip() != stripped.strip():
+        steps.append("extract_object")
+    candidate = extracted
+    payload = _loads(candidate)
+    for name, repair in _TEXT_REPAIRS:
+        if payload is not None:
+            break
+        repaired = repair(candidate)
+        if repaired != candidate:
+            steps.append(name)
+            candidate = repaired
+            payload = _loads(candidate)
+    if payload is None:
+        raise RepairError("Response is not valid JSON after repair")
+    return payload
+
+
+def _coerce(payload: Any, qualities: Optional[List[str]], steps: List[str]) -> Dict[str, Any]:
+    """Map whatever the model returned onto {"assessments": [...], "summary": "..."}"""
+    if isinstance(payload, list):
+        payload = {"assessments": payload}
+        steps.append("wrap_list")
+    if not isinstance(payload, dict):
+        raise RepairError("Response JSON is not an object")
+    if "assessments" not in payload and "a" in payload:
+        steps.append("expand_compact")
+        return expand_compact_result(payload, qualities)
+
+    items = payload.get("assessments")
+    if items is None:
+        # e.g. "Assessments", "assessment", "results"
+        for key, value in payload.items():
+            if isinstance(value, list) and key.lower().startswith(("assess", "result", "qualit")):
+                items = value
+                steps.append("rename_assessments")
+                break
+    if not isinstance(items, list):
+        raise RepairError("No assessments list in response")
+
+    normalizer = get_label_normalizer()
+    assessments, coerced = [], False
+    for item in items:
+        if not isinstance(item, dict):
+            coerced = True
+            continue
+        q_id = normalizer.quality_id(str(item.get("quality", "")))
+        l_id = normalizer.level_id(str(item.get("level", "")))
+        if q_id == INVALID_ID or l_id == INVALID_ID:
+            coerced = True
+            continue
+        quality, level = normalizer.qualities[q_id], LEVEL_NAMES[l_id]
+        reasoning = item.get("reasoning")
+        coerced = coerced or quality != item.get("quality") or level != item.get("level") or not isinstance(reasoning, str)
+        assessments.append({"quality": quality, "level": level, "reasoning": "" if reasoning is None else str(reasoning)})
+    if coerced:
+        steps.append("coerce_items")
+    if not assessments:
+        raise RepairError("No recognisable assessment items in response")
+    summary = payload.get("summary")
+    return {"assessments": assessments, "summary": "" if summary is None else str(summary)}
+
+
+def repair_assessment_json(text: str, qualities: Optional[List[str]] = None, model=None) -> Tuple[Dict[str, Any], List[str]]:
+    """Repair a raw model response into an assessment dict without another LLM call.
+
+    Returns (assessment, repair steps applied). ``model`` (e.g. AssessmentResult)
+    validates the result when given. Raises RepairError if the text is beyond repair.
+    """
+    steps: List[str] = []
+    result = _coerce(_parse_json(text or "", steps), qualities, steps)
+    if model is not None:
+        try:
+            result = model(**result).model_dump()
+        except Exception as e:
+            raise RepairError(f"Repaired response failed validation: {e}") from e
+    return result, steps
+
+
+class RepairStats:
+    """Thread-safe counters for how often local repair saves a second LLM call"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clean = 0
+        self.repaired = 0
+        self.failed = 0
+        self.steps = Counter()
+
+    def record_clean(self):
+        with self.lock:
+            self.clean += 1
+
+    def record(self, success: bool, steps: List[str]):
+        with self.lock:
+            if success:
+                self.repaired += 1
+            else:
+                self.failed += 1
+            self.steps.update(steps)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            attempts = self.repaired + self.failed
+            total = self.clean + attempts
+            return {
+                "responses": total,
+                "clean": self.clean,
+                "repair_attempts": attempts,
+                "repaired": self.repaired,
+                "failed": self.failed,
+                "repair_success_rate": (self.repaired / attempts) if attempts else None,
+                "parse_failure_rate": (attempts / total) if total else None,
+                "steps": dict(self.steps),
+            }
+
+
+# Global repair statistics
+_repair_stats = None
+_repair_stats_lock = threading.Lock()
+
+def get_repair_stats() -> RepairStats:
+    """Get the global JSON repair statistics"""
+    global _repair_stats
+    with _repair_stats_lock:
+        if _repair_stats is None:
+            _repair_stats = RepairStats()
+    return _repair_stats
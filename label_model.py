@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Supervised local label model
+One-vs-rest logistic regression (NumPy) over MiniLM embeddings of
+observations, trained on the human-approved Final Labels of reviewed
+batch_assessment_*.csv files. Predicts quality-level labels in milliseconds
+on CPU, so it can pre-fill labels or stand in for a Gemini call.
+
+Usage:
+    python label_model.py train [--holdout 0.2]
+    python label_model.py predict students.csv [--out prefilled.csv]
+"""
+
+import os
+import glob
+import json
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from label_normalizer import LEVEL_NAMES, NOT_OBSERVED, PERSONALITY_QUALITIES, LabelNormalizer
+from assessment_analytics import _parse_label_cell, labels_to_level_codes
+
+_LEVELS_PER_QUALITY = 3  # LOW, MIDDLE, HIGH (level IDs 1..3)
+
+
+def _is_local_source(source: Any) -> bool:
+    """True for labels produced by the local tier rather than Gemini or a person"""
+    return pd.notna(source) and str(source).strip() not in ("", "llm")
+
+
+def load_reviewed_examples(assessments_dir: str) -> Tuple[List[str], np.ndarray]:
+    """Observations and their final level codes (n, qualities) from reviewed CSVs.
+
+    Files are read oldest first, so a student reviewed again later keeps the
+    newest labels. Rows the local tier labelled (Source ``local_triage`` or
+    ``label_model``) and the reviewer approved unedited are skipped, so the
+    model never retrains on its own or triage's predictions.
+    """
+    examples: Dict[str, np.ndarray] = {}
+    paths = sorted(glob.glob(os.path.join(assessments_dir, "batch_assessment_*.csv")), key=os.path.getmtime)
+    for path in paths:
+        try:
+            df = pd.read_csv(path)
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        if "Observations" not in df.columns or "Final Labels" not in df.columns:
+            continue
+        sources = df["Source"] if "Source" in df.columns else [None] * len(df)
+        predicted = df["Predicted Labels"] if "Predicted Labels" in df.columns else [None] * len(df)
+        for observations, final, source, prior in zip(df["Observations"], df["Final Labels"], sources, predicted):
+            text = str(observations).strip() if pd.notna(observations) else ""
+            if not text:
+                continue
+            codes = labels_to_level_codes(_parse_label_cell(final))
+            if (_is_local_source(source) and prior is not None
+                    and np.array_equal(codes, labels_to_level_codes(_parse_label_cell(prior)))):
+                continue
+            examples[text] = codes
+    texts = list(examples)
+    codes = np.stack([examples[t] for t in texts]) if texts else np.zeros((0, len(PERSONALITY_QUALITIES)), dtype=np.int8)
+    return texts, codes
+
+
+def level_codes_to_targets(codes: np.ndarray) -> np.ndarray:
+    """One-hot (n, qualities * 3) targets; column q * 3 + (level - 1)"""
+    n, q = codes.shape
+    targets = np.zeros((n, q * _LEVELS_PER_QUALITY), dtype=np.float32)
+    rows, cols = np.nonzero(codes)
+    targets[rows, cols * _LEVELS_PER_QUALITY + codes[rows, cols] - 1] = 1.0
+    return targets
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+def calibration_metrics(probs: np.ndarray, targets: np.ndarray, bins: int = 10, threshold: float = 0.5) -> Dict[str, Any]:
+    """Brier score, log loss, expected calibration error and micro P/R/F1 over all label columns"""
+    p, y = probs.ravel(), targets.ravel()
+    eps = 1e-7
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    bin_ids = np.clip(np.digitize(p, edges[1:-1]), 0, bins - 1)
+    counts = np.bincount(bin_ids, minlength=bins)
+    conf = np.bincount(bin_ids, weights=p, minlength=bins)
+    hits = np.bincount(bin_ids, weights=y, minlength=bins)
+    nonempty = counts > 0
+    ece = float(np.sum(np.abs(conf[nonempty] - hits[nonempty])) / max(1, len(p)))
+    pred = p >= threshold
+    tp = float(np.sum(pred & (y == 1)))
+    precision = tp / max(1.0, float(pred.sum()))
+    recall = tp / max(1.0, float(y.sum()))
+    return {
+        "brier": float(np.mean((p - y) ** 2)),
+        "log_loss": float(-np.mean(y * np.log(p + eps) + (1 - y) * np.log(1 - p + eps))),
+        "ece": ece,
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / max(eps, precision + recall),
+        "reliability": [
+            {"bin": f"{edges[i]:.1f}-{edges[i + 1]:.1f}", "count": int(counts[i]),
+             "mean_confidence": float(conf[i] / counts[i]), "observed_rate": float(hits[i] / counts[i])}
+            for i in range(bins) if counts[i]
+        ],
+    }
+
+
+class LabelModel:
+    """One-vs-rest logistic regression over observation embeddings.
+
+    One sigmoid output per (quality, level). All outputs are trained together
+    with full-batch gradient descent and L2 regularisation; labels with fewer
+    than ``min_positive`` examples are never predicted.
+    """
+
+    def __init__(self, embeddings=None, qualities: Optional[List[str]] = None, l2: float = 1e-3,
+                 learning_rate: float = 0.5, epochs: int = 500, min_positive: int = 2, threshold: float = 0.5):
+        self.embeddings = embeddings
+        self.qualities = list(qualities or PERSONALITY_QUALITIES)
+        self.l2 = l2
+        self.learning_rate = learning_rate
+        self.epochs = epochs
+        self.min_positive = min_positive
+        self.threshold = threshold
+        self.weights = None      # (dim, qualities * 3)
+        self.bias = None         # (qualities * 3,)
+        self.active = None       # bool mask of trained label columns
+        self.metadata: Dict[str, Any] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.weights is not None
+
+    def label_names(self) -> List[str]:
+        normalizer = LabelNormalizer(self.qualities)
+        return [normalizer.label(q_id, level) for q_id in range(len(self.qualities))
+                for level in range(1, _LEVELS_PER_QUALITY + 1)]
+
+    def embed(self, observations: List[str]) -> np.ndarray:
+        vectors = np.asarray(self.embeddings.embed_documents(list(observations)), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def fit(self, features: np.ndarray, targets: np.ndarray) -> "LabelModel":
+        """Train on embedded features (n, dim) and one-hot targets (n, qualities * 3)"""
+        n, dim = features.shape
+        self.active = targets.sum(axis=0) >= self.min_positive
+        # Start from the label base rates so rare labels begin near their prior
+        rate = np.clip(targets.mean(axis=0), 1e-3, 1 - 1e-3)
+        self.bias = np.log(rate / (1 - rate)).astype(np.float32)
+        self.weights = np.zeros((dim, targets.shape[1]), dtype=np.float32)
+        for _ in range(self.epochs):
+            probs = _sigmoid(features @ self.weights + self.bias)
+            error = (probs - targets) / max(1, n)
+            self.weights -= self.learning_rate * (features.T @ error + self.l2 * self.weights)
+            self.bias -= self.learning_rate * error.sum(axis=0)
+        return self
+
+    def predict_proba_features(self, features: np.ndarray) -> np.ndarray:
+        probs = _sigmoid(features @ self.weights + self.bias)
+        probs[:, ~self.active] = 0.0
+        return probs
+
+    def predict_proba(self, observations: List[str]) -> np.ndarray:
+        """Probability of every (quality, level) label: shape (n, qualities * 3)"""
+        return self.predict_proba_features(self.embed(observations))
+
+    def _decide(self, probs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Level ID per quality (0 = not observed) and the confidence of that decision"""
+        per_quality = probs.reshape(len(probs), len(self.qualities), _LEVELS_PER_QUALITY)
+        best = per_quality.argmax(axis=2)
+        best_p = per_quality.max(axis=2)
+        observed = best_p >= self.threshold
+        levels = np.where(observed, best + 1, NOT_OBSERVED)
+        confidence = np.where(observed, best_p, 1.0 - best_p)
+        return levels, confidence
+
+    def predict_labels(self, observations: List[str]) -> List[List[str]]:
+        """'quality-level' labels per observation (at most one level per quality)"""
+        levels, _ = self._decide(self.predict_proba(observations))
+        normalizer = LabelNormalizer(self.qualities)
+        return [[normalizer.label(q_id, int(level)) for q_id, level in enumerate(row) if level != NOT_OBSERVED]
+                for row in levels]
+
+    def assess_batch(self, observations: List[str]) -> List[Dict[str, Any]]:
+        """Predictions in the AssessmentResult shape with per-item and overall confidence"""
+        if not observations:
+            return []
+        levels, confidence = self._decide(self.predict_proba(observations))
+        results = []
+        for row_levels, row_conf in zip(levels, confidence):
+            items = [{
+                "quality": quality,
+                "level": LEVEL_NAMES[int(level)],
+                "reasoning": "Predicted by the local label model trained on reviewed assessments",
+                "confidence": round(float(conf), 3)
+            } for quality, level, conf in zip(self.qualities, row_levels, row_conf)]
+            observed = [i["quality"] for i in items if i["level"] != LEVEL_NAMES[NOT_OBSERVED]]
+            results.append({
+                "assessments": items,
+                "summary": (f"Local label model: {len(observed)} qualities predicted"
+                            + (f" ({', '.join(observed)})." if observed else ".")),
+                "confidence": round(float(row_conf.min()), 3),
+                "source": "label_model"
+            })
+        return results
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            active=self.active,
+            metadata=np.array(json.dumps(dict(self.metadata, qualities=self.qualities, threshold=self.threshold)))
+        )
+
+    @classmethod
+    def load(cls, path: str, embeddings=None) -> "LabelModel":
+        data = np.load(path, allow_pickle=False)
+        metadata = json.loads(str(data["metadata"]))
+        model = cls(embeddings, qualities=metadata.get("qualities"), threshold=metadata.get("threshold", 0.5))
+        model.weights = data["weights"]
+        model.bias = data["bias"]
+        model.active = data["active"]
+        model.metadata = metadata
+        return model
+
+
+def train_label_model(embeddings, assessments_dir: Optional[str] = None, holdout: float = 0.2,
+                      seed: int = 42, **model_kwargs) -> LabelModel:
+    """Fit a LabelModel on reviewed CSVs, reporting calibration on a held-out split"""
+    try:
+        from config import ASSESSMENTS_DIR, EMBEDDING_MODEL
+    except ImportError:
+        ASSESSMENTS_DIR, EMBEDDING_MODEL = "assessments", "sentence-transformers/all-MiniLM-L6-v2"
+    texts, codes = load_reviewed_examples(assessments_dir or ASSESSMENTS_DIR)
+    if not texts:
+        raise ValueError("No reviewed batch_assessment_*.csv files with Final Labels found")
+
+    model = LabelModel(embeddings, **model_kwargs)
+    features = model.embed(texts)
+    targets = level_codes_to_targets(codes)
+
+    metrics = None
+    order = np.random.default_rng(seed).permutation(len(texts))
+    n_holdout = int(round(len(texts) * holdout))
+    if n_holdout >= 2 and len(texts) - n_holdout >= 2:
+        test_idx, train_idx = order[:n_holdout], order[n_holdout:]
+        model.fit(features[train_idx], targets[train_idx])
+        metrics = calibration_metrics(model.predict_proba_features(features[test_idx]), targets[test_idx],
+                                      threshold=model.threshold)
+    # Final model uses every example
+    model.fit(features, targets)
+    model.metadata = {
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "examples": len(texts),
+        "holdout": n_holdout if metrics else 0,
+        "labels_trained": int(model.active.sum()),
+        "embedding_model": EMBEDDING_MODEL,
+        "metrics": metrics,
+    }
+    return model
+
+
+# Global label model (None when no trained model file exists)
+_label_model = None
+_label_model_loaded = False
+
+def get_label_model(embeddings) -> Optional[LabelModel]:
+    """Load the trained label model from LABEL_MODEL_PATH once, if present and compatible"""
+    global _label_model, _label_model_loaded
+    if not _label_model_loaded:
+        _label_model_loaded = True
+        try:
+            from config import LABEL_MODEL_PATH, EMBEDDING_MODEL
+        except ImportError:
+            LABEL_MODEL_PATH, EMBEDDING_MODEL = "label_model.npz", "sentence-transformers/all-MiniLM-L6-v2"
+        if os.path.exists(LABEL_MODEL_PATH):
+            try:
+                model = LabelModel.load(LABEL_MODEL_PATH, embeddings)
+                if model.metadata.get("embedding_model") == EMBEDDING_MODEL:
+                    _label_model = model
+                else:
+                    print(f"Ignoring {LABEL_MODEL_PATH}: trained with a different embedding model")
+            except Exception as e:
+                print(f"Could not load label model: {e}")
+    return _label_model
+
+
+def _default_embeddings():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    try:
+        from config import EMBEDDING_MODEL
+    except ImportError:
+        EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+
+def main():
+    """Train the label model or pre-fill labels for a CSV"""
+    try:
+        from config import LABEL_MODEL_PATH, ASSESSMENTS_DIR
+    except ImportError:
+        LABEL_MODEL_PATH, ASSESSMENTS_DIR = "label_model.npz", "assessments"
+
+    parser = argparse.ArgumentParser(description="Local label model trained on reviewed assessments")
+    parser.add_argument("--model", default=LABEL_MODEL_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_train = sub.add_parser("train", help="Train on reviewed CSVs and save the model")
+    p_train.add_argument("--assessments-dir", default=ASSESSMENTS_DIR)
+    p_train.add_argument("--holdout", type=float, default=0.2)
+    p_predict = sub.add_parser("predict", help="Pre-fill labels for a CSV with Name, Observations columns")
+    p_predict.add_argument("csv_path")
+    p_predict.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    embeddings = _default_embeddings()
+    if args.command == "train":
+        model = train_label_model(embeddings, args.assessments_dir, args.holdout)
+        model.save(args.model)
+        meta = model.metadata
+        print(f"Trained on {meta['examples']} examples, {meta['labels_trained']} labels -> {args.model}")
+        if meta["metrics"]:
+            m = meta["metrics"]
+            print(f"Held-out ({meta['holdout']}): Brier {m['brier']:.4f}  log loss {m['log_loss']:.4f}  ECE {m['ece']:.4f}")
+            print(f"Precision {m['precision']:.2f}  Recall {m['recall']:.2f}  F1 {m['f1']:.2f}")
+            for row in m["reliability"]:
+                print(f"  {row['bin']}: n={row['count']:5d}  confidence {row['mean_confidence']:.2f}  observed {row['observed_rate']:.2f}")
+        else:
+            print("Too few examples for a held-out calibration split")
+    elif args.command == "predict":
+        model = LabelModel.load(args.model, embeddings)
+        df = pd.read_csv(args.csv_path)
+        labels = model.predict_labels(df["Observations"].fillna("").astype(str).tolist())
+        df["Predicted Labels"] = [json.dumps(row) for row in labels]
+        out = args.out or args.csv_path.replace(".csv", "_prefilled.csv")
+        df.to_csv(out, index=False)
+        print(f"Wrote {len(df)} rows with predicted labels to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from config import PERSONALITY_QUALITIES
+except ImportError:
+    PERSONALITY_QUALITIES = [
+        "Adaptability", "Academic achievement", "Boldness", "Competition",
+        "Creativity", "Enthusiasm", "Excitability", "General ability",
+        "Guilt proneness", "Individualism", "Innovation", "Leadership",
+        "Maturity", "Mental health", "Morality", "Self control",
+        "Sensitivity", "Self sufficiency", "Social warmth", "Tension"
+    ]
+
+# Level codes shared by the label engine, analytics and exports
+LEVEL_NAMES = ["NOT OBSERVED", "LOW", "MIDDLE", "HIGH"]
+NOT_OBSERVED, LOW, MIDDLE, HIGH = 0, 1, 2, 3
+INVALID_ID = -1
+
+# Allowed levels mapping
+_LEVEL_MAP = {
+    'low': LOW,
+    'middle': MIDDLE,
+    'mid': MIDDLE,
+    'medium': MIDDLE,
+    'high': HIGH,
+    'not observed': NOT_OBSERVED,
+    'not_observed': NOT_OBSERVED,
+    'notobserved': NOT_OBSERVED,
+    'na': NOT_OBSERVED,
+    'n/a': NOT_OBSERVED
+}
+
+# Extra spellings seen from the model that the token-overlap fallback cannot resolve
+QUALITY_ALIASES = {
+    'academicachievement': 'academic-achievement',
+    'generalability': 'general-ability',
+    'guiltproneness': 'guilt-proneness',
+    'mentalhealth': 'mental-health',
+    'selfcontrol': 'self-control',
+    'selfsufficiency': 'self-sufficiency',
+    'socialwarmth': 'social-warmth',
+}
+
+_NON_LETTERS = re.compile(r"[^a-z\s]")
+# extract clean level even if noisy text like "Level: HIGH" or "high." etc.
+_LEVEL_PATTERN = re.compile(r"low|middle|mid|medium|high|not\s*observed|n/?a")
+
+
+class LabelNormalizer:
+    """Compiled quality/level lookup tables mapping raw model strings to integer IDs.
+
+    Quality IDs index ``PERSONALITY_QUALITIES``; level IDs index ``LEVEL_NAMES``.
+    Both lookups are memoized, since the model repeats the same strings for
+    almost every student.
+    """
+
+    def __init__(self, qualities: Optional[List[str]] = None, cache_size: int = 4096):
+        self.qualities = list(qualities or PERSONALITY_QUALITIES)
+        self.quality_keys = [q.lower().replace(' ', '-') for q in self.qualities]
+        self._quality_ids = {key: i for i, key in enumerate(self.quality_keys)}
+        for alias, key in QUALITY_ALIASES.items():
+            if key in self._quality_ids and alias not in self._quality_ids:
+                self._quality_ids[alias] = self._quality_ids[key]
+        # token -> quality IDs, for the overlap fallback
+        self._token_index: Dict[str, List[int]] = {}
+        for i, key in enumerate(self.quality_keys):
+            for token in set(key.split('-')):
+                self._token_index.setdefault(token, []).append(i)
+        self.quality_id = lru_cache(maxsize=cache_size)(self._lookup_quality)
+        self.level_id = lru_cache(maxsize=cache_size)(self._lookup_level)
+
+    def _lookup_quality(self, text: str) -> int:
+        t = _NON_LETTERS.sub(" ", text.lower().strip())
+        t = "-".join(t.split())
+        exact = self._quality_ids.get(t)
+        if exact is not None:
+            return exact
+        # token overlap fallback; ties go to the earlier quality in config order
+        scores = np.zeros(len(self.qualities), dtype=np.int32)
+        for token in set(t.split("-")):
+            for i in self._token_index.get(token, ()):
+                scores[i] += 1
+        best = int(scores.argmax()) if len(scores) else 0
+        return best if len(scores) and scores[best] > 0 else INVALID_ID
+
+    @staticmethod
+    def _lookup_level(text: str) -> int:
+        l_raw = text.strip().lower()
+        m = _LEVEL_PATTERN.search(l_raw)
+        key = m.group(0) if m else l_raw
+        key = key.replace('  ', ' ').replace('_', ' ')
+        level = _LEVEL_MAP.get(key, _LEVEL_MAP.get(key.strip()))
+        return INVALID_ID if level is None else level
+
+    def label(self, quality_id: int, level_id: int) -> str:
+        """Format IDs as a 'quality-level' review label"""
+        return f"{self.quality_keys[quality_id]}-{LEVEL_NAMES[level_id].lower()}"
+
+    def recognised_items(self, assessment_result: Dict[str, Any]) -> List[Tuple[int, int, Dict[str, Any]]]:
+        """Return (quality ID, level ID, raw item dict) for every recognisable assessment item"""
+        try:
+            raw_items = assessment_result.get('assessments', [])
+        except AttributeError:
+            return []
+        recognised = []
+        for item in raw_items or []:
+            try:
+                q_id = self.quality_id(str(item.get('quality', '')))
+                l_id = self.level_id(str(item.get('level', '')))
+            except Exception:
+                continue
+            if q_id != INVALID_ID and l_id != INVALID_ID:
+                recognised.append((q_id, l_id, item))
+        return recognised
+
+    def items(self, assessment_result: Dict[str, Any]) -> List[Tuple[int, int, str]]:
+        """Return (quality ID, level ID, reasoning) for every recognisable assessment item"""
+        return [(q_id, l_id, str(item.get('reasoning', '') or ''))
+                for q_id, l_id, item in self.recognised_items(assessment_result)]
+
+    def labels(self, assessment_result: Dict[str, Any]) -> List[str]:
+        """Return de-duplicated 'quality-level' labels for observed qualities"""
+        seen = set()
+        labels = []
+        for q_id, l_id, _ in self.items(assessment_result):
+            if l_id == NOT_OBSERVED or (q_id, l_id) in seen:
+                continue
+            seen.add((q_id, l_id))
+            labels.append(self.label(q_id, l_id))
+        return labels
+
+    def label_lists(self, results: List[Dict[str, Any]]) -> List[List[str]]:
+        """Labels for every record of a batch results list (errored records get none)"""
+        return [[] if r.get('error') else self.labels(r.get('assessment', {})) for r in results]
+
+    def level_matrix(self, results: List[Dict[str, Any]]) -> np.ndarray:
+        """Level IDs for a whole batch as an (n_students, n_qualities) int8 array"""
+        # later observed items win, matching how labels are applied to review rows
+        cells: Dict[Tuple[int, int], int] = {}
+        for row, r in enumerate(results):
+            if r.get('error'):
+                continue
+            for q_id, l_id, _ in self.items(r.get('assessment', {})):
+                if l_id != NOT_OBSERVED:
+                    cells[(row, q_id)] = l_id
+        matrix = np.zeros((len(results), len(self.qualities)), dtype=np.int8)
+        if cells:
+            index = np.array(list(cells.keys()), dtype=np.intp)
+            matrix[index[:, 0], index[:, 1]] = np.fromiter(cells.values(), dtype=np.int8, count=len(cells))
+        return matrix
+
+
+# Global normalizer instance
+_label_normalizer = None
+
+def get_label_normalizer() -> LabelNormalizer:
+    """Get the global label normalizer instance"""
+    global _label_normalizer
+    if _label_normalizer is None:
+        _label_normalizer = LabelNormalizer()
+    return _label_normalizer
+
+def extract_predicted_labels(assessment_result: Dict[str, Any]) -> List[str]:
+    """Return normalized labels in 'quality-level' format, filtering invalid/duplicate entries."""
+    return get_label_normalizer().labels(assessment_result)
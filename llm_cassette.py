@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+LLM cassettes: record Gemini responses once, replay them offline
+Each rendered prompt is hashed and stored with the response text, token
+usage and latency in a JSON-lines cassette file. In replay mode the stored
+responses are served instead of calling Gemini (optionally with their
+original latency), so whole batches can be re-run without an API key for
+profiling and regression checks.
+
+Usage:
+    python llm_cassette.py [cassette.jsonl]   # summarize a cassette
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a prompt was never recorded"""
+
+
+def prompt_hash(messages: List[BaseMessage]) -> str:
+    """Stable hash of a rendered prompt (message roles and text)"""
+    rendered = json.dumps([[m.type, m.content] for m in messages], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(rendered.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Thread-safe JSON-lines store of recorded model responses keyed by prompt hash.
+
+    A prompt recorded several times (e.g. a retry after a malformed response)
+    keeps every response; replay serves them in recorded order and repeats
+    the last one.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", replay_latency: bool = False):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {', '.join(CASSETTE_MODES)}")
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._replayed: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    self._entries[entry["prompt_hash"]].append(entry)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(v) for v in self._entries.values())
+
+    def record(self, key: str, model: str, text: str, usage: Optional[Dict[str, Any]], latency: float):
+        entry = {
+            "prompt_hash": key,
+            "model": model,
+            "text": text,
+            "usage": usage,
+            "latency": round(latency, 4),
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            self._entries[key].append(entry)
+            self.stats["recorded"] += 1
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def lookup(self, key: str) -> Dict[str, Any]:
+        """Next recorded response for a prompt hash; raises CassetteMiss if there is none"""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.stats["misses"] += 1
+                raise CassetteMiss(f"No recorded response for prompt {key[:12]} in {self.path}")
+            index = min(self._replayed[key], len(entries) - 1)
+            self._replayed[key] += 1
+            self.stats["replayed"] += 1
+            return entries[index]
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            status = dict(self.stats)
+        status.update({"mode": self.mode, "path": self.path, "entries": len(self)})
+        return status
+
+
+def _message_text(message) -> str:
+    content = getattr(message, "content", message)
+    if isinstance(content, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    return str(content or "")
+
+
+class CassetteChatModel(BaseChatModel):
+    """Chat model that records an inner model's responses or replays them from a cassette"""
+
+    cassette: Any
+    inner: Any = None
+    model_name: str = ""
+    stream_chunk_chars: int = 200
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        if self.cassette.mode == "replay":
+            entry = self.cassette.lookup(prompt_hash(messages))
+            if self.cassette.replay_latency:
+                time.sleep(entry.get("latency") or 0)
+            message = AIMessage(content=entry["text"], usage_metadata=entry.get("usage"))
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        start = time.perf_counter()
+        message = self.inner.invoke(messages, stop=stop, **kwargs)
+        self.cassette.record(prompt_hash(messages), self.model_name, _message_text(message),
+                             getattr(message, "usage_metadata", None), time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        if self.cassette.mode == "replay":
+            entry = self.cassette.lookup(prompt_hash(messages))
+            text = entry["text"]
+            pieces = [text[i:i + self.stream_chunk_chars] for i in range(0, len(text), self.stream_chunk_chars)] or [""]
+            delay = (entry.get("latency") or 0) / len(pieces) if self.cassette.replay_latency else 0
+            for i, piece in enumerate(pieces):
+                if delay:
+                    time.sleep(delay)
+                usage = entry.get("usage") if i == len(pieces) - 1 else None
+                yield ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage))
+            return
+
+        start = time.perf_counter()
+        combined = None
+        for chunk in self.inner.stream(messages, stop=stop, **kwargs):
+            combined = chunk if combined is None else combined + chunk
+            yield ChatGenerationChunk(message=chunk)
+        # Only complete streams are recorded; an abandoned stream never reaches here
+        self.cassette.record(prompt_hash(messages), self.model_name, _message_text(combined),
+                             getattr(combined, "usage_metadata", None), time.perf_counter() - start)
+
+
+# Global cassette (None when LLM_CASSETTE_MODE is "off")
+_cassette = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+def get_cassette() -> Optional[Cassette]:
+    """Get the global cassette configured from config.py"""
+    global _cassette, _cassette_loaded
+    with _cassette_lock:
+        if not _cassette_loaded:
+            _cassette_loaded = True
+            try:
+                from config import LLM_CASSETTE_MODE, LLM_CASSETTE_PATH, LLM_CASSETTE_REPLAY_LATENCY
+            except ImportError:
+                LLM_CASSETTE_MODE, LLM_CASSETTE_PATH, LLM_CASSETTE_REPLAY_LATENCY = "off", "cassettes/default.jsonl", False
+            mode = os.getenv("LLM_CASSETTE_MODE", LLM_CASSETTE_MODE)
+            if mode != "off":
+                _cassette = Cassette(os.getenv("LLM_CASSETTE_PATH", LLM_CASSETTE_PATH), mode,
+                                     replay_latency=LLM_CASSETTE_REPLAY_LATENCY)
+                print(f"LLM cassette {mode}: {_cassette.path} ({len(_cassette)} recorded responses)")
+    return _cassette
+
+
+def main():
+    """Summarize the responses recorded in a cassette"""
+    try:
+        from config import LLM_CASSETTE_PATH
+    except ImportError:
+        LLM_CASSETTE_PATH = "cassettes/default.jsonl"
+    path = sys.argv[1] if len(sys.argv) > 1 else LLM_CASSETTE_PATH
+    if not os.path.exists(path):
+        print(f"No cassette at {path}")
+        return
+    cassette = Cassette(path, "replay")
+    entries = [e for group in cassette._entries.values() for e in group]
+    latencies = sorted(e["latency"] for e in entries)
+    output_tokens = sum((e.get("usage") or {}).get("output_tokens", 0) for e in entries)
+    input_tokens = sum((e.get("usage") or {}).get("input_tokens", 0) for e in entries)
+    print(f"Cassette: {path}")
+    print(f"Responses: {len(entries)} for {len(cassette._entries)} distinct prompts")
+    print(f"Models: {', '.join(sorted({e['model'] for e in entries}))}")
+    if latencies:
+        print(f"Latency: total {sum(latencies):.1f}s, median {latencies[len(latencies) // 2]:.2f}s, max {latencies[-1]:.2f}s")
+    print(f"Tokens: {input_tokens} input, {output_tokens} output")
+
+
+if __name__ == "__main__":
+    main()
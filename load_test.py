@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Concurrent-user load test for the assessment backend
+Simulates N field coordinators sharing one PersonalityAssessmentSystem (as
+the Streamlit server does): each user runs a mix of individual assessments
+and batch jobs through the shared job manager and rate limiter, with the
+fake Gemini backend standing in for the API. For each concurrency level it
+reports throughput, p50/p99 latency, rate-limiter queueing time and memory
+growth.
+
+Usage:
+    python load_test.py                                  # 1, 2, 5 and 10 users
+    python load_test.py --users 5 --ops-per-user 6 --batch-fraction 0.5
+    python load_test.py --profile slow_tail --time-scale 0.2 --json load_results.json
+"""
+
+import gc
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+import config
+from fake_gemini import FAULT_PROFILES, configure_fake_backend
+from fault_scenarios import load_students
+from job_queue import get_job_manager
+from rate_limiter import get_rate_limiter
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile, or None for no samples"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)]
+
+
+class SimulatedUser(threading.Thread):
+    """One coordinator: individual assessments and batch jobs, one after another"""
+
+    def __init__(self, user_id: int, system, students: List[Dict[str, str]], ops: int,
+                 batch_fraction: float, batch_size: int, seed: int):
+        super().__init__(name=f"user-{user_id}", daemon=True)
+        self.system = system
+        self.students = students
+        self.ops = ops
+        self.batch_fraction = batch_fraction
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.individual_latencies: List[float] = []
+        self.batch_latencies: List[float] = []
+        self.assessed = 0
+        self.failed = 0
+
+    def _individual(self):
+        student = self.rng.choice(self.students)
+        start = time.perf_counter()
+        result = self.system.assess_student_personality(student["observations"])
+        self.individual_latencies.append(time.perf_counter() - start)
+        self.assessed += 1
+        self.failed += 1 if result.get("error") else 0
+
+    def _batch(self):
+        batch = self.rng.sample(self.students, min(self.batch_size, len(self.students)))
+        manager = get_job_manager()
+        start = time.perf_counter()
+        job_id = manager.submit(self.system, batch, label=self.name, export=False)
+        manager.wait(job_id, poll_interval=0.05)
+        self.batch_latencies.append(time.perf_counter() - start)
+        snapshot = manager.snapshot(job_id, include_results=True)
+        self.assessed += snapshot["completed"]
+        self.failed += sum(1 for r in snapshot["results"] if r.get("error") or (r.get("assessment") or {}).get("error"))
+
+    def run(self):
+        for _ in range(self.ops):
+            if self.rng.random() < self.batch_fraction:
+                self._batch()
+            else:
+                self._individual()
+
+
+def run_level(system, users: int, students: List[Dict[str, str]], args) -> Dict[str, Any]:
+    """Run one concurrency level and collect its measurements"""
+    limiter_before = get_rate_limiter().get_status()
+    gc.collect()
+    memory_before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+
+    threads = [SimulatedUser(i, system, students, args.ops_per_user, args.batch_fraction,
+                             args.batch_size, args.seed + 1000 * users + i) for i in range(users)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    memory_after, memory_peak = tracemalloc.get_traced_memory()
+    limiter_after = get_rate_limiter().get_status()
+    queued = limiter_after["queued_calls"] - limiter_before["queued_calls"]
+    waited = limiter_after["total_wait_seconds"] - limiter_before["total_wait_seconds"]
+
+    individual = [x for t in threads for x in t.individual_latencies]
+    batches = [x for t in threads for x in t.batch_latencies]
+    assessed = sum(t.assessed for t in threads)
+    return {
+        "users": users,
+        "seconds": round(elapsed, 2),
+        "students_assessed": assessed,
+        "failed": sum(t.failed for t in threads),
+        "throughput_per_min": round(60.0 * assessed / elapsed, 1) if elapsed else None,
+        "individual_p50": _percentile(individual, 50),
+        "individual_p99": _percentile(individual, 99),
+        "batch_p50": _percentile(batches, 50),
+        "batch_p99": _percentile(batches, 99),
+        "limiter_calls": queued,
+        "limiter_mean_wait": round(waited / queued, 3) if queued else 0.0,
+        "limiter_max_wait": round(limiter_after["max_wait_seconds"], 3),
+        "memory_growth_mb": round((memory_after - memory_before) / 1e6, 2),
+        "memory_peak_mb": round(memory_peak / 1e6, 2),
+    }
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the shared assessment backend with simulated users")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 5, 10], help="Concurrency levels to run")
+    parser.add_argument("--ops-per-user", type=int, default=4)
+    parser.add_argument("--batch-fraction", type=float, default=0.3, help="Share of operations that are batch jobs")
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--profile", default="healthy", choices=list(FAULT_PROFILES))
+    parser.add_argument("--time-scale", type=float, default=0.1, help="Scale for the fake backend's latency")
+    parser.add_argument("--scale-limiter", action="store_true",
+                        help="Also scale RATE_LIMIT_DELAY and RETRY_DELAY by --time-scale")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", default=None, help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    # Stub the LLM; the rate limiter, job manager and routing stay real
+    config.LLM_BACKEND = "fake"
+    config.LLM_CASSETTE_MODE = "off"
+    if args.scale_limiter:
+        config.RATE_LIMIT_DELAY *= args.time_scale
+        config.RETRY_DELAY *= args.time_scale
+    configure_fake_backend(args.profile, time_scale=args.time_scale, seed=args.seed)
+
+    from personality_assessment import PersonalityAssessmentSystem
+    system = PersonalityAssessmentSystem()
+    system.setup_vector_database()
+    students = load_students(config.ASSESSMENTS_DIR, 50)
+
+    tracemalloc.start()
+    results = [run_level(system, users, students, args) for users in args.users]
+    tracemalloc.stop()
+
+    print(f"\nLoad test ({args.profile}, rate limit delay {config.RATE_LIMIT_DELAY}s, "
+          f"{config.MAX_REQUESTS_PER_MINUTE}/min)")
+    print("=" * 112)
+    print(f"{'users':>5}{'seconds':>9}{'students':>10}{'failed':>8}{'per min':>9}{'ind p50':>9}{'ind p99':>9}"
+          f"{'batch p50':>11}{'batch p99':>11}{'queue avg':>11}{'queue max':>11}{'mem +MB':>9}")
+    for r in results:
+        print(f"{r['users']:>5}{r['seconds']:>9.2f}{r['students_assessed']:>10}{r['failed']:>8}"
+              f"{_fmt(r['throughput_per_min']):>9}{_fmt(r['individual_p50']):>9}{_fmt(r['individual_p99']):>9}"
+              f"{_fmt(r['batch_p50']):>11}{_fmt(r['batch_p99']):>11}{r['limiter_mean_wait']:>11.3f}"
+              f"{r['limiter_max_wait']:>11.3f}{r['memory_growth_mb']:>9.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
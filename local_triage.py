@@ -0,0 +1,154 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from label_normalizer import (
+    HIGH, INVALID_ID, LEVEL_NAMES, LOW, MIDDLE, NOT_OBSERVED, PERSONALITY_QUALITIES, LabelNormalizer
+)
+
+_LEVEL_IDS = {"LOW": LOW, "MIDDLE": MIDDLE, "HIGH": HIGH}
+# Column order of the per-quality decision: NOT OBSERVED, LOW, MIDDLE, HIGH (matches LEVEL_NAMES)
+_DECISIONS = len(LEVEL_NAMES)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class LocalTriageClassifier:
+    """Zero-LLM assessment from reference-sheet descriptor embeddings.
+
+    Every LOW/MIDDLE/HIGH descriptor of every quality is embedded once. An
+    observation is scored against all of them with one matrix product; the
+    best descriptor per (quality, level) gives that level's similarity, and
+    NOT OBSERVED competes as a fixed ``observe_threshold`` score. A softmax
+    over the four options (scaled by ``temperature``) gives each quality's
+    confidence; the result's overall confidence is the weakest of the 20.
+    """
+
+    def __init__(self, embeddings, reference_processor=None, qualities: Optional[List[str]] = None,
+                 observe_threshold: float = 0.45, temperature: float = 0.05):
+        self.embeddings = embeddings
+        self.reference_processor = reference_processor
+        self.qualities = list(qualities or PERSONALITY_QUALITIES)
+        self.observe_threshold = observe_threshold
+        self.temperature = temperature
+        self.descriptors: List[str] = []
+        self._matrix = None          # (descriptors, dim), rows sorted by group
+        self._group_starts = None    # first row of each non-empty (quality, level) group
+        self._group_index = None     # flat quality * 4 + level for each group
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._matrix is not None
+
+    def _reference_descriptors(self) -> Dict[int, Dict[int, List[str]]]:
+        """Descriptors per quality ID and level ID (CSV first, built-in text where the CSV has none)"""
+        normalizer = LabelNormalizer(self.qualities)
+        sources = []
+        if self.reference_processor is not None:
+            sources.append(self.reference_processor.load_reference_data())
+            sources.append(self.reference_processor.get_fallback_reference_data())
+        descriptors: Dict[int, Dict[int, List[str]]] = {
+            q_id: {level: [] for level in (LOW, MIDDLE, HIGH)} for q_id in range(len(self.qualities))
+        }
+        for source in sources:
+            for quality, levels in source.items():
+                q_id = normalizer.quality_id(quality)
+                if q_id == INVALID_ID:
+                    continue
+                for level_name, texts in levels.items():
+                    level = _LEVEL_IDS.get(level_name.upper())
+                    if level is None or descriptors[q_id][level]:
+                        continue
+                    descriptors[q_id][level] = [t for t in texts if t.strip()]
+        return descriptors
+
+    def fit(self) -> "LocalTriageClassifier":
+        """Embed all reference descriptors (one embedding call)"""
+        texts, groups = [], []
+        for q_id, levels in self._reference_descriptors().items():
+            for level, level_texts in levels.items():
+                for text in level_texts:
+                    texts.append(text)
+                    groups.append(q_id * _DECISIONS + level)
+        if not texts:
+            raise ValueError("No reference descriptors available for local triage")
+
+        order = np.argsort(np.asarray(groups), kind="stable")
+        groups = np.asarray(groups)[order]
+        vectors = _normalize_rows(np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32))[order]
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        with self._lock:
+            self.descriptors = [texts[i] for i in order]
+            self._matrix = vectors
+            self._group_starts = starts
+            self._group_index = groups[starts]
+        return self
+
+    def _score(self, observations: List[str]):
+        """(scores of shape (n, qualities, 4), best descriptor row per group of shape (n, groups))"""
+        if not self.ready:
+            self.fit()
+        with self._lock:
+            matrix, starts, group_index = self._matrix, self._group_starts, self._group_index
+        obs = _normalize_rows(np.asarray(self.embeddings.embed_documents(observations), dtype=np.float32))
+        sims = obs @ matrix.T
+        best = np.maximum.reduceat(sims, starts, axis=1)
+        ends = np.r_[starts[1:], sims.shape[1]]
+        best_rows = np.stack([s + sims[:, s:e].argmax(axis=1) for s, e in zip(starts, ends)], axis=1)
+
+        scores = np.full((len(observations), len(self.qualities) * _DECISIONS), -1.0, dtype=np.float32)
+        scores[:, group_index] = best
+        scores = scores.reshape(len(observations), len(self.qualities), _DECISIONS)
+        scores[:, :, NOT_OBSERVED] = self.observe_threshold
+        return scores, best_rows, {int(g): i for i, g in enumerate(group_index)}
+
+    def score(self, observations: List[str]) -> np.ndarray:
+        """Similarity of each observation to each (quality, level): shape (n, qualities, 4)"""
+        return self._score(observations)[0]
+
+    def assess_batch(self, observations: List[str]) -> List[Dict[str, Any]]:
+        """Assess a whole class at once; results use the AssessmentResult shape plus confidences"""
+        if not observations:
+            return []
+        scores, best_rows, group_pos = self._score(observations)
+        logits = (scores - scores.max(axis=2, keepdims=True)) / self.temperature
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=2, keepdims=True)
+        decisions = probs.argmax(axis=2)
+        confidences = probs.max(axis=2)
+
+        results = []
+        for n in range(len(observations)):
+            items = []
+            for q_id, quality in enumerate(self.qualities):
+                level = int(decisions[n, q_id])
+                confidence = float(confidences[n, q_id])
+                if level == NOT_OBSERVED:
+                    reasoning = "No reference descriptor matched closely"
+                else:
+                    row = best_rows[n, group_pos[q_id * _DECISIONS + level]]
+                    reasoning = (f"Closest reference descriptor: \"{self.descriptors[row]}\" "
+                                 f"(similarity {scores[n, q_id, level]:.2f})")
+                items.append({
+                    "quality": quality,
+                    "level": LEVEL_NAMES[level],
+                    "reasoning": reasoning,
+                    "confidence": round(confidence, 3)
+                })
+            observed = [i["quality"] for i in items if i["level"] != LEVEL_NAMES[NOT_OBSERVED]]
+            results.append({
+                "assessments": items,
+                "summary": (f"Local reference-sheet triage: {len(observed)} qualities matched"
+                            + (f" ({', '.join(observed)})." if observed else ".")),
+                "confidence": round(float(confidences[n].min()), 3),
+                "source": "local_triage"
+            })
+        return results
+
+    def assess(self, observations: str) -> Dict[str, Any]:
+        return self.assess_batch([observations])[0]
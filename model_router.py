@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set
+from urllib import error, request
+from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+MODELS_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta/models"
+
+DEFAULT_MODEL_CANDIDATES = [
+    "gemini-2.5-flash",
+    "gemini-2.0-flash",
+    "gemini-2.0-flash-001",
+    "gemini-flash-latest",
+    "gemini-2.5-pro",
+    "gemini-pro-latest",
+    "gemini-1.5-flash",
+    "gemini-1.5-pro"
+]
+
+
+def _key_fingerprint(api_key: Optional[str]) -> str:
+    """Short hash so probe results are cached per API key without storing the key"""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def is_model_unavailable_error(error_str: str) -> bool:
+    """True for errors that mean the model itself cannot serve this key"""
+    return ("NotFound" in error_str or "is not found" in error_str
+            or "not supported for generateContent" in error_str.lower())
+
+
+class ModelRouter:
+    """Decide which Gemini models are usable and hand out clients for them.
+
+    Candidate models are probed once (one ``models.list`` call, cached in a
+    probe file per API key) instead of discovering NotFound errors one request
+    at a time. Clients are built per (model, API key) with the full generation
+    config and never modified afterwards, so concurrent requests never share
+    mutable client state; a model that fails at runtime is simply skipped by
+    later requests.
+    """
+
+    def __init__(self, candidates: List[str], temperature: float = 0.1, api_key: Optional[str] = None,
+                 probe_cache_path: Optional[str] = None, probe_ttl: float = 86400,
+                 generation_config: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None,
+                 hedge_model: Optional[str] = None):
+        # Keep order, drop duplicates (the configured model is usually also a default)
+        self.candidates = list(dict.fromkeys(candidates))
+        self.temperature = temperature
+        self.api_key = api_key
+        self.probe_cache_path = probe_cache_path
+        self.probe_ttl = probe_ttl
+        self.generation_config = generation_config if generation_config is not None else {"response_mime_type": "application/json"}
+        self.timeout = timeout
+        self.hedge_model_name = hedge_model or None
+        self._available: Optional[Set[str]] = None   # None = not probed, assume all usable
+        self._unavailable: Set[str] = set()
+        self._clients: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+
+    def _current_key(self) -> Optional[str]:
+        # With a key pool, the key chosen for this thread's call by the limiter
+        from api_key_pool import current_api_key
+        return self.api_key or current_api_key() or os.getenv("GOOGLE_API_KEY")
+
+    def _load_probe_cache(self, fingerprint: str) -> Optional[Set[str]]:
+        if not self.probe_cache_path or not os.path.exists(self.probe_cache_path):
+            return None
+        try:
+            with open(self.probe_cache_path, "r", encoding="utf-8") as f:
+                entry = json.load(f).get(fingerprint)
+        except (OSError, json.JSONDecodeError, AttributeError):
+            return None
+        if not entry or time.time() - entry.get("probed_at", 0) > self.probe_ttl:
+            return None
+        return set(entry.get("models", []))
+
+    def _save_probe_cache(self, fingerprint: str, models: Set[str]):
+        if not self.probe_cache_path:
+            return
+        try:
+            cache = {}
+            if os.path.exists(self.probe_cache_path):
+                with open(self.probe_cache_path, "r", encoding="utf-8") as f:
+                    cache = json.load(f)
+            cache[fingerprint] = {"probed_at": time.time(), "models": sorted(models)}
+            tmp_path = f"{self.probe_cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(cache, f, indent=2)
+            os.replace(tmp_path, self.probe_cache_path)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not write model probe cache: {e}")
+
+    def _list_generate_models(self, api_key: str) -> Set[str]:
+        """Names of all models this key can call generateContent on"""
+        models, page_token = set(), None
+        while True:
+            query = {"key": api_key, "pageSize": 1000}
+            if page_token:
+                query["pageToken"] = page_token
+            with request.urlopen(f"{MODELS_ENDPOINT}?{urlencode(query)}", timeout=15) as resp:
+                data = json.loads(resp.read().decode("utf-8"))
+            for model in data.get("models", []):
+                if "generateContent" in model.get("supportedGenerationMethods", []):
+                    models.add(model["name"].split("/", 1)[-1])
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                return models
+
+    @staticmethod
+    def _offline_backend() -> Optional[str]:
+        """"replay" or "fake" when calls never reach Gemini (cassette replay, fake backend), else None"""
+        from llm_cassette import get_cassette
+
+        cassette = get_cassette()
+        if cassette is not None and cassette.mode == "replay":
+            return "replay"
+        try:
+            from config import LLM_BACKEND
+        except ImportError:
+            LLM_BACKEND = "gemini"
+        return "fake" if os.getenv("LLM_BACKEND", LLM_BACKEND) == "fake" else None
+
+    def probe(self, force: bool = False) -> List[str]:
+        """Find out which candidates are usable (cached probe file first) and return them in order.
+
+        Offline (fake backend or cassette replay) nothing is probed: every
+        candidate stays usable and no models.list request is made.
+        """
+        offline = self._offline_backend()
+        api_key = self._current_key()
+        fingerprint = _key_fingerprint(api_key)
+        available = None if force or offline else self._load_probe_cache(fingerprint)
+        if offline:
+            logger.info(f"Skipping model probe ({offline} backend)")
+        elif available is None and api_key:
+            try:
+                available = self._list_generate_models(api_key)
+                self._save_probe_cache(fingerprint, available)
+            except (error.URLError, OSError, ValueError, KeyError) as e:
+                # Leave routing unprobed; runtime failures still mark models unavailable
+                logger.warning(f"Model probe failed, using all candidates: {e}")
+        with self._lock:
+            self._available = available
+            self._unavailable.clear()
+        usable = self.usable_models()
+        logger.info(f"Usable Gemini models: {', '.join(usable) or 'none'}")
+        return usable
+
+    def usable_models(self) -> List[str]:
+        """Candidates that passed the probe and have not failed since, in preference order"""
+        with self._lock:
+            return [
+                m for m in self.candidates
+                if m not in self._unavailable and (self._available is None or m in self._available)
+            ]
+
+    def primary_model(self) -> Optional[str]:
+        usable = self.usable_models()
+        return usable[0] if usable else None
+
+    def hedge_model(self, model: Optional[str]) -> Optional[str]:
+        """Model for a hedged duplicate call: the configured faster model if usable, else the same one"""
+        if self.hedge_model_name and self.hedge_model_name in self.usable_models():
+            return self.hedge_model_name
+        return model
+
+    def mark_unavailable(self, model: str):
+        """Skip a model for all later requests after it failed with NotFound/unsupported"""
+        with self._lock:
+            self._unavailable.add(model)
+        logger.warning(f"Model {model} marked unavailable; routing to {self.primary_model() or 'no remaining model'}")
+
+    def _build_client(self, model: str, api_key: Optional[str], response_schema: Optional[Dict[str, Any]] = None):
+        """Gemini client (or the fake backend), wrapped by the LLM cassette when one is active"""
+        from llm_cassette import CassetteChatModel, get_cassette
+
+        offline = self._offline_backend()
+        cassette = get_cassette()
+        if offline == "replay":
+            return CassetteChatModel(cassette=cassette, model_name=model)
+        if offline == "fake":
+            from fake_gemini import FakeGeminiChatModel
+            llm = FakeGeminiChatModel(model_name=model, response_schema=response_schema)
+        else:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            generation_config = dict(self.generation_config)
+            if response_schema is not None:
+                # Native structured output: Gemini constrains the JSON to this schema
+                generation_config.update(response_mime_type="application/json", response_schema=response_schema)
+            llm = ChatGoogleGenerativeAI(
+                model=model,
+                temperature=self.temperature,
+                google_api_key=api_key,
+                generation_config=generation_config,
+                timeout=self.timeout
+            )
+        if cassette is not None:
+            return CassetteChatModel(cassette=cassette, inner=llm, model_name=model)
+        return llm
+
+    def client(self, model: Optional[str] = None, api_key: Optional[str] = None,
+               response_schema: Optional[Dict[str, Any]] = None):
+        """Chat client for a model (the best usable one by default), optionally with a response schema"""
+        from response_schema import schema_key
+
+        model = model or self.primary_model()
+        if model is None:
+            raise RuntimeError(f"No usable Gemini model among: {', '.join(self.candidates)}")
+        api_key = api_key or self._current_key()
+        cache_key = (model, _key_fingerprint(api_key), schema_key(response_schema))
+        with self._lock:
+            llm = self._clients.get(cache_key)
+            if llm is None:
+                llm = self._build_client(model, api_key, response_schema)
+                self._clients[cache_key] = llm
+        return llm
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            probed = self._available is not None
+            unavailable = sorted(self._unavailable)
+        return {"probed": probed, "usable": self.usable_models(), "unavailable": unavailable}
@@ -1,26 +1,42 @@
 import os
 import json
 import time
-from typing import List, Dict, Any
+import logging
+from typing import List, Dict, Any, Iterator, Optional
 from dotenv import load_dotenv
 import PyPDF2
 import chromadb
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.documents import Document
 from langchain_community.vectorstores import Chroma
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser, PydanticOutputParser
+from langchain_core.output_parsers import PydanticOutputParser, BaseOutputParser
+from langchain_core.exceptions import OutputParserException
 from pydantic import BaseModel, Field
 from typing import List
 from langchain_core.runnables import RunnablePassthrough
 from csv_reference_processor import CSVReferenceProcessor
 from rate_limiter import get_rate_limiter, rate_limited_call
+from api_key_pool import record_key_error, record_key_success
+from circuit_breaker import get_circuit_breaker, is_outage_error
+from streaming_parser import IncrementalAssessmentParser, MalformedStreamError
+from compact_schema import compact_format_instructions, expand_compact_item, expand_compact_result, quality_codes
+from response_schema import assessment_response_schema
+from assessment_result import canonical_result
+from context_builder import count_tokens, get_context_assembler
+from json_repair import RepairError, get_repair_stats, repair_assessment_json
+from model_router import DEFAULT_MODEL_CANDIDATES, ModelRouter, is_model_unavailable_error
+from hedged_calls import DeadlineExceeded, get_hedged_invoker
+from local_triage import LocalTriageClassifier
+from label_model import get_label_model
+from usage_ledger import add_message_usage, get_usage_ledger, new_usage
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class AssessmentItem(BaseModel):
     quality: str = Field(description="Name of the personality quality")
     level: str = Field(description="Assessment level: LOW, MIDDLE, HIGH, or NOT OBSERVED")
@@ -30,6 +46,49 @@ class AssessmentResult(BaseModel):
     assessments: List[AssessmentItem] = Field(description="List of personality assessments")
     summary: str = Field(description="Overall assessment summary")
 
+class CompactOutputParser(BaseOutputParser[AssessmentResult]):
+    """Parse the compact wire format and expand it into an AssessmentResult"""
+    qualities: List[str]
+    reasoning_words: int = 12
+
+    def parse(self, text: str) -> AssessmentResult:
+        try:
+            return AssessmentResult(**expand_compact_result(text, self.qualities))
+        except Exception as e:
+            raise OutputParserException(f"Failed to parse compact assessment: {e}", llm_output=text) from e
+
+    def get_format_instructions(self) -> str:
+        return compact_format_instructions(self.qualities, self.reasoning_words)
+
+    @property
+    def _type(self) -> str:
+        return "compact_assessment"
+
+class SchemaOutputParser(BaseOutputParser[AssessmentResult]):
+    """Parse output constrained by the native response schema (no format instructions needed)"""
+
+    def parse(self, text: str) -> AssessmentResult:
+        try:
+            return AssessmentResult(**json.loads(text))
+        except Exception as e:
+            raise OutputParserException(f"Failed to parse schema-constrained assessment: {e}", llm_output=text) from e
+
+    def get_format_instructions(self) -> str:
+        return ""
+
+    @property
+    def _type(self) -> str:
+        return "schema_assessment"
+
+def _message_text(message) -> str:
+    """Text of a chat message or stream chunk (Gemini may return content parts)"""
+    content = getattr(message, "content", message)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    return str(content or "")
+
 class PersonalityAssessmentSystem:
     def __init__(self):
         """Initialize the Personality Assessment System"""
@@ -54,29 +113,24 @@ class PersonalityAssessmentSystem:
             model_name = "gemini-1.5-flash"
             temperature = 0.1
         
-        # Initialize Gemini LLM with robust model fallback
-        api_key = os.getenv("GOOGLE_API_KEY")
+        try:
+            from config import MODEL_PROBE_CACHE, MODEL_PROBE_TTL, ASSESSMENT_TIMEOUT, HEDGE_MODEL
+        except ImportError:
+            MODEL_PROBE_CACHE, MODEL_PROBE_TTL, ASSESSMENT_TIMEOUT, HEDGE_MODEL = "model_probe.json", 86400, 120, ""
+        
+        # Initialize Gemini model routing with robust model fallback
         # Prefer models present for your key (2.0/2.5 series), keep 1.5 as fallback
-        self.model_candidates = [
-            model_name,
-            "gemini-2.5-flash",
-            "gemini-2.0-flash",
-            "gemini-2.0-flash-001",
-            "gemini-flash-latest",
-            "gemini-2.5-pro",
-            "gemini-pro-latest",
-            "gemini-1.5-flash",
-            "gemini-1.5-pro"
-        ]
-        self.current_model_index = 0
-        self.llm = ChatGoogleGenerativeAI(
-            model=self.model_candidates[self.current_model_index],
+        self.model_candidates = [model_name] + DEFAULT_MODEL_CANDIDATES
+        self.model_router = ModelRouter(
+            self.model_candidates,
             temperature=temperature,
-            google_api_key=api_key,
-            generation_config={
-                "response_mime_type": "application/json"
-            }
+            probe_cache_path=MODEL_PROBE_CACHE,
+            probe_ttl=MODEL_PROBE_TTL,
+            timeout=ASSESSMENT_TIMEOUT,
+            hedge_model=HEDGE_MODEL
         )
+        # One models.list call (or the cached probe file) instead of NotFound discovery per request
+        self.model_router.probe()
         
         # Initialize Hugging Face embeddings
         try:
@@ -94,6 +148,8 @@ class PersonalityAssessmentSystem:
         self.vector_store = None
         self.reference_data = {}
         self.csv_reference_processor = CSVReferenceProcessor()
+        self.local_triage = None
+        self.label_model = None
         
     def extract_pdf_content(self, pdf_path: str) -> str:
         """Extract text content from PDF file"""
@@ -157,6 +213,105 @@ class PersonalityAssessmentSystem:
         )
         
         print(f"Vector database created with {len(documents)} chunks")
+        
+        self.setup_local_triage()
+    
+    def _triage_settings(self) -> Dict[str, Any]:
+        try:
+            from config import (LOCAL_TRIAGE_MODE, LOCAL_TRIAGE_CONFIDENCE, LOCAL_TRIAGE_MIN_OBSERVED,
+                                LOCAL_TRIAGE_OBSERVE_THRESHOLD, LOCAL_TRIAGE_TEMPERATURE)
+        except ImportError:
+            LOCAL_TRIAGE_MODE, LOCAL_TRIAGE_CONFIDENCE, LOCAL_TRIAGE_MIN_OBSERVED = "fallback", 0.9, 1
+            LOCAL_TRIAGE_OBSERVE_THRESHOLD, LOCAL_TRIAGE_TEMPERATURE = 0.45, 0.05
+        return {
+            "mode": LOCAL_TRIAGE_MODE,
+            "confidence": LOCAL_TRIAGE_CONFIDENCE,
+            "min_observed": LOCAL_TRIAGE_MIN_OBSERVED,
+            "observe_threshold": LOCAL_TRIAGE_OBSERVE_THRESHOLD,
+            "temperature": LOCAL_TRIAGE_TEMPERATURE,
+        }
+    
+    def setup_local_triage(self):
+        """Load the trained label model (if any) and embed the reference-sheet descriptors for the zero-LLM tier"""
+        settings = self._triage_settings()
+        if settings["mode"] == "off":
+            return
+        self.label_model = get_label_model(self.embeddings)
+        if self.label_model is not None:
+            print(f"Local label model ready ({self.label_model.metadata.get('labels_trained', 0)} labels, "
+                  f"trained {self.label_model.metadata.get('trained_at', 'unknown')})")
+        try:
+            self.local_triage = LocalTriageClassifier(
+                self.embeddings,
+                self.csv_reference_processor,
+                self.qualities,
+                observe_threshold=settings["observe_threshold"],
+                temperature=settings["temperature"]
+            ).fit()
+            print(f"Local triage ready with {len(self.local_triage.descriptors)} reference descriptors")
+        except Exception as e:
+            print(f"Warning: Local triage unavailable: {e}")
+            self.local_triage = None
+    
+    def triage_batch(self, observations_list: List[str]) -> List[Dict[str, Any]]:
+        """Local assessments for a whole class in one embedding pass (None entries when triage is off).
+
+        The supervised label model is preferred over reference-sheet triage when one has been trained.
+        """
+        observations_list = [o or "" for o in observations_list]
+        if self.label_model is not None:
+            try:
+                return self.label_model.assess_batch(observations_list)
+            except Exception as e:
+                print(f"Label model failed, using reference-sheet triage: {e}")
+        if self.local_triage is None:
+            return [None] * len(observations_list)
+        try:
+            return self.local_triage.assess_batch(observations_list)
+        except Exception as e:
+            print(f"Local triage failed: {e}")
+            return [None] * len(observations_list)
+    
+    def batch_local_results(self, observations_list: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Local results to pass to assess_student_personality for a batch.
+        
+        Only "route" mode checks every student against the local tier before
+        calling Gemini, so only then is the class scored up front in one pass.
+        Otherwise the entries are None and a student is scored locally only
+        when its Gemini call fails and the fallback is actually needed.
+        """
+        if not self._routes_before_llm():
+            return [None] * len(observations_list)
+        return self.triage_batch(observations_list)
+    
+    def _routes_before_llm(self) -> bool:
+        """True when the local result is consulted before Gemini (route mode, or the daily quota is spent)"""
+        if self.label_model is None and self.local_triage is None:
+            return False
+        return self._triage_settings()["mode"] == "route" or self._quota_exhausted()
+    
+    def _quota_exhausted(self) -> bool:
+        status = get_rate_limiter().get_status()
+        return status['daily_requests'] >= status['max_per_day']
+    
+    def _route_locally(self, local_result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Return the local result when the routing policy says Gemini is not needed"""
+        if local_result is None:
+            return None
+        settings = self._triage_settings()
+        if self._quota_exhausted():
+            print(f"Gemini daily quota exhausted; using local result ({local_result.get('source')})")
+            return dict(local_result, fallback_reason="Daily Gemini quota exhausted")
+        observed = [a for a in local_result['assessments'] if a['level'] != "NOT OBSERVED"]
+        if (settings["mode"] == "route" and local_result['confidence'] >= settings["confidence"]
+                and len(observed) >= settings["min_observed"]):
+            return local_result
+        return None
+    
+    def _local_result_for(self, observations: str, local_result: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        if local_result is None and (self.label_model is not None or self.local_triage is not None):
+            local_result = self.triage_batch([observations])[0]
+        return local_result
     
     def create_assessment_prompt(self) -> ChatPromptTemplate:
         """Create the prompt template for personality assessment"""
@@ -238,9 +393,142 @@ Remember: Only assess qualities that are clearly demonstrated in the observation
 
         return ChatPromptTemplate.from_template(template)
     
+    def create_compact_assessment_prompt(self) -> ChatPromptTemplate:
+        """Create the prompt template for the compact response format"""
+        template = """You are an expert personality assessor for rural students. Assess the student's personality traits from the observer notes.
+
+CONTEXT INFORMATION:
+{context}
+
+STUDENT OBSERVATIONS:
+{observations}
+
+Rate each quality with clear evidence as LOW, MIDDLE or HIGH, using the reference sheet and PDF definitions. Be conservative - don't hallucinate traits without evidence.
+
+{format_instructions}"""
+
+        return ChatPromptTemplate.from_template(template)
+    
+    def create_structured_assessment_prompt(self) -> ChatPromptTemplate:
+        """Create the prompt template for native structured output (the response schema defines the format)"""
+        template = """You are an expert personality assessor for rural students. Your task is to evaluate a student's personality traits based on observer notes.
+
+CONTEXT INFORMATION:
+{context}
+
+STUDENT OBSERVATIONS:
+{observations}
+
+TASK: For each of these qualities, rate the student LOW, MIDDLE or HIGH where the observations give clear evidence, and NOT OBSERVED otherwise:
+{qualities}
+
+Use the reference sheet and PDF definitions to understand each quality. Be conservative - don't hallucinate traits without evidence. Give brief reasoning for each rating and an overall summary."""
+
+        return ChatPromptTemplate.from_template(template)
+    
+    def _use_native_schema(self) -> bool:
+        try:
+            from config import USE_NATIVE_RESPONSE_SCHEMA
+            return USE_NATIVE_RESPONSE_SCHEMA
+        except ImportError:
+            return False
+    
+    def _assessment_client(self, model: Optional[str] = None):
+        """Client for an assessment call, with the response schema when native structured output is on"""
+        if self._use_native_schema():
+            return self.model_router.client(model, response_schema=assessment_response_schema(self.qualities))
+        return self.model_router.client(model)
+    
+    def _use_compact_format(self) -> bool:
+        try:
+            from config import USE_COMPACT_RESPONSE_FORMAT
+            return USE_COMPACT_RESPONSE_FORMAT
+        except ImportError:
+            return False
+    
+    @property
+    def llm(self):
+        """Client for the best usable model (read-only; never swapped in place)"""
+        return self.model_router.client()
+    
+    def _build_assessment_chain(self, retriever, compact: bool = None, llm=None):
+        """Return (chain without output parser, parser) for the configured response format"""
+        if llm is None:
+            llm = self._assessment_client()
+        if compact is None:
+            compact = self._use_compact_format()
+        if self._use_native_schema():
+            # The schema travels with the request, so the prompt carries no format instructions
+            parser = SchemaOutputParser()
+            prompt = self.create_structured_assessment_prompt()
+        elif compact:
+            try:
+                from config import COMPACT_REASONING_WORDS
+            except ImportError:
+                COMPACT_REASONING_WORDS = 12
+            parser = CompactOutputParser(qualities=list(self.qualities), reasoning_words=COMPACT_REASONING_WORDS)
+            prompt = self.create_compact_assessment_prompt()
+        else:
+            parser = PydanticOutputParser(pydantic_object=AssessmentResult)
+            prompt = self.create_assessment_prompt_with_parser(parser)
+        return self._assessment_inputs(retriever, parser) | prompt | self._log_prompt_tokens | llm, parser
+    
+    def assess_student_personality(self, observations: str, local_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Assess a student's personality based on observations.
+        
+        The local triage tier answers without a Gemini call when it is confident
+        (LOCAL_TRIAGE_MODE = "route") or when the Gemini quota is exhausted.
+        While the circuit breaker is open (Gemini down or out of quota) the call
+        fails fast: the local result is used if there is one, otherwise the
+        student is returned as an error marked ``deferred`` for a later retry.
+        ``local_result`` lets batch callers pass a precomputed triage result;
+        without one the student is scored locally only when it is needed.
+        Every assessment is written to the usage ledger.
+        """
+        usage = new_usage()
+        if self._routes_before_llm():
+            local_result = self._local_result_for(observations, local_result)
+            routed = self._route_locally(local_result)
+            if routed is not None:
+                self._record_usage(observations, usage, "local", routed.get('source', 'local'))
+                return routed
+        breaker = get_circuit_breaker()
+        if breaker is not None and not breaker.allow():
+            result = self._circuit_open_result(observations, breaker)
+        else:
+            result = self._assess_with_llm(observations, usage)
+        error = result.get('error', '')
+        if "429" in error or result.get('deferred'):
+            # In "fallback" mode the student is only scored locally now that Gemini has failed
+            local_result = self._local_result_for(observations, local_result)
+            if local_result is not None:
+                self._record_usage(observations, usage, "local_fallback", local_result.get('source', 'local'))
+                return dict(local_result, fallback_reason=error)
+        self._record_usage(observations, usage, "deferred" if result.get('deferred') else "error" if error else "ok")
+        return result
+    
+    def _circuit_open_result(self, observations: str, breaker) -> Dict[str, Any]:
+        """Error result for a call refused by the open circuit, marked for a deferred retry"""
+        return {
+            "error": f"Gemini unavailable (circuit open); deferred for retry: {breaker.last_error}",
+            "deferred": True,
+            "retry_after": breaker.retry_after(),
+            "observations": observations
+        }
+    
+    def _record_usage(self, observations: str, usage: Dict[str, Any], outcome: str, source: str = "llm"):
+        ledger = get_usage_ledger()
+        if ledger is None:
+            return
+        try:
+            ledger.record(observations, usage, outcome, usage["model_seconds"], source=source)
+        except Exception as e:
+            logger.warning(f"Could not write usage ledger: {e}")
+    
     @rate_limited_call
-    def assess_student_personality(self, observations: str) -> Dict[str, Any]:
-        """Assess a student's personality based on observations"""
+    def _assess_with_llm(self, observations: str, usage: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Assess a student's personality with Gemini (token usage is added to ``usage``)"""
+        usage = usage if usage is not None else new_usage()
         if not self.vector_store:
             raise ValueError("Vector database not initialized. Call setup_vector_database() first.")
         
@@ -251,45 +539,80 @@ Remember: Only assess qualities that are clearly demonstrated in the observation
             MAX_RETRIES = 3
             RETRY_DELAY = 30
             RETRY_ON_RATE_LIMIT = True
-        
-        # Create structured output parser
-        parser = PydanticOutputParser(pydantic_object=AssessmentResult)
-        
-        # Create the assessment prompt with parser instructions
-        prompt = self.create_assessment_prompt_with_parser(parser)
-        
-        # Retrieve relevant context
         try:
-            from config import MAX_RETRIEVAL_RESULTS
-            k_value = MAX_RETRIEVAL_RESULTS
+            from config import ASSESSMENT_TIMEOUT
         except ImportError:
-            k_value = 10
+            ASSESSMENT_TIMEOUT = 120
         
-        retriever = self.vector_store.as_retriever(search_kwargs={"k": k_value})
+        # The whole assessment, retries included, must finish within ASSESSMENT_TIMEOUT
+        deadline = time.monotonic() + ASSESSMENT_TIMEOUT
+        invoker = get_hedged_invoker()
+        breaker = get_circuit_breaker()
         
-        # Create the assessment chain with structured output
-        chain = (
-            {"context": retriever, "observations": RunnablePassthrough(), "qualities": lambda x: ", ".join(self.qualities), "format_instructions": lambda x: parser.get_format_instructions()}
-            | prompt
-            | self.llm
-            | parser
-        )
+        # Retrieve relevant context
+        retriever = self._get_retriever()
         
         # Retry logic for rate limits
         for attempt in range(MAX_RETRIES + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return {
+                    "error": f"Assessment timed out after {ASSESSMENT_TIMEOUT} seconds",
+                    "observations": observations
+                }
+            # Each attempt gets its own client for the best model still usable
+            model = self.model_router.primary_model()
             try:
-                # Get assessment
-                result = chain.invoke(observations)
+                # Create the assessment chain (verbose or compact format); parsing happens
+                # separately so a malformed response can be repaired locally
+                chain, parser = self._build_assessment_chain(retriever, llm=self._assessment_client(model))
+                hedge_llm = self._assessment_client(self.model_router.hedge_model(model))
+                
+                # Get assessment (bounded by the deadline; possibly hedged)
+                call_start = time.perf_counter()
+                message = invoker.invoke(
+                    lambda: chain.invoke(observations),
+                    timeout=remaining,
+                    hedge=lambda: self._build_assessment_chain(retriever, llm=hedge_llm)[0].invoke(observations)
+                )
+                usage["model_seconds"] += time.perf_counter() - call_start
+                text = _message_text(message)
+                add_message_usage(usage, message, model, text)
                 
-                # Convert Pydantic model to dict
-                return result.model_dump()
+                # Parse (or repair) into a dict; only an unrepairable response reaches the fallback call
+                result = self._parse_response(parser, text)
+                record_key_success()
+                if breaker is not None:
+                    breaker.record_success()
+                if result is not None:
+                    return result
+                raise OutputParserException("Model output could not be parsed or repaired", llm_output=text)
                     
+            except DeadlineExceeded as e:
+                if breaker is not None:
+                    breaker.record_failure(f"Timeout: {e}")
+                return {
+                    "error": f"Assessment timed out after {ASSESSMENT_TIMEOUT} seconds: {e}",
+                    "observations": observations
+                }
             except Exception as e:
                 error_str = str(e)
+                if breaker is not None:
+                    breaker.record_result(error_str)
+                    # Stop retrying once the outage is established; later students fail fast too
+                    if breaker.is_open():
+                        return self._circuit_open_result(observations, breaker)
+                
+                # With a key pool, a 429 or auth error on one key moves the retry to another key
+                if record_key_error(error_str) and attempt < MAX_RETRIES:
+                    usage["retries"] += 1
+                    print(f"API key problem (attempt {attempt + 1}/{MAX_RETRIES + 1}); retrying with another key")
+                    continue
                 
                 # Check if it's a rate limit error
                 if "429" in error_str and ("quota" in error_str.lower() or "rate" in error_str.lower()) and RETRY_ON_RATE_LIMIT:
-                    if attempt < MAX_RETRIES:
+                    if attempt < MAX_RETRIES and deadline - time.monotonic() > RETRY_DELAY:
+                        usage["retries"] += 1
                         print(f"Rate limit hit (attempt {attempt + 1}/{MAX_RETRIES + 1}). Waiting {RETRY_DELAY} seconds...")
                         print(f"Error details: {error_str}")
                         time.sleep(RETRY_DELAY)
@@ -300,34 +623,21 @@ Remember: Only assess qualities that are clearly demonstrated in the observation
                             "observations": observations
                         }
                 
-                # Attempt to switch model on NotFound errors or unsupported methods
-                if "NotFound" in error_str or "is not found" in error_str:
-                    if self.current_model_index < len(self.model_candidates) - 1:
-                        self.current_model_index += 1
-                        try:
-                            self.llm = ChatGoogleGenerativeAI(
-                                model=self.model_candidates[self.current_model_index],
-                                temperature=temperature,
-                                google_api_key=os.getenv("GOOGLE_API_KEY")
-                            )
-                            continue
-                        except Exception:
-                            pass
-                if "not supported for generateContent" in error_str.lower():
-                    if self.current_model_index < len(self.model_candidates) - 1:
-                        self.current_model_index += 1
-                        try:
-                            self.llm = ChatGoogleGenerativeAI(
-                                model=self.model_candidates[self.current_model_index],
-                                temperature=temperature,
-                                google_api_key=os.getenv("GOOGLE_API_KEY")
-                            )
-                            continue
-                        except Exception:
-                            pass
-                # For other errors, try fallback
+                # Route later attempts (and other requests) away from a model that is not found or unsupported
+                if model and is_model_unavailable_error(error_str):
+                    self.model_router.mark_unavailable(model)
+                    if self.model_router.primary_model() is not None:
+                        continue
+                # For other errors, try fallback (pointless while Gemini itself is unreachable,
+                # and skipped when the deadline leaves no time for another call)
+                if (breaker is not None and is_outage_error(error_str)) or deadline - time.monotonic() <= 0:
+                    return {
+                        "error": f"Assessment failed after retries: {error_str}",
+                        "observations": observations
+                    }
                 try:
-                    fallback_result = self._fallback_assessment(observations, retriever)
+                    usage["fallback_calls"] += 1
+                    fallback_result = self._fallback_assessment(observations, retriever, usage, deadline)
                     # Only accept fallback if it returns multiple assessments
                     if fallback_result and len(fallback_result.get("assessments", [])) >= 2:
                         return fallback_result
@@ -339,48 +649,227 @@ Remember: Only assess qualities that are clearly demonstrated in the observation
                     "observations": observations
                 }
     
+    def _get_retriever(self):
+        """Vector store retriever for assessment context"""
+        try:
+            from config import MAX_RETRIEVAL_RESULTS
+            k_value = MAX_RETRIEVAL_RESULTS
+        except ImportError:
+            k_value = 10
+        return self.vector_store.as_retriever(search_kwargs={"k": k_value})
+    
+    def _assemble_context(self, documents: List[Document]) -> str:
+        """Deduplicate retrieved chunks and pack them into the context token budget"""
+        context, stats = get_context_assembler().assemble(documents)
+        logger.info(
+            f"Context: {stats['chunks_used']}/{stats['chunks_retrieved']} chunks, "
+            f"{stats['context_tokens']} tokens (raw {stats['raw_tokens']}"
+            f"{', truncated' if stats['truncated'] else ''})"
+        )
+        return context
+    
+    def _log_prompt_tokens(self, prompt_value):
+        """Log the size of the rendered prompt and pass it through unchanged"""
+        logger.info(f"Assessment prompt: {count_tokens(prompt_value.to_string())} tokens")
+        return prompt_value
+    
+    def _assessment_inputs(self, retriever, parser) -> Dict[str, Any]:
+        """Prompt variables for the structured assessment prompt"""
+        return {
+            "context": retriever | self._assemble_context,
+            "observations": RunnablePassthrough(),
+            "qualities": lambda x: ", ".join(self.qualities),
+            "format_instructions": lambda x: parser.get_format_instructions()
+        }
+    
+    def stream_student_personality(self, observations: str) -> Iterator[Dict[str, Any]]:
+        """Stream an assessment, yielding each quality item as soon as it is generated.
+        
+        Yields {"type": "item", "item": {...}} events while the response streams in,
+        then one {"type": "result", "result": {...}} event with the full assessment
+        (same shape as assess_student_personality). If the stream is clearly
+        malformed or fails, it is aborted early ({"type": "aborted", ...}) and the
+        regular retrying path produces the result instead.
+        """
+        routed = self._route_locally(self._local_result_for(observations)) if self._routes_before_llm() else None
+        if routed is not None:
+            yield {"type": "result", "result": routed}
+            return
+        breaker = get_circuit_breaker()
+        if breaker is not None and not breaker.allow():
+            # Nothing to stream; the regular path fails fast or uses the local tier
+            yield {"type": "result", "result": self.assess_student_personality(observations)}
+            return
+        yield from self._stream_with_llm(observations)
+    
     @rate_limited_call
-    def _fallback_assessment(self, observations: str, retriever) -> Dict[str, Any]:
-        """Fallback assessment method using string parsing"""
+    def _stream_with_llm(self, observations: str) -> Iterator[Dict[str, Any]]:
+        if not self.vector_store:
+            raise ValueError("Vector database not initialized. Call setup_vector_database() first.")
+        
+        try:
+            from config import STREAM_MAX_PREAMBLE_CHARS
+        except ImportError:
+            STREAM_MAX_PREAMBLE_CHARS = 2000
+        try:
+            from config import ASSESSMENT_TIMEOUT, MAX_RETRIES
+        except ImportError:
+            ASSESSMENT_TIMEOUT = 120
+            MAX_RETRIES = 3
+        
+        # Same end-to-end budget as the regular path; checked between chunks
+        deadline = time.monotonic() + ASSESSMENT_TIMEOUT
+        retriever = self._get_retriever()
+        usage = new_usage()
+        for attempt in range(MAX_RETRIES + 1):
+            # Rebuilt per attempt so a retry uses the key the pool just switched this thread to
+            model = self.model_router.primary_model()
+            chain, parser = self._build_assessment_chain(retriever, llm=self._assessment_client(model))
+            if isinstance(parser, CompactOutputParser):
+                codes = quality_codes(parser.qualities)
+                stream_parser = IncrementalAssessmentParser(
+                    max_preamble_chars=STREAM_MAX_PREAMBLE_CHARS,
+                    array_key="a",
+                    item_parser=lambda entry: expand_compact_item(entry, codes)
+                )
+            else:
+                stream_parser = IncrementalAssessmentParser(max_preamble_chars=STREAM_MAX_PREAMBLE_CHARS)
+            
+            combined = None
+            call_start = time.perf_counter()
+            stream = chain.stream(observations)
+            try:
+                for chunk in stream:
+                    if time.monotonic() > deadline:
+                        raise DeadlineExceeded(f"Streamed response did not finish within {ASSESSMENT_TIMEOUT} seconds")
+                    combined = chunk if combined is None else combined + chunk
+                    for item in stream_parser.feed(_message_text(chunk)):
+                        yield {"type": "item", "item": item}
+            except DeadlineExceeded as e:
+                stream.close()
+                if get_circuit_breaker() is not None:
+                    get_circuit_breaker().record_failure(f"Timeout: {e}")
+                print(f"Aborting streamed assessment: {e}")
+                yield {"type": "aborted", "reason": str(e)}
+                # The budget is spent, so there is no regular-path retry
+                result = {"error": f"Assessment timed out after {ASSESSMENT_TIMEOUT} seconds: {e}", "observations": observations}
+                usage["model_seconds"] += time.perf_counter() - call_start
+                self._record_usage(observations, usage, "error")
+                yield {"type": "result", "result": result}
+                return
+            except Exception as e:
+                # Closing the stream stops generation instead of waiting for the rest
+                stream.close()
+                usage["model_seconds"] += time.perf_counter() - call_start
+                error_str = str(e)
+                malformed = isinstance(e, MalformedStreamError)
+                if get_circuit_breaker() is not None:
+                    # A malformed stream still means Gemini answered (and settles a half-open probe)
+                    get_circuit_breaker().record_result(None if malformed else error_str)
+                if malformed:
+                    record_key_success()
+                # As in the regular path, a 429 or auth error on a pooled key moves the retry to another key;
+                # the stream restarts only if nothing has been shown yet
+                elif (record_key_error(error_str) and attempt < MAX_RETRIES and not stream_parser.items
+                      and not (get_circuit_breaker() is not None and get_circuit_breaker().is_open())):
+                    usage["retries"] += 1
+                    print(f"API key problem (attempt {attempt + 1}/{MAX_RETRIES + 1}); restarting stream with another key")
+                    continue
+                reason = error_str if malformed else f"Streaming failed: {e}"
+                print(f"Aborting streamed assessment: {reason}")
+                yield {"type": "aborted", "reason": reason}
+                yield {"type": "result", "result": self.assess_student_personality(observations)}
+                return
+            break
+        
+        usage["model_seconds"] += time.perf_counter() - call_start
+        record_key_success()
+        if get_circuit_breaker() is not None:
+            get_circuit_breaker().record_success()
+        add_message_usage(usage, combined, model, stream_parser.text)
+        result = self._parse_response(parser, stream_parser.text)
+        if result is None:
+            if not stream_parser.items:
+                yield {"type": "aborted", "reason": "Could not parse or repair streamed response"}
+                yield {"type": "result", "result": self.assess_student_personality(observations)}
+                return
+            # Keep the items that streamed in cleanly; the summary may have been cut off
+            result = canonical_result({"assessments": stream_parser.items, "summary": ""})
+        self._record_usage(observations, usage, "ok")
+        yield {"type": "result", "result": result}
+    
+    def _parse_response(self, parser, text: str) -> Optional[Dict[str, Any]]:
+        """Parse a raw model response, repairing it locally if the parser rejects it.
+        
+        The result is normalized once here (canonical quality names and levels,
+        one item per quality). Returns None when the response cannot be repaired either.
+        """
+        stats = get_repair_stats()
+        try:
+            result = parser.parse(text).model_dump()
+            stats.record_clean()
+            return canonical_result(result)
+        except Exception as parse_error:
+            try:
+                result, steps = repair_assessment_json(text, self.qualities, model=AssessmentResult)
+            except RepairError as e:
+                stats.record(False, [])
+                logger.warning(f"JSON repair failed ({e}); original parse error: {parse_error}")
+                return None
+            stats.record(True, steps)
+            logger.info(f"Repaired model output locally: {', '.join(steps) or 'revalidated'}")
+            return canonical_result(result)
+    
+    @rate_limited_call
+    def _fallback_assessment(self, observations: str, retriever, usage: Optional[Dict[str, Any]] = None,
+                             deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Fallback assessment with the plain verbose prompt (token usage is added to ``usage``).
+        
+        ``deadline`` (time.monotonic()) is the caller's assessment deadline; the call
+        is bounded by what is left of it after the rate limiter wait.
+        """
+        usage = usage if usage is not None else new_usage()
+        if deadline is None:
+            try:
+                from config import ASSESSMENT_TIMEOUT
+            except ImportError:
+                ASSESSMENT_TIMEOUT = 120
+            deadline = time.monotonic() + ASSESSMENT_TIMEOUT
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return {
+                "error": "Fallback assessment skipped: assessment deadline passed while waiting for the rate limiter",
+                "observations": observations
+            }
         try:
             # Use the original prompt method
             prompt = self.create_assessment_prompt()
+            model = self.model_router.primary_model()
             
-            # Create simple chain
+            # Create simple chain; the raw message keeps its usage metadata
             chain = (
-                {"context": retriever, "observations": RunnablePassthrough(), "qualities": lambda x: ", ".join(self.qualities)}
+                {"context": retriever | self._assemble_context, "observations": RunnablePassthrough(), "qualities": lambda x: ", ".join(self.qualities)}
                 | prompt
-                | self.llm
-                | StrOutputParser()
+                | self.model_router.client(model)
             )
             
-            # Get assessment
-            result = chain.invoke(observations)
-            result = result.strip()
+            # Get assessment (bounded by what is left of the deadline)
+            call_start = time.perf_counter()
+            message = get_hedged_invoker().invoke(lambda: chain.invoke(observations), timeout=remaining)
+            usage["model_seconds"] += time.perf_counter() - call_start
+            result = _message_text(message).strip()
+            add_message_usage(usage, message, model, result)
             
-            # Try to parse JSON
-            try:
-                parsed_result = json.loads(result)
+            # Parse (or repair) like the main path, so the result is canonical too
+            parsed_result = self._parse_response(PydanticOutputParser(pydantic_object=AssessmentResult), result)
+            if parsed_result is not None:
                 return parsed_result
-            except json.JSONDecodeError as e:
-                # Try to extract JSON from the response
-                import re
-                json_match = re.search(r'\{.*\}', result, re.DOTALL)
-                if json_match:
-                    try:
-                        json_content = json_match.group(0)
-                        parsed_result = json.loads(json_content)
-                        return parsed_result
-                    except json.JSONDecodeError:
-                        pass
-                
-                # If all parsing attempts fail, return detailed error
-                return {
-                    "raw_response": result,
-                    "error": f"Could not parse JSON response: {str(e)}",
-                    "response_length": len(result),
-                    "response_preview": result[:200] + "..." if len(result) > 200 else result
-                }
+            return {
+                "raw_response": result,
+                "error": "Could not parse JSON response",
+                "response_length": len(result),
+                "response_preview": result[:200] + "..." if len(result) > 200 else result
+            }
                 
         except Exception as e:
             return {
@@ -391,6 +880,8 @@ Remember: Only assess qualities that are clearly demonstrated in the observation
     def batch_assess_students(self, students_data: List[Dict[str, str]]) -> List[Dict[str, Any]]:
         """Assess multiple students in batch"""
         results = []
+        # Score the whole class locally in one pass
+        local_results = self.batch_local_results([s.get('observations', '') for s in students_data])
         
         for i, student in enumerate(students_data):
             print(f"Assessing student {i+1}/{len(students_data)}: {student.get('name', f'Student {i+1}')}")
@@ -405,7 +896,7 @@ Remember: Only assess qualities that are clearly demonstrated in the observation
                 continue
             
             try:
-                assessment = self.assess_student_personality(observations)
+                assessment = self.assess_student_personality(observations, local_result=local_results[i])
                 results.append({
                     "student_id": student.get('id', f'student_{i+1}'),
                     "name": student.get('name', f'Student {i+1}'),
@@ -418,45 +909,23 @@ Remember: Only assess qualities that are clearly demonstrated in the observation
                     "error": f"Assessment failed: {str(e)}"
                 })
         
+        # Students the open circuit put off get one more try once it allows calls again
+        deferred = [i for i, r in enumerate(results) if (r.get('assessment') or {}).get('deferred')]
+        breaker = get_circuit_breaker()
+        wait = breaker.retry_after() if deferred and breaker is not None else 0.0
+        if wait > 0:
+            print(f"Gemini unavailable; retrying {len(deferred)} deferred students in {wait:.0f}s")
+            time.sleep(wait)
+        for n, i in enumerate(deferred):
+            print(f"Retrying deferred student {n+1}/{len(deferred)}: {results[i]['name']}")
+            try:
+                results[i]['assessment'] = self.assess_student_personality(students_data[i]['observations'], local_result=local_results[i])
+            except Exception as e:
+                results[i] = {"student_id": results[i]['student_id'], "name": results[i]['name'],
+                              "error": f"Assessment failed: {str(e)}"}
+        
         return results
 
-    def _heuristic_assessment(self, observations: str) -> Dict[str, Any]:
-        """Produce a simple heuristic assessment when LLM is unavailable."""
-        text = (observations or "").lower()
-        keywords = {
-            "leadership": ["lead", "led", "organize", "captain"],
-            "creativity": ["creative", "idea", "innov", "design"],
-            "enthusiasm": ["enthusiastic", "eager", "excited", "active"],
-            "academic achievement": ["score", "grade", "rank", "marks"],
-            "self control": ["calm", "control", "discipline", "patient"],
-            "social warmth": ["friendly", "help", "support", "team"],
-            "boldness": ["confident", "bold", "speak up", "present"],
-            "sensitivity": ["sensitive", "empathy", "kind", "caring"],
-        }
-        assessments = []
-        for quality in self.qualities:
-            q_lower = quality.lower()
-            cues = keywords.get(q_lower, [])
-            score = sum(1 for k in cues if k in text)
-            if score >= 2:
-                level = "HIGH"
-            elif score == 1:
-                level = "MIDDLE"
-            else:
-                level = "NOT OBSERVED"
-            assessments.append({
-                "quality": quality,
-                "level": level,
-                "reasoning": "Heuristic fallback based on keyword presence"
-            })
-        summary = "Heuristic fallback assessment generated due to LLM unavailability."
-        # Filter to only observed qualities for downstream labeling utility
-        observed = [a for a in assessments if a["level"] != "NOT OBSERVED"]
-        return {
-            "assessments": observed,
-            "summary": summary
-        }
-    
     def save_assessments(self, assessments: List[Dict[str, Any]], filename: str = "personality_assessments.json"):
         """Save assessment results to JSON file"""
         try:
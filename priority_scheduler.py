@@ -0,0 +1,148 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+PRIORITY_BACKGROUND = "background"
+# Highest first
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH, PRIORITY_BACKGROUND)
+
+_context = threading.local()
+
+
+@contextmanager
+def scheduling(priority: str, flow: Optional[str] = None, weight: float = 1.0):
+    """Run model calls made by this thread under a priority class and fair-share flow"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r}; expected one of {', '.join(PRIORITIES)}")
+    previous = getattr(_context, "value", None)
+    _context.value = (priority, flow, weight)
+    try:
+        yield
+    finally:
+        _context.value = previous
+
+
+def current_scheduling() -> tuple:
+    """(priority, flow, weight) of the calling thread; unmarked threads are interactive"""
+    return getattr(_context, "value", None) or (PRIORITY_INTERACTIVE, None, 1.0)
+
+
+class _Ticket:
+    __slots__ = ("priority", "flow", "weight", "seq")
+
+    def __init__(self, priority: str, flow: str, weight: float, seq: int):
+        self.priority = priority
+        self.flow = flow
+        self.weight = weight
+        self.seq = seq
+
+
+class PriorityScheduler:
+    """Admission gate in front of the rate limiter.
+
+    Callers queue by priority class (interactive > batch > background) and
+    are admitted to the limiter one at a time, so a one-off assessment waits
+    for at most the call already being paced rather than a whole batch
+    queue. Within a class, flows (e.g. batches from different sessions)
+    share admissions by weighted fair queueing: each admission advances the
+    flow's virtual time by 1 / weight and the flow with the earliest virtual
+    start goes next.
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self._cond = threading.Condition()
+        self._waiting: Dict[str, List[_Ticket]] = {p: [] for p in PRIORITIES}
+        self._busy = False
+        self._seq = 0
+        self._vclock = 0.0
+        self._flow_vtime: Dict[str, float] = {}
+        self.stats = {p: {"admitted": 0, "total_wait": 0.0, "max_wait": 0.0} for p in PRIORITIES}
+
+    def _virtual_start(self, ticket: _Ticket) -> float:
+        return max(self._flow_vtime.get(ticket.flow, 0.0), self._vclock)
+
+    def _next(self) -> Optional[_Ticket]:
+        for priority in PRIORITIES:
+            queue = self._waiting[priority]
+            if queue:
+                # FIFO within a flow; earliest virtual start across flows
+                return min(queue, key=lambda t: (self._virtual_start(t), t.seq))
+        return None
+
+    def _prune_flows(self):
+        """Forget idle flows the virtual clock has caught up with (they would start at _vclock anyway)"""
+        waiting = {t.flow for queue in self._waiting.values() for t in queue}
+        for flow in [f for f, vtime in self._flow_vtime.items() if vtime <= self._vclock and f not in waiting]:
+            del self._flow_vtime[flow]
+
+    def acquire(self, priority: Optional[str] = None, flow: Optional[str] = None, weight: Optional[float] = None) -> float:
+        """Wait for this thread's turn, then for the rate limiter; returns seconds waited"""
+        ctx_priority, ctx_flow, ctx_weight = current_scheduling()
+        priority = priority or ctx_priority
+        flow = flow or ctx_flow or threading.current_thread().name
+        weight = weight or ctx_weight
+        start = time.perf_counter()
+        with self._cond:
+            self._seq += 1
+            ticket = _Ticket(priority, flow, max(weight, 1e-6), self._seq)
+            self._waiting[priority].append(ticket)
+            while self._busy or self._next() is not ticket:
+                self._cond.wait()
+            self._waiting[priority].remove(ticket)
+            self._busy = True
+            virtual_start = self._virtual_start(ticket)
+            self._vclock = virtual_start
+            self._flow_vtime[flow] = virtual_start + 1.0 / ticket.weight
+            self._prune_flows()
+        try:
+            self.limiter.wait_if_needed()
+        finally:
+            waited = time.perf_counter() - start
+            with self._cond:
+                self._busy = False
+                if not any(self._waiting.values()):
+                    # Idle: as in start-time fair queueing the clock moves to the last finish time, so every flow is idle
+                    self._vclock = max(self._flow_vtime.values(), default=self._vclock)
+                    self._prune_flows()
+                stats = self.stats[priority]
+                stats["admitted"] += 1
+                stats["total_wait"] += waited
+                stats["max_wait"] = max(stats["max_wait"], waited)
+                self._cond.notify_all()
+        return waited
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                p: {
+                    "waiting": len(self._waiting[p]),
+                    "admitted": s["admitted"],
+                    "mean_wait": (s["total_wait"] / s["admitted"]) if s["admitted"] else 0.0,
+                    "max_wait": s["max_wait"],
+                }
+                for p, s in self.stats.items()
+            }
+
+
+# Global scheduler instance (in front of the global rate limiter)
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> Optional[PriorityScheduler]:
+    """Get the global scheduler, or None when ENABLE_PRIORITY_SCHEDULER is off"""
+    global _scheduler
+    try:
+        from config import ENABLE_PRIORITY_SCHEDULER
+    except ImportError:
+        ENABLE_PRIORITY_SCHEDULER = True
+    if not ENABLE_PRIORITY_SCHEDULER:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            from rate_limiter import get_rate_limiter
+            _scheduler = PriorityScheduler(get_rate_limiter())
+    return _scheduler
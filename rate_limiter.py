@@ -17,8 +17,13 @@ class RateLimiter:
         self.daily_requests = deque()
         self.last_request_time = 0
         
-        # Thread safety
-        self.lock = threading.Lock()
+        # Time callers spent queued in wait_if_needed
+        self.queued_calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        
+        # Thread safety (re-entrant: waiting at a limit re-checks while holding the lock)
+        self.lock = threading.RLock()
         
         # Setup logging
         logging.basicConfig(level=logging.INFO)
@@ -38,6 +43,15 @@ class RateLimiter:
     
     def wait_if_needed(self):
         """Wait if rate limits would be exceeded"""
+        start = time.perf_counter()
+        self._wait_if_needed()
+        waited = time.perf_counter() - start
+        with self.lock:
+            self.queued_calls += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+    
+    def _wait_if_needed(self):
         with self.lock:
             self._cleanup_old_requests()
             now = datetime.now()
@@ -49,7 +63,7 @@ class RateLimiter:
                 if wait_time > 0:
                     self.logger.warning(f"Rate limit reached. Waiting {wait_time:.1f} seconds...")
                     time.sleep(wait_time)
-                    return self.wait_if_needed()  # Recursive call after waiting
+                    return self._wait_if_needed()  # Recursive call after waiting
             
             if len(self.daily_requests) >= self.max_requests_per_day:
                 oldest_request = self.daily_requests[0]
@@ -57,7 +71,7 @@ class RateLimiter:
                 if wait_time > 0:
                     self.logger.warning(f"Daily limit reached. Waiting {wait_time/3600:.1f} hours...")
                     time.sleep(wait_time)
-                    return self.wait_if_needed()
+                    return self._wait_if_needed()
             
             # Ensure minimum delay between calls
             time_since_last = time.time() - self.last_request_time
@@ -70,6 +84,34 @@ class RateLimiter:
             self.daily_requests.append(now)
             self.last_request_time = time.time()
     
+    def try_acquire(self):
+        """Record a request only if it fits the limits right now (never waits)"""
+        with self.lock:
+            self._cleanup_old_requests()
+            if len(self.minute_requests) >= self.max_requests_per_minute:
+                return False
+            if len(self.daily_requests) >= self.max_requests_per_day:
+                return False
+            if time.time() - self.last_request_time < self.delay_between_calls:
+                return False
+            now = datetime.now()
+            self.minute_requests.append(now)
+            self.daily_requests.append(now)
+            self.last_request_time = time.time()
+            return True
+    
+    def time_until_ready(self):
+        """Seconds until a call would pass the limits (0 if it would pass now)"""
+        with self.lock:
+            self._cleanup_old_requests()
+            now = datetime.now()
+            wait = max(0.0, self.delay_between_calls - (time.time() - self.last_request_time))
+            if len(self.minute_requests) >= self.max_requests_per_minute:
+                wait = max(wait, 60 - (now - self.minute_requests[0]).total_seconds())
+            if len(self.daily_requests) >= self.max_requests_per_day:
+                wait = max(wait, 86400 - (now - self.daily_requests[0]).total_seconds())
+            return wait
+    
     def get_status(self):
         """Get current rate limiting status"""
         with self.lock:
@@ -79,18 +121,41 @@ class RateLimiter:
                 'daily_requests': len(self.daily_requests),
                 'max_per_minute': self.max_requests_per_minute,
                 'max_per_day': self.max_requests_per_day,
-                'time_since_last': time.time() - self.last_request_time
+                'time_since_last': time.time() - self.last_request_time,
+                'queued_calls': self.queued_calls,
+                'total_wait_seconds': self.total_wait,
+                'max_wait_seconds': self.max_wait
             }
 
 # Global rate limiter instance
 _rate_limiter = None
 
 def get_rate_limiter():
-    """Get the global rate limiter instance"""
+    """Get the global rate limiter instance (an ApiKeyPool when several API keys are configured)"""
     global _rate_limiter
     if _rate_limiter is None:
         try:
             from config import MAX_REQUESTS_PER_MINUTE, MAX_REQUESTS_PER_DAY, RATE_LIMIT_DELAY
+            from api_key_pool import configured_api_keys
+            keys = configured_api_keys()
+            if len(keys) > 1:
+                from api_key_pool import ApiKeyPool
+                try:
+                    from config import KEY_POOL_FAILURE_THRESHOLD, KEY_POOL_COOLDOWN, KEY_POOL_AUTH_COOLDOWN
+                except ImportError:
+                    KEY_POOL_FAILURE_THRESHOLD, KEY_POOL_COOLDOWN, KEY_POOL_AUTH_COOLDOWN = 3, 300, 3600
+                # Each key has its own quota, so each gets the full per-key limits
+                _rate_limiter = ApiKeyPool(
+                    keys,
+                    max_requests_per_minute=MAX_REQUESTS_PER_MINUTE,
+                    max_requests_per_day=MAX_REQUESTS_PER_DAY,
+                    delay_between_calls=RATE_LIMIT_DELAY,
+                    failure_threshold=KEY_POOL_FAILURE_THRESHOLD,
+                    cooldown=KEY_POOL_COOLDOWN,
+                    auth_cooldown=KEY_POOL_AUTH_COOLDOWN
+                )
+                print(f"Using a pool of {len(keys)} Gemini API keys")
+                return _rate_limiter
             _rate_limiter = RateLimiter(
                 max_requests_per_minute=MAX_REQUESTS_PER_MINUTE,
                 max_requests_per_day=MAX_REQUESTS_PER_DAY,
@@ -106,9 +171,13 @@ def get_rate_limiter():
     return _rate_limiter
 
 def rate_limited_call(func):
-    """Decorator to add rate limiting to API calls"""
+    """Decorator to add rate limiting to API calls (admitted by priority when the scheduler is enabled)"""
     def wrapper(*args, **kwargs):
-        rate_limiter = get_rate_limiter()
-        rate_limiter.wait_if_needed()
+        from priority_scheduler import get_scheduler
+        scheduler = get_scheduler()
+        if scheduler is not None:
+            scheduler.acquire()
+        else:
+            get_rate_limiter().wait_if_needed()
         return func(*args, **kwargs)
     return wrapper
@@ -0,0 +1,64 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from label_normalizer import LEVEL_NAMES, PERSONALITY_QUALITIES
+
+# Levels in the order the model should think about them (NOT OBSERVED is the default)
+SCHEMA_LEVELS = [LEVEL_NAMES[i] for i in (1, 2, 3, 0)]
+
+
+def assessment_response_schema(qualities: Optional[List[str]] = None) -> Dict[str, Any]:
+    """AssessmentResult as a Gemini response schema (OpenAPI subset) with enum qualities and levels.
+
+    Passed as ``response_schema`` in the generation config, the model's output
+    is constrained to this shape, so the prompt needs no format instructions
+    and the response is always parseable JSON.
+    """
+    item = {
+        "type": "OBJECT",
+        "properties": {
+            "quality": {"type": "STRING", "enum": list(qualities or PERSONALITY_QUALITIES)},
+            "level": {"type": "STRING", "enum": list(SCHEMA_LEVELS)},
+            "reasoning": {"type": "STRING", "description": "Brief explanation based on the observations"},
+        },
+        "required": ["quality", "level", "reasoning"],
+        "propertyOrdering": ["quality", "level", "reasoning"],
+    }
+    return {
+        "type": "OBJECT",
+        "properties": {
+            "assessments": {"type": "ARRAY", "items": item},
+            "summary": {"type": "STRING", "description": "Overall assessment summary"},
+        },
+        "required": ["assessments", "summary"],
+        "propertyOrdering": ["assessments", "summary"],
+    }
+
+
+def schema_key(schema: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Stable, hashable identity of a schema (for client caches)"""
+    return json.dumps(schema, sort_keys=True) if schema is not None else None
+
+
+_TYPES = {"OBJECT": dict, "ARRAY": list, "STRING": str, "BOOLEAN": bool, "INTEGER": int, "NUMBER": (int, float)}
+
+
+def schema_errors(value: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """Where ``value`` breaks ``schema`` (type, enum, required); empty if it conforms"""
+    expected = _TYPES.get(str(schema.get("type", "")).upper())
+    if expected is not None and (not isinstance(value, expected) or (expected is not bool and isinstance(value, bool))):
+        return [f"{path}: expected {schema['type'].lower()}, got {type(value).__name__}"]
+    errors = []
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} not in enum")
+    if isinstance(value, dict):
+        for name in schema.get("required", []):
+            if name not in value:
+                errors.append(f"{path}.{name}: missing")
+        for name, sub in schema.get("properties", {}).items():
+            if name in value:
+                errors.extend(schema_errors(value[name], sub, f"{path}.{name}"))
+    elif isinstance(value, list) and "items" in schema:
+        for i, entry in enumerate(value):
+            errors.extend(schema_errors(entry, schema["items"], f"{path}[{i}]"))
+    return errors
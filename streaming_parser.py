@@ -0,0 +1,163 @@
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+
+class MalformedStreamError(ValueError):
+    """Raised as soon as a streamed response clearly cannot be the expected JSON object"""
+
+
+class IncrementalAssessmentParser:
+    """Pull completed quality items out of a streamed assessment JSON object.
+
+    Text is fed chunk by chunk as the LLM generates it. Every entry inside the
+    top-level ``"assessments"`` array is returned from ``feed()`` as soon as its
+    closing brace arrives, so the UI can render it before generation finishes.
+    Each character is scanned once. ``array_key`` and ``item_parser`` let the
+    compact wire format (``{"a": [["LE", "H", "..."]]}``) stream the same way.
+    """
+
+    def __init__(self, max_preamble_chars: int = 2000, array_key: str = "assessments",
+                 item_parser: Optional[Callable[[Any], Dict[str, Any]]] = None):
+        self.max_preamble_chars = max_preamble_chars
+        self.array_key = array_key
+        self.item_parser = item_parser
+        self._key = json.dumps(array_key)
+        self.text = ""
+        self.items: List[Dict[str, Any]] = []
+        self._pos = 0
+        self._state = "start"       # start -> object -> array -> done
+        self._started = False
+        self._depth = 0              # bracket depth inside the current array item
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+        self._key_search_from = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume more streamed text and return any newly completed items"""
+        if not chunk:
+            return []
+        self.text += chunk
+        completed = []
+        while self._pos < len(self.text):
+            if self._state == "start":
+                if not self._consume_preamble():
+                    break
+            elif self._state == "object":
+                if not self._find_array():
+                    break
+            elif self._state == "array":
+                item = self._scan_array()
+                if item is None:
+                    break
+                completed.append(item)
+            else:
+                break
+        self.items.extend(completed)
+        return completed
+
+    def _consume_preamble(self) -> bool:
+        """Skip whitespace and an optional ```json fence, then require '{'"""
+        stripped = self.text[self._pos:].lstrip()
+        if not stripped:
+            self._pos = len(self.text)
+            return False
+        if stripped.startswith("`"):
+            newline = stripped.find("\n")
+            if newline == -1:
+                if len(stripped) > 20:
+                    raise MalformedStreamError("Unterminated code fence at start of response")
+                return False
+            fence = stripped[:newline].strip("` \r").lower()
+            if fence not in ("", "json"):
+                raise MalformedStreamError(f"Unexpected code fence language: {fence!r}")
+            self._pos = len(self.text) - len(stripped) + newline + 1
+            return True
+        if stripped[0] != "{":
+            raise MalformedStreamError(f"Response does not start with a JSON object: {stripped[:40]!r}")
+        self._pos = len(self.text) - len(stripped) + 1
+        self._key_search_from = self._pos
+        self._state = "object"
+        return True
+
+    def _find_array(self) -> bool:
+        """Locate the opening '[' of the assessments array"""
+        key_at = self.text.find(self._key, self._key_search_from)
+        if key_at == -1:
+            if len(self.text) - self._key_search_from > self.max_preamble_chars:
+                raise MalformedStreamError(f'No {self._key} array found in response')
+            # Keep the tail so a key split across chunks is still found
+            self._key_search_from = max(self._key_search_from, len(self.text) - len(self._key))
+            self._pos = len(self.text)
+            return False
+        rest = self.text[key_at + len(self._key):]
+        stripped = rest.lstrip()
+        if not stripped:
+            self._pos = len(self.text)
+            return False
+        if stripped[0] != ":":
+            raise MalformedStreamError(f'{self._key} key is not followed by a value')
+        value = stripped[1:].lstrip()
+        if not value:
+            self._pos = len(self.text)
+            return False
+        if value[0] != "[":
+            raise MalformedStreamError(f'{self._key} is not a JSON array')
+        self._pos = len(self.text) - len(value) + 1
+        self._state = "array"
+        return True
+
+    def _scan_array(self) -> Optional[Dict[str, Any]]:
+        """Advance through the array; return an item when its object closes"""
+        text = self.text
+        while self._pos < len(text):
+            ch = text[self._pos]
+            self._pos += 1
+            if self._item_start is None:
+                if ch in " \t\r\n,":
+                    continue
+                if ch == "]":
+                    self._state = "done"
+                    return None
+                if ch not in "{[":
+                    raise MalformedStreamError(f"Unexpected {ch!r} inside assessments array")
+                self._item_start = self._pos - 1
+                self._depth = 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = text[self._item_start:self._pos]
+                    self._item_start = None
+                    return self._parse_item(raw)
+        return None
+
+    def _parse_item(self, raw: str) -> Dict[str, Any]:
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise MalformedStreamError(f"Invalid assessment item: {e}") from e
+        if self.item_parser is not None:
+            try:
+                return self.item_parser(item)
+            except ValueError as e:
+                raise MalformedStreamError(f"Invalid assessment item: {e}") from e
+        if not isinstance(item, dict) or "quality" not in item or "level" not in item:
+            raise MalformedStreamError(f"Assessment item missing quality/level: {raw[:80]!r}")
+        return item
+
+    @property
+    def array_closed(self) -> bool:
+        return self._state == "done"
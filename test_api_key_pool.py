@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for the API key pool: key health, cooldowns and switching keys
+"""
+
+import time
+
+import pytest
+
+import api_key_pool
+from api_key_pool import ApiKeyPool, configured_api_keys, current_api_key
+
+RATE_LIMIT = "429 Resource has been exhausted (e.g. check quota)."
+AUTH = "400 API key not valid. Please pass a valid API key. [reason: API_KEY_INVALID]"
+
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock(api_key_pool)
+
+
+def _pool(n_keys=2, **kwargs):
+    kwargs.setdefault("failure_threshold", 3)
+    return ApiKeyPool([f"key-{i}" for i in range(n_keys)], max_requests_per_minute=1000,
+                      max_requests_per_day=100000, delay_between_calls=0, **kwargs)
+
+
+def _health(pool):
+    return {k["key"]: k["healthy"] for k in pool.get_status()["keys"]}
+
+
+def test_calls_spread_over_keys():
+    pool = _pool(2)
+    used = []
+    for _ in range(4):
+        pool.wait_if_needed()
+        used.append(current_api_key())
+    assert sorted(used) == ["key-0", "key-0", "key-1", "key-1"]
+    assert [k["calls"] for k in pool.get_status()["keys"]] == [2, 2]
+
+
+def test_rate_limited_key_rests_after_threshold(clock):
+    pool = _pool(2, cooldown=300)
+    pool.wait_if_needed(exclude="key-1")
+    assert current_api_key() == "key-0"
+    for _ in range(2):
+        assert pool.record_error(RATE_LIMIT)
+    assert all(_health(pool).values())
+    assert pool.record_error(RATE_LIMIT)
+    entry = pool._entry("key-0")
+    assert not entry.healthy(clock.now)
+    assert entry.disabled_reason == "429"
+    assert entry.rate_limited == 3
+
+    # While it rests every call goes to the other key
+    for _ in range(3):
+        pool.wait_if_needed()
+        assert current_api_key() == "key-1"
+
+    clock.now += 301
+    assert entry.healthy(clock.now)
+
+
+def test_auth_error_disables_key_at_once(clock):
+    pool = _pool(2, auth_cooldown=3600)
+    pool.wait_if_needed(exclude="key-1")
+    assert pool.record_error(AUTH)
+    entry = pool._entry("key-0")
+    assert not entry.healthy(clock.now)
+    assert entry.disabled_reason == "auth"
+    assert entry.auth_errors == 1
+    clock.now += 3599
+    assert not entry.healthy(clock.now)
+    clock.now += 2
+    assert entry.healthy(clock.now)
+
+
+def test_other_errors_do_not_count_against_the_key():
+    pool = _pool(2)
+    pool.wait_if_needed()
+    assert not pool.record_error("Invalid JSON: Expecting ',' delimiter")
+    assert pool._entry(current_api_key()).consecutive_failures == 0
+
+
+def test_success_resets_consecutive_failures():
+    pool = _pool(2)
+    pool.wait_if_needed(exclude="key-1")
+    pool.record_error(RATE_LIMIT)
+    pool.record_error(RATE_LIMIT)
+    pool.record_success()
+    pool.record_error(RATE_LIMIT)
+    assert pool._entry("key-0").healthy(time.time())
+    assert pool._entry("key-0").consecutive_failures == 1
+
+
+def test_switch_key_moves_thread_to_another_healthy_key():
+    pool = _pool(2)
+    pool.wait_if_needed(exclude="key-1")
+    assert pool.switch_key()
+    assert current_api_key() == "key-1"
+
+
+def test_switch_key_fails_without_another_healthy_key(clock):
+    pool = _pool(2, failure_threshold=1)
+    pool.wait_if_needed(exclude="key-0")
+    pool.record_error(AUTH)
+    pool.wait_if_needed()
+    assert current_api_key() == "key-0"
+    assert not pool.switch_key()
+    assert current_api_key() == "key-0"
+
+
+def test_all_keys_resting_uses_the_one_back_first(clock):
+    pool = _pool(2, failure_threshold=1, cooldown=100, auth_cooldown=3600)
+    pool.wait_if_needed(exclude="key-1")
+    pool.record_error(AUTH)
+    pool.wait_if_needed(exclude="key-0")
+    pool.record_error(RATE_LIMIT)
+    assert not any(_health(pool).values())
+    pool.wait_if_needed()
+    assert current_api_key() == "key-1"
+
+
+def test_status_counts_limits_of_healthy_keys_only(clock):
+    pool = _pool(3)
+    assert pool.get_status()["max_per_minute"] == 3000
+    pool.wait_if_needed()
+    pool.record_error(AUTH)
+    status = pool.get_status()
+    assert status["max_per_minute"] == 2000
+    assert [k["disabled_reason"] for k in status["keys"]].count("auth") == 1
+
+
+def test_pool_needs_a_key():
+    with pytest.raises(ValueError):
+        ApiKeyPool([])
+
+
+def test_configured_keys_are_deduplicated(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEYS", " a, b ,,a")
+    monkeypatch.setenv("GOOGLE_API_KEY", "b")
+    assert configured_api_keys() == ["a", "b"]
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the canonical assessment types: StudentAssessment, AssessmentDict and BatchAssessments
+"""
+
+import numpy as np
+
+from assessment_result import AssessmentDict, BatchAssessments, Level, StudentAssessment, canonical_result
+from compact_schema import NOT_OBSERVED_REASONING
+from label_normalizer import PERSONALITY_QUALITIES, get_label_normalizer
+
+LEADERSHIP = PERSONALITY_QUALITIES.index("Leadership")
+TENSION = PERSONALITY_QUALITIES.index("Tension")
+
+
+def _result(*items, **extra):
+    return dict({"assessments": [{"quality": q, "level": l, "reasoning": r} for q, l, r in items],
+                 "summary": "Summary"}, **extra)
+
+
+def _record(i, assessment=None, error=None):
+    record = {"student_id": f"s{i}", "name": f"Student {i}", "observations": f"Observation {i}"}
+    if assessment is not None:
+        record["assessment"] = assessment
+    if error is not None:
+        record["error"] = error
+    return record
+
+
+def test_round_trip_keeps_confidence_and_meta():
+    result = _result(("leadership", "high", "Led"), ("Tension", "LOW", "Calm"),
+                     source="local_triage", confidence=0.93, fallback_reason="429 quota")
+    result["assessments"][0]["confidence"] = 0.97
+    student = StudentAssessment.from_dict(result)
+    assert student.level(LEADERSHIP) is Level.HIGH and student.level(TENSION) is Level.LOW
+    assert student.meta == {"source": "local_triage", "confidence": 0.93, "fallback_reason": "429 quota"}
+    assert student.confidences[LEADERSHIP] == 0.97 and student.confidences[TENSION] is None
+
+    as_dict = student.to_dict()
+    assert isinstance(as_dict, AssessmentDict) and as_dict.student is student
+    assert [item["quality"] for item in as_dict["assessments"]] == PERSONALITY_QUALITIES
+    assert as_dict["assessments"][LEADERSHIP] == {"quality": "Leadership", "level": "HIGH", "reasoning": "Led",
+                                                  "confidence": 0.97}
+    assert "confidence" not in as_dict["assessments"][TENSION]
+    assert as_dict["assessments"][0] == {"quality": PERSONALITY_QUALITIES[0], "level": "NOT OBSERVED",
+                                         "reasoning": NOT_OBSERVED_REASONING}
+    assert as_dict["source"] == "local_triage" and as_dict["summary"] == "Summary"
+
+    # The NOT OBSERVED placeholder reasoning comes back as a reason; everything else is unchanged
+    again = StudentAssessment.from_dict(as_dict)
+    assert (again.levels, again.confidences, again.meta) == (student.levels, student.confidences, student.meta)
+    assert again.reasons[LEADERSHIP] == "Led" and again.reasons[TENSION] == "Calm"
+    assert again.to_dict() == as_dict
+
+
+def test_not_observed_never_hides_a_rating():
+    student = StudentAssessment.from_dict(_result(
+        ("Leadership", "HIGH", "Led"), ("Leadership", "NOT OBSERVED", "-"),
+        ("Tension", "NOT OBSERVED", "-"), ("Tension", "LOW", "first"), ("Tension", "MIDDLE", "later wins"),
+        ("Telepathy", "HIGH", "unknown quality is dropped")))
+    assert student.level(LEADERSHIP) is Level.HIGH and student.reasons[LEADERSHIP] == "Led"
+    assert student.level(TENSION) is Level.MIDDLE and student.reasons[TENSION] == "later wins"
+    assert student.labels() == ["leadership-high", "tension-middle"]
+    assert student.confidences is None
+
+
+def test_canonical_result_passes_errors_through_and_reuses_current_dicts():
+    error = {"error": "429 quota", "observations": "x"}
+    assert canonical_result(error) is error
+    canonical = canonical_result(_result(("Leadership", "HIGH", "Led")))
+    assert isinstance(canonical, AssessmentDict)
+    assert canonical_result(canonical) is canonical
+
+
+def test_edited_dict_is_normalized_again():
+    canonical = canonical_result(_result(("Leadership", "HIGH", "Led")))
+    canonical["assessments"][LEADERSHIP]["level"] = "LOW"
+    assert not canonical.is_current()
+    assert canonical_result(canonical).student.level(LEADERSHIP) is Level.LOW
+    batch = BatchAssessments()
+    batch.append(_record(0, canonical))
+    assert batch.label_lists() == [["leadership-low"]]
+
+
+def test_append_grows_past_capacity():
+    batch = BatchAssessments(capacity=2)
+    for i in range(5):
+        batch.append(_record(i, _result(("Leadership", ["LOW", "MIDDLE", "HIGH"][i % 3], f"r{i}"))))
+    assert len(batch) == 5
+    assert batch.level_matrix().shape == (5, len(PERSONALITY_QUALITIES))
+    assert list(batch.level_matrix()[:, LEADERSHIP]) == [Level.LOW, Level.MIDDLE, Level.HIGH, Level.LOW, Level.MIDDLE]
+    assert [r["name"] for r in batch] == [f"Student {i}" for i in range(5)]
+    assert batch.record(4)["assessment"]["assessments"][LEADERSHIP]["reasoning"] == "r4"
+
+
+def test_item_less_and_error_records_pass_through_unchanged():
+    deferred = {"error": "Gemini unavailable (circuit open)", "deferred": True, "retry_after": 12.0, "observations": "o"}
+    records = [
+        _record(0, error="No observations provided"),
+        _record(1, deferred),
+        _record(2, {"raw_response": "???", "error": "Could not parse JSON response"}, error="Could not parse JSON response"),
+        _record(3, StudentAssessment.from_dict(_result(("Tension", "HIGH", "Worried")))),
+    ]
+    batch = BatchAssessments.from_records(records)
+    assert batch.records()[:3] == records[:3]
+    assert batch.assessment(1) is None
+    assert batch.failed_count() == 2
+    assert batch.label_lists() == [[], [], [], ["tension-high"]]
+    assert batch.records(since=3)[0]["assessment"]["assessments"][TENSION]["level"] == "HIGH"
+
+
+def test_level_matrix_matches_label_normalizer():
+    records = [
+        _record(0, _result(("Leadership", "HIGH", "Led"), ("Social warmth", "middle", "Kind"))),
+        _record(1, error="429 quota"),
+        _record(2, _result(("Tension", "LOW", "a"), ("Tension", "NOT OBSERVED", "b"), ("Boldness", "HIGH", "c"))),
+        _record(3, {"raw_response": "not json"}),
+        _record(4, _result()),
+    ]
+    expected = get_label_normalizer().level_matrix(records)
+    batch = BatchAssessments.from_records(records)
+    np.testing.assert_array_equal(batch.level_matrix(), expected)
+    # Same labels; the batch lists them in quality order rather than item order
+    assert [sorted(labels) for labels in batch.label_lists()] == \
+        [sorted(labels) for labels in get_label_normalizer().label_lists(records)]
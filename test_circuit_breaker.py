@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for the Gemini circuit breaker state machine and outage error matching
+"""
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import (
+    CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, CircuitBreaker, is_outage_error
+)
+
+OUTAGE = "503 The service is currently unavailable."
+
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock(circuit_breaker)
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_result(OUTAGE)
+    assert breaker.state == CIRCUIT_OPEN
+
+
+def test_opens_after_consecutive_outage_errors(clock):
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60)
+    breaker.record_result(OUTAGE)
+    breaker.record_result(OUTAGE)
+    assert breaker.state == CIRCUIT_CLOSED and breaker.allow()
+    breaker.record_result(OUTAGE)
+    assert breaker.state == CIRCUIT_OPEN
+    assert not breaker.allow()
+    assert breaker.get_status()["opened"] == 1
+    assert breaker.get_status()["rejected"] == 1
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_result(OUTAGE)
+    breaker.record_result(OUTAGE)
+    breaker.record_result(None)
+    breaker.record_result(OUTAGE)
+    breaker.record_result(OUTAGE)
+    assert breaker.state == CIRCUIT_CLOSED
+
+
+def test_answers_that_are_not_outages_count_as_success(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_result(OUTAGE)
+    breaker.record_result("Invalid JSON at position 500")
+    breaker.record_result(OUTAGE)
+    assert breaker.state == CIRCUIT_CLOSED
+
+
+def test_retry_after_counts_down_while_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+    assert breaker.retry_after() == 0.0
+    _open(breaker)
+    clock.now += 20
+    assert breaker.retry_after() == pytest.approx(40)
+    assert breaker.is_open()
+
+
+def test_half_open_admits_limited_probes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60, half_open_probes=1)
+    _open(breaker)
+    clock.now += 61
+    assert breaker.allow()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    assert not breaker.is_open()
+    # The probe is still in flight: everyone else waits
+    assert not breaker.allow()
+    assert breaker.get_status()["probes"] == 1
+
+
+def test_successful_probe_closes_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+    _open(breaker)
+    clock.now += 61
+    assert breaker.allow()
+    breaker.record_result(None)
+    assert breaker.state == CIRCUIT_CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=5, recovery_timeout=60)
+    _open(breaker)
+    clock.now += 61
+    assert breaker.allow()
+    breaker.record_result(OUTAGE)
+    assert breaker.state == CIRCUIT_OPEN
+    assert breaker.retry_after() == pytest.approx(60)
+    assert breaker.get_status()["opened"] == 2
+
+
+def test_lost_probe_stops_blocking_after_recovery_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+    _open(breaker)
+    clock.now += 61
+    assert breaker.allow()
+    clock.now += 30
+    assert not breaker.allow()
+    clock.now += 31
+    assert breaker.allow()
+
+
+@pytest.mark.parametrize("error", [
+    "429 Resource has been exhausted (e.g. check quota).",
+    "503 The service is currently unavailable.",
+    "Error calling model 'gemini-2.5-flash' (RESOURCE_EXHAUSTED): quota",
+    "HTTP Error 502: Bad Gateway",
+    "{'error': {'code': 504, 'status': 'DEADLINE_EXCEEDED'}}",
+    "RetryError[<Future raised ResourceExhausted>]",
+    "Read timed out",
+    "ConnectionError: connection reset by peer",
+])
+def test_outage_errors(error):
+    assert is_outage_error(error)
+
+
+@pytest.mark.parametrize("error", [
+    "Invalid JSON at position 500",
+    "max_output_tokens=500 exceeded",
+    "Expecting ',' delimiter: line 1 column 429",
+    "404 models/gemini-9 is not found for API version v1beta",
+    "400 API key not valid. Please pass a valid API key.",
+])
+def test_errors_that_are_not_outages(error):
+    assert not is_outage_error(error)
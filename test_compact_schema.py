@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for the compact response format: quality codes, item expansion and NOT OBSERVED fill-in
+"""
+
+import json
+
+import pytest
+
+from compact_schema import (
+    NOT_OBSERVED_REASONING, QUALITY_CODES, compact_format_instructions, compact_from_result,
+    expand_compact_item, expand_compact_result, quality_codes
+)
+from label_normalizer import PERSONALITY_QUALITIES
+
+
+def test_quality_codes_are_unique_and_cover_every_quality():
+    assert sorted(QUALITY_CODES) == sorted(PERSONALITY_QUALITIES)
+    assert len(set(QUALITY_CODES.values())) == len(QUALITY_CODES)
+    assert quality_codes() == {code: quality for quality, code in QUALITY_CODES.items()}
+
+
+def test_unknown_qualities_get_positional_codes():
+    assert quality_codes(["Leadership", "Punctuality"]) == {"LE": "Leadership", "Q2": "Punctuality"}
+
+
+def test_format_instructions_list_every_code():
+    text = compact_format_instructions()
+    assert all(f"{code}={quality}" in text for quality, code in QUALITY_CODES.items())
+    assert "Do not include reasons" in compact_format_instructions(reasoning_words=0)
+
+
+@pytest.mark.parametrize("entry,expected", [
+    (["LE", "H", " led the group "], {"quality": "Leadership", "level": "HIGH", "reasoning": "led the group"}),
+    (["sw", "m"], {"quality": "Social warmth", "level": "MIDDLE", "reasoning": ""}),
+    (["Self control", "LOW", None], {"quality": "Self control", "level": "LOW", "reasoning": ""}),
+    ({"q": "TE", "l": "L", "r": "calm"}, {"quality": "Tension", "level": "LOW", "reasoning": "calm"}),
+])
+def test_expand_compact_item(entry, expected):
+    assert expand_compact_item(entry) == expected
+
+
+@pytest.mark.parametrize("entry,match", [
+    (["LE"], "must be"),
+    ("LE H", "must be"),
+    (["ZZ", "H"], "Unknown quality code"),
+    (["LE", "X"], "Unknown level code"),
+])
+def test_expand_compact_item_rejects_bad_entries(entry, match):
+    with pytest.raises(ValueError, match=match):
+        expand_compact_item(entry)
+
+
+def test_omitted_qualities_come_back_as_not_observed_in_order():
+    result = expand_compact_result('```json\n{"a": [["SW", "M", "kind"], ["LE", "H", "led"]], "s": "ok"}\n```')
+    assert [item["quality"] for item in result["assessments"]] == PERSONALITY_QUALITIES
+    by_quality = {item["quality"]: item for item in result["assessments"]}
+    assert by_quality["Leadership"] == {"quality": "Leadership", "level": "HIGH", "reasoning": "led"}
+    assert by_quality["Social warmth"]["level"] == "MIDDLE"
+    missing = [item for item in result["assessments"] if item["quality"] not in ("Leadership", "Social warmth")]
+    assert all(item["level"] == "NOT OBSERVED" and item["reasoning"] == NOT_OBSERVED_REASONING for item in missing)
+    assert result["summary"] == "ok"
+
+
+def test_qualities_outside_the_configured_list_are_kept_at_the_end():
+    result = expand_compact_result({"a": [["Tension", "L", "calm"], ["LE", "H"]]}, ["Leadership"])
+    assert [item["quality"] for item in result["assessments"]] == ["Leadership", "Tension"]
+    assert result["summary"] == ""
+
+
+def test_expand_compact_result_rejects_other_shapes():
+    with pytest.raises(ValueError):
+        expand_compact_result({"a": "LE H"})
+    with pytest.raises(json.JSONDecodeError):
+        expand_compact_result("not json")
+
+
+def test_round_trip_through_the_compact_format():
+    verbose = expand_compact_result({"a": [["LE", "H", "led the whole group today"], ["TE", "L", "calm"]], "s": "ok"})
+    compact = compact_from_result(verbose)
+    # NOT OBSERVED items are omitted on the wire and restored on expansion
+    assert compact == {"a": [["LE", "H", "led the whole group today"], ["TE", "L", "calm"]], "s": "ok"}
+    assert expand_compact_result(json.dumps(compact)) == verbose
+
+
+def test_compact_from_result_caps_or_drops_reasoning():
+    verbose = {"assessments": [{"quality": "Leadership", "level": "HIGH", "reasoning": "one two three four"}], "summary": ""}
+    assert compact_from_result(verbose, reasoning_words=2)["a"] == [["LE", "H", "one two"]]
+    assert compact_from_result(verbose, reasoning_words=0)["a"] == [["LE", "H"]]
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for context assembly: overlap removal, token-budget packing and the offline token estimate
+"""
+
+import sys
+import types
+
+import pytest
+
+import context_builder
+from context_builder import ContextAssembler, count_tokens, truncate_to_tokens
+
+
+class CharEncoding:
+    """tiktoken stand-in with one token per character"""
+
+    def encode(self, text):
+        return [ord(ch) for ch in text]
+
+    def decode(self, tokens):
+        return "".join(chr(t) for t in tokens)
+
+
+def _tiktoken(monkeypatch, get_encoding):
+    monkeypatch.setattr(context_builder, "_encodings", {})
+    monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(get_encoding=get_encoding))
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """tiktoken cannot download its encoding (no network), as on an offline machine"""
+    def get_encoding(name):
+        raise OSError(f"could not fetch {name}")
+    _tiktoken(monkeypatch, get_encoding)
+
+
+@pytest.fixture
+def char_tokens(monkeypatch):
+    _tiktoken(monkeypatch, lambda name: CharEncoding())
+
+
+def test_offline_estimate_is_chars_over_four(offline):
+    assert count_tokens("") == 0
+    assert count_tokens("abcd") == 1
+    assert count_tokens("abcde") == 2
+    assert truncate_to_tokens("abcdefghij", 2) == "abcdefgh"
+    # The failed load is cached rather than retried on every call
+    assert context_builder._encodings == {"cl100k_base": None}
+
+
+def test_missing_tiktoken_package_falls_back(monkeypatch):
+    monkeypatch.setattr(context_builder, "_encodings", {})
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    assert count_tokens("a" * 40) == 10
+
+
+def test_encoding_is_used_when_available(char_tokens):
+    assert count_tokens("abcde") == 5
+    assert truncate_to_tokens("abcdefghij", 3) == "abc"
+
+
+def test_chunks_are_packed_in_relevance_order_within_budget(char_tokens):
+    assembler = ContextAssembler(token_budget=12, separator="|")
+    context, stats = assembler.assemble(["aaaa", "bbbb", "cccc", "dddd"])
+    # 4 + (1 + 4) fit; the third chunk gets the 2 tokens left after its separator
+    assert context == "aaaa|bbbb|cc"
+    assert len(context) <= 12
+    assert stats == {"chunks_retrieved": 4, "chunks_used": 3, "raw_tokens": 19, "context_tokens": 12, "truncated": 1}
+
+
+def test_no_truncation_when_everything_fits(char_tokens):
+    context, stats = ContextAssembler(token_budget=100, separator="|").assemble(["one", "two"])
+    assert context == "one|two"
+    assert stats["truncated"] == 0 and stats["chunks_used"] == 2
+
+
+def test_chunk_with_no_room_left_is_dropped(char_tokens):
+    context, stats = ContextAssembler(token_budget=5, separator="|").assemble(["aaaa", "bbbb"])
+    assert context == "aaaa"
+    assert stats["chunks_used"] == 1 and stats["truncated"] == 1
+
+
+def test_budget_holds_with_the_offline_estimate(offline):
+    chunks = [f"chunk {i} " + "x" * 200 for i in range(10)]
+    context, stats = ContextAssembler(token_budget=150).assemble(chunks)
+    assert stats["context_tokens"] <= 150
+    assert stats["truncated"] == 1
+    assert context.startswith("chunk 0 ")
+
+
+def test_overlap_between_chunks_is_removed(char_tokens):
+    shared = "shared splitter overlap text"
+    first = "The first chunk ends with " + shared
+    second = shared + " and the second chunk goes on"
+    context, stats = ContextAssembler(token_budget=1000, min_overlap_chars=10, separator="|").assemble(
+        [first, second, first])
+    assert context == f"{first}|and the second chunk goes on"
+    # The repeated chunk is dropped entirely
+    assert stats["chunks_used"] == 2
+
+
+def test_short_overlaps_are_kept(char_tokens):
+    context, _ = ContextAssembler(token_budget=1000, min_overlap_chars=10, separator="|").assemble(
+        ["ends with abc", "abc starts this"])
+    assert context == "ends with abc|abc starts this"
+
+
+def test_documents_with_page_content(char_tokens):
+    docs = [types.SimpleNamespace(page_content="  padded  "), types.SimpleNamespace(page_content=None)]
+    context, stats = ContextAssembler(separator="|").assemble(docs)
+    assert context == "padded"
+    assert stats["chunks_retrieved"] == 2 and stats["chunks_used"] == 1
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Tests for the fake Gemini backend and a worker run against it (temporary SQLite files, fake limiter)
+"""
+
+import json
+
+import pytest
+
+import config
+import fake_gemini
+from api_key_pool import is_rate_limit_error
+from circuit_breaker import is_outage_error
+from compact_schema import compact_format_instructions, expand_compact_result
+from fake_gemini import FakeGeminiBackend, FakeGeminiChatModel, FakeGeminiError, configure_fake_backend
+from json_repair import RepairError, repair_assessment_json
+from label_normalizer import PERSONALITY_QUALITIES
+from model_router import is_model_unavailable_error
+from priority_scheduler import PRIORITY_BACKGROUND, PriorityScheduler
+from response_schema import assessment_response_schema, schema_errors
+from usage_ledger import UsageLedger, add_message_usage, new_usage
+from work_queue import TASK_DEAD, TASK_DONE, WorkQueue, run_worker
+
+PROMPT = "STUDENT OBSERVATIONS:\nHelped a classmate and led the group discussion."
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    """Swap the global fake backend per test and restore the previous one afterwards"""
+    monkeypatch.setattr(fake_gemini, "_fake_backend", None)
+    return lambda profile="healthy", **overrides: configure_fake_backend(
+        profile, **dict({"time_scale": 0.0, "seed": 7}, **overrides))
+
+
+def test_healthy_backend_answers_every_quality_with_usage():
+    backend = FakeGeminiBackend(time_scale=0.0, seed=1)
+    text, usage, _ = backend.respond("gemini-2.5-flash", PROMPT)
+    result = json.loads(text)
+    assert sorted(item["quality"] for item in result["assessments"]) == sorted(PERSONALITY_QUALITIES)
+    assert usage["input_tokens"] > 0 and usage["output_tokens"] > 0
+    assert usage["total_tokens"] == usage["input_tokens"] + usage["output_tokens"]
+    assert backend.stats["calls"] == backend.stats["ok"] == 1
+
+
+def test_quota_errors_look_like_gemini_429s():
+    backend = FakeGeminiBackend.from_profile("quota_exhausted", time_scale=0.0, seed=1)
+    with pytest.raises(FakeGeminiError) as excinfo:
+        backend.respond("gemini-2.5-flash", PROMPT)
+    assert is_rate_limit_error(str(excinfo.value))
+    assert is_outage_error(str(excinfo.value))
+    assert backend.stats["errors_429"] == 1
+
+
+def test_missing_models_raise_not_found():
+    backend = FakeGeminiBackend.from_profile("model_missing", time_scale=0.0, seed=1)
+    with pytest.raises(FakeGeminiError) as excinfo:
+        backend.respond("gemini-2.5-flash", PROMPT)
+    assert is_model_unavailable_error(str(excinfo.value))
+    assert not is_outage_error(str(excinfo.value))
+    backend.respond("gemini-1.5-flash", PROMPT)
+    assert backend.stats["not_found"] == 1 and backend.stats["ok"] == 1
+
+
+def test_fault_rates_are_reproducible_with_a_seed():
+    def run():
+        backend = FakeGeminiBackend.from_profile("quota_pressure", time_scale=0.0, seed=3)
+        for _ in range(50):
+            try:
+                backend.respond("gemini-2.5-flash", PROMPT)
+            except FakeGeminiError:
+                pass
+        return backend.stats["errors_429"]
+
+    assert run() == run()
+    assert 5 <= run() <= 25
+
+
+def test_malformed_output_is_repaired_or_rejected():
+    backend = FakeGeminiBackend(time_scale=0.0, seed=5, malformed_rate=1.0)
+    repaired = 0
+    for _ in range(20):
+        text, _, _ = backend.respond("gemini-2.5-flash", PROMPT)
+        try:
+            result, _ = repair_assessment_json(text, PERSONALITY_QUALITIES)
+        except RepairError:
+            continue
+        repaired += 1
+        assert isinstance(result["assessments"], list)
+    assert backend.stats["malformed"] == 20
+    assert repaired > 0
+
+
+def test_truncated_output_is_cut_short():
+    backend = FakeGeminiBackend(time_scale=0.0, seed=5, truncated_rate=1.0)
+    text, _, _ = backend.respond("gemini-2.5-flash", PROMPT)
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(text)
+    assert backend.stats["truncated"] == 1
+
+
+def test_schema_answers_conform_and_are_never_malformed():
+    schema = assessment_response_schema()
+    backend = FakeGeminiBackend(time_scale=0.0, seed=2, malformed_rate=1.0)
+    for _ in range(10):
+        text, _, _ = backend.respond("gemini-2.5-flash", PROMPT, response_schema=schema)
+        assert schema_errors(json.loads(text), schema) == []
+    assert backend.stats["malformed"] == 0
+
+
+def test_compact_prompts_get_compact_answers():
+    backend = FakeGeminiBackend(time_scale=0.0, seed=4)
+    prompt = PROMPT + "\n" + compact_format_instructions(PERSONALITY_QUALITIES)
+    text, _, _ = backend.respond("gemini-2.5-flash", prompt)
+    assert "a" in json.loads(text)
+    result = expand_compact_result(text, PERSONALITY_QUALITIES)
+    assert any(item["level"] != "NOT OBSERVED" for item in result["assessments"])
+
+
+def test_chat_model_reports_usage_metadata(fake_backend):
+    backend = fake_backend()
+    message = FakeGeminiChatModel(model_name="gemini-2.5-flash").invoke(PROMPT)
+    usage = new_usage()
+    add_message_usage(usage, message, "gemini-2.5-flash", message.content)
+    assert usage["llm_calls"] == 1
+    assert usage["prompt_tokens"] == backend.stats["input_tokens"]
+    assert usage["output_tokens"] == backend.stats["output_tokens"]
+
+
+def test_chat_model_streams_the_whole_answer(fake_backend):
+    fake_backend()
+    chunks = list(FakeGeminiChatModel(model_name="gemini-2.5-flash", stream_chunk_chars=50).stream(PROMPT))
+    assert len(chunks) > 1
+    assert json.loads("".join(chunk.content for chunk in chunks))["summary"]
+    assert chunks[-1].usage_metadata["output_tokens"] > 0
+
+
+class CountingLimiter:
+    """Limiter stand-in that never waits and counts admitted calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def wait_if_needed(self):
+        self.calls += 1
+
+
+class FakeAssessmentSystem:
+    """Minimal assessment path over the fake chat model: scheduler, limiter and usage ledger"""
+
+    def __init__(self, ledger_path: str):
+        self.limiter = CountingLimiter()
+        self.scheduler = PriorityScheduler(self.limiter)
+        self.ledger = UsageLedger(ledger_path)
+        self.llm = FakeGeminiChatModel(model_name="gemini-2.5-flash")
+
+    def assess_student_personality(self, observations: str):
+        usage = new_usage()
+        self.scheduler.acquire()
+        try:
+            message = self.llm.invoke(observations)
+        except FakeGeminiError as e:
+            self.ledger.record(observations, usage, "error", 0.0)
+            return {"error": str(e), "observations": observations}
+        add_message_usage(usage, message, "gemini-2.5-flash", message.content)
+        self.ledger.record(observations, usage, "ok", 0.0)
+        return json.loads(message.content)
+
+
+def test_worker_drains_queue_under_quota_pressure(tmp_path, fake_backend, monkeypatch):
+    monkeypatch.setattr(config, "WORK_QUEUE_RETRY_BACKOFF", 0)
+    backend = fake_backend("quota_pressure", seed=11)
+    db_path = str(tmp_path / "queue.sqlite3")
+    queue = WorkQueue(db_path)
+    students = [{"name": f"Student {i}", "observations": f"Observation {i}: shared lunch"} for i in range(12)]
+    batch_id = queue.enqueue_batch(students)
+    system = FakeAssessmentSystem(str(tmp_path / "ledger.sqlite3"))
+
+    run_worker(db_path, worker_id="test-worker", batch_id=batch_id, exit_when_empty=True,
+               poll_interval=0.01, system=system)
+
+    status = queue.batch_status(batch_id)
+    assert status["finished"]
+    counts = status["counts"]
+    assert counts[TASK_DONE] + counts[TASK_DEAD] == len(students)
+    # Every model call went through the limiter, marked as background work by the worker
+    assert system.limiter.calls == backend.stats["calls"]
+    assert system.scheduler.get_status()[PRIORITY_BACKGROUND]["admitted"] == backend.stats["calls"]
+    # One task attempt per call: successes complete tasks, 429s are retried or end dead
+    assert backend.stats["errors_429"] > 0
+    assert backend.stats["ok"] == counts[TASK_DONE]
+    assert backend.stats["errors_429"] >= counts[TASK_DEAD]
+    summary = system.ledger.summary()
+    assert summary["assessments"] == backend.stats["calls"]
+    assert summary["errors"] == backend.stats["errors_429"]
+    assert summary["output_tokens"] == backend.stats["output_tokens"]
+    results = queue.batch_results(batch_id)
+    assert [r["name"] for r in results] == [s["name"] for s in students]
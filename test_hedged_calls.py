@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for deadline-bounded, hedged model calls (stub callables, short hedge delays)
+"""
+
+import threading
+import time
+
+import pytest
+
+import hedged_calls
+from hedged_calls import DeadlineExceeded, HedgedInvoker, LatencyTracker
+
+HEDGE_DELAY = 0.05
+
+
+class StubLimiter:
+    """Rate limiter stand-in whose non-blocking slot is free or not"""
+
+    def __init__(self, free=True):
+        self.free = free
+        self.attempts = 0
+
+    def try_acquire(self):
+        self.attempts += 1
+        return self.free
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = StubLimiter()
+    monkeypatch.setattr(hedged_calls, "get_rate_limiter", lambda: limiter)
+    return limiter
+
+
+@pytest.fixture
+def release():
+    """Event that blocked stub calls wait on; set at teardown so no worker thread is left hanging"""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def _hedging_invoker():
+    invoker = HedgedInvoker(hedging=True, hedge_min_samples=1, hedge_min_delay=HEDGE_DELAY, max_workers=4)
+    invoker.latency.record(0.001)
+    return invoker
+
+
+def _blocked(release, value):
+    def call():
+        release.wait(5)
+        return value
+    return call
+
+
+def test_returns_the_result_within_the_deadline():
+    invoker = HedgedInvoker()
+    assert invoker.invoke(lambda: "ok", timeout=1) == "ok"
+    assert invoker.latency.percentile(50) is not None
+    assert invoker.get_status()["calls"] == 1
+
+
+def test_call_errors_propagate():
+    invoker = HedgedInvoker()
+
+    def fail():
+        raise ValueError("429 quota")
+
+    with pytest.raises(ValueError, match="429"):
+        invoker.invoke(fail, timeout=1)
+    assert invoker.stats["deadline_exceeded"] == 0
+
+
+def test_deadline_exceeded(release):
+    invoker = HedgedInvoker()
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        invoker.invoke(_blocked(release, "late"), timeout=0.1)
+    assert time.monotonic() - start < 1
+    assert invoker.stats["deadline_exceeded"] == 1
+
+
+def test_no_hedge_until_latency_is_calibrated(limiter, release):
+    invoker = HedgedInvoker(hedging=True, hedge_min_samples=5, hedge_min_delay=HEDGE_DELAY)
+    assert invoker.hedge_delay() is None
+    with pytest.raises(DeadlineExceeded):
+        invoker.invoke(_blocked(release, "primary"), timeout=0.2, hedge=lambda: "hedge")
+    assert limiter.attempts == 0 and invoker.stats["hedges_fired"] == 0
+
+
+def test_hedge_fires_and_wins_when_the_primary_stalls(limiter, release):
+    invoker = _hedging_invoker()
+    assert invoker.hedge_delay() == HEDGE_DELAY
+    assert invoker.invoke(_blocked(release, "primary"), timeout=2, hedge=lambda: "hedge") == "hedge"
+    assert invoker.stats["hedges_fired"] == 1 and invoker.stats["hedges_won"] == 1
+    assert limiter.attempts == 1
+
+
+def test_first_result_wins_when_the_primary_finishes_after_the_hedge_fires(limiter, release):
+    invoker = _hedging_invoker()
+
+    def primary():
+        time.sleep(HEDGE_DELAY * 2)
+        return "primary"
+
+    assert invoker.invoke(primary, timeout=2, hedge=_blocked(release, "hedge")) == "primary"
+    assert invoker.stats["hedges_fired"] == 1 and invoker.stats["hedges_won"] == 0
+
+
+def test_fast_primary_never_hedges(limiter):
+    invoker = _hedging_invoker()
+    assert invoker.invoke(lambda: "primary", timeout=2, hedge=lambda: "hedge") == "primary"
+    assert limiter.attempts == 0 and invoker.stats["hedges_fired"] == 0
+
+
+def test_hedge_is_skipped_without_a_free_limiter_slot(limiter):
+    limiter.free = False
+    invoker = _hedging_invoker()
+    hedged = []
+
+    def primary():
+        time.sleep(HEDGE_DELAY * 3)
+        return "primary"
+
+    assert invoker.invoke(primary, timeout=2, hedge=lambda: hedged.append(1) or "hedge") == "primary"
+    assert hedged == []
+    assert invoker.stats["hedges_skipped_quota"] == 1 and invoker.stats["hedges_fired"] == 0
+
+
+def test_hedge_delay_not_used_when_it_exceeds_the_timeout(limiter, release):
+    invoker = _hedging_invoker()
+    with pytest.raises(DeadlineExceeded):
+        invoker.invoke(_blocked(release, "primary"), timeout=HEDGE_DELAY / 2, hedge=lambda: "hedge")
+    assert limiter.attempts == 0
+
+
+def test_latency_percentile():
+    tracker = LatencyTracker(window=10)
+    assert tracker.percentile(50) is None
+    for seconds in range(1, 11):
+        tracker.record(float(seconds))
+    assert tracker.percentile(0) == 1.0
+    assert tracker.percentile(100) == 10.0
+    assert tracker.percentile(95, min_samples=11) is None
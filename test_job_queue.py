@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for background batch jobs: result order with students the circuit breaker deferred
+"""
+
+from job_queue import JOB_COMPLETED, JobManager
+
+
+class DeferringSystem:
+    """Assessment stand-in that defers the listed students on their first try (or every try)"""
+
+    def __init__(self, defer_first=(), defer_always=()):
+        self.defer_first = set(defer_first)
+        self.defer_always = set(defer_always)
+        self.calls = []
+
+    def assess_student_personality(self, observations):
+        self.calls.append(observations)
+        if observations in self.defer_first or observations in self.defer_always:
+            self.defer_first.discard(observations)
+            return {"error": "Gemini unavailable (circuit open)", "deferred": True, "retry_after": 0.0}
+        return {"assessments": [{"quality": "Leadership", "level": "HIGH", "reasoning": "led"}],
+                "summary": observations}
+
+
+def _students(n):
+    return [{"name": f"Student {i}", "observations": f"Observation {i}"} for i in range(n)]
+
+
+def test_deferred_student_keeps_its_position():
+    students = _students(4)
+    system = DeferringSystem(["Observation 1"])
+    streamed = []
+    manager = JobManager(max_workers=1)
+    job_id = manager.submit(system, students, export=False, on_result=lambda r: streamed.append(r["name"]))
+    snapshot = manager.wait(job_id, timeout=10, poll_interval=0.01)
+
+    assert snapshot["status"] == JOB_COMPLETED
+    assert snapshot["completed"] == 4 and snapshot["deferred"] == 0
+    # The deferred student was retried after the others but is reported in sheet order
+    assert system.calls[-1] == "Observation 1"
+    names = [s["name"] for s in students]
+    assert streamed == names
+    results = manager.snapshot(job_id, include_results=True)["results"]
+    assert [r["name"] for r in results] == names
+    assert results[1]["assessment"]["summary"] == "Observation 1"
+
+
+def test_student_still_deferred_after_retry_keeps_its_deferred_result():
+    students = _students(3)
+    system = DeferringSystem(defer_always=["Observation 0"])
+    manager = JobManager(max_workers=1)
+    job_id = manager.submit(system, students, export=False)
+    manager.wait(job_id, timeout=10, poll_interval=0.01)
+
+    snapshot = manager.snapshot(job_id, include_results=True)
+    assert snapshot["deferred"] == 1
+    assert [r["name"] for r in snapshot["results"]] == [s["name"] for s in students]
+    assert snapshot["results"][0]["assessment"]["deferred"]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for local JSON repair of model responses (no LLM call)
+"""
+
+import json
+
+import pytest
+
+from json_repair import RepairError, RepairStats, repair_assessment_json
+from label_normalizer import PERSONALITY_QUALITIES
+
+ITEMS = [
+    {"quality": "Leadership", "level": "HIGH", "reasoning": "Led the group"},
+    {"quality": "Social warmth", "level": "MIDDLE", "reasoning": "Helped a classmate"},
+]
+CLEAN = json.dumps({"assessments": ITEMS, "summary": "Confident helper"})
+
+
+def _repair(text):
+    return repair_assessment_json(text, PERSONALITY_QUALITIES)
+
+
+def test_clean_response_needs_no_steps():
+    result, steps = _repair(CLEAN)
+    assert steps == []
+    assert result == {"assessments": ITEMS, "summary": "Confident helper"}
+
+
+def test_trailing_commas():
+    text = '{"assessments": [{"quality": "Leadership", "level": "HIGH", "reasoning": "Led",},], "summary": "ok",}'
+    result, steps = _repair(text)
+    assert "trailing_commas" in steps
+    assert result["assessments"][0]["level"] == "HIGH"
+    assert result["summary"] == "ok"
+
+
+def test_truncated_inside_a_string():
+    text = CLEAN[:CLEAN.index("Helped a") + 4]
+    result, steps = _repair(text)
+    assert "close_truncated" in steps
+    assert [item["quality"] for item in result["assessments"]] == ["Leadership", "Social warmth"]
+    assert result["assessments"][1]["reasoning"] == "Help"
+    assert result["summary"] == ""
+
+
+def test_truncated_after_a_complete_item():
+    text = CLEAN[:CLEAN.index('{"quality": "Social')]
+    result, steps = _repair(text)
+    assert "close_truncated" in steps
+    assert result["assessments"] == ITEMS[:1]
+
+
+def test_truncated_object_with_dangling_key():
+    text = '{"assessments": [{"quality": "Leadership", "level": "HIGH", "reasoning": "Led the group"}], "summary":'
+    result, _ = _repair(text)
+    assert result == {"assessments": ITEMS[:1], "summary": ""}
+
+
+def test_single_quotes():
+    text = "{'assessments': [{'quality': 'Leadership', 'level': 'HIGH', 'reasoning': 'Led \"the\" group'}], 'summary': 'ok'}"
+    result, steps = _repair(text)
+    assert "single_quotes" in steps
+    assert result["assessments"][0]["reasoning"] == 'Led "the" group'
+
+
+def test_unquoted_keys_leave_string_contents_alone():
+    text = '{assessments: [{quality: "Leadership", level: "HIGH", reasoning: "Calm, notably: kind"}], summary: "ok"}'
+    result, steps = _repair(text)
+    assert steps == ["unquoted_keys"]
+    assert result["assessments"][0]["reasoning"] == "Calm, notably: kind"
+
+
+def test_code_fences_and_surrounding_text():
+    result, steps = _repair(f"Here is the assessment:\n```json\n{CLEAN}\n```\nHope this helps!")
+    assert steps == ["strip_fences"]
+    assert result["assessments"] == ITEMS
+
+    result, steps = _repair(f"Sure! {CLEAN} Let me know.")
+    assert steps == ["extract_object"]
+
+
+def test_items_are_coerced_to_canonical_names_and_levels():
+    text = json.dumps({"Assessments": [{"quality": "leadership", "level": "high"}, {"quality": "Telepathy", "level": "HIGH"}]})
+    result, steps = _repair(text)
+    assert "rename_assessments" in steps and "coerce_items" in steps
+    assert result["assessments"] == [{"quality": "Leadership", "level": "HIGH", "reasoning": ""}]
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "I could not assess this student.",
+    '{"assessments": "none", "summary": "x"}',
+    '{"assessments": [{"quality": "Telepathy", "level": "HIGH"}]}',
+    '{"assessments": [{"quality": "Leadership" "level": "HIGH"}]}',
+])
+def test_gives_up_on_unrepairable_text(text):
+    with pytest.raises(RepairError):
+        _repair(text)
+
+
+def test_model_validation_failure_is_a_repair_error():
+    def reject(**kwargs):
+        raise ValueError("bad")
+
+    with pytest.raises(RepairError, match="failed validation"):
+        repair_assessment_json(CLEAN, PERSONALITY_QUALITIES, model=reject)
+
+
+def test_repair_stats_rates():
+    stats = RepairStats()
+    stats.record_clean()
+    stats.record(True, ["trailing_commas"])
+    stats.record(False, [])
+    snapshot = stats.snapshot()
+    assert snapshot["responses"] == 3
+    assert snapshot["repair_success_rate"] == 0.5
+    assert snapshot["steps"] == {"trailing_commas": 1}
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for the priority scheduler's admission order (priority classes and weighted fair queueing)
+"""
+
+import time
+import threading
+
+from priority_scheduler import (
+    PRIORITY_BACKGROUND, PRIORITY_BATCH, PRIORITY_INTERACTIVE, PriorityScheduler, scheduling
+)
+
+
+class GateLimiter:
+    """Limiter stand-in: records who was admitted and holds the first caller until released"""
+
+    def __init__(self):
+        self.admitted = []
+        self.release = threading.Event()
+        self.holding = threading.Event()
+
+    def wait_if_needed(self):
+        if not self.holding.is_set():
+            self.holding.set()
+            self.release.wait(5)
+        self.admitted.append(threading.current_thread().name)
+
+
+def _waiting(scheduler):
+    return sum(s["waiting"] for s in scheduler.get_status().values())
+
+
+def _run_admissions(callers):
+    """Hold the scheduler busy, queue ``callers`` (name, priority, flow, weight) in order, then release.
+
+    Returns the admission order after the blocking call.
+    """
+    limiter = GateLimiter()
+    scheduler = PriorityScheduler(limiter)
+    blocker = threading.Thread(target=scheduler.acquire, name="blocker")
+    blocker.start()
+    assert limiter.holding.wait(5)
+    threads = []
+    for name, priority, flow, weight in callers:
+        thread = threading.Thread(target=scheduler.acquire, args=(priority, flow, weight), name=name)
+        thread.start()
+        threads.append(thread)
+        # Queue strictly in order so sequence numbers match the list
+        deadline = time.time() + 5
+        while _waiting(scheduler) < len(threads) and time.time() < deadline:
+            time.sleep(0.001)
+    limiter.release.set()
+    for thread in [blocker] + threads:
+        thread.join(5)
+    assert limiter.admitted[0] == "blocker"
+    return limiter.admitted[1:], scheduler
+
+
+def test_higher_priority_classes_are_admitted_first():
+    order, _ = _run_admissions([
+        ("background", PRIORITY_BACKGROUND, None, 1.0),
+        ("batch", PRIORITY_BATCH, None, 1.0),
+        ("interactive", PRIORITY_INTERACTIVE, None, 1.0),
+    ])
+    assert order == ["interactive", "batch", "background"]
+
+
+def test_equal_weight_flows_alternate():
+    callers = [(f"a{i}", PRIORITY_BATCH, "a", 1.0) for i in range(4)]
+    callers += [(f"b{i}", PRIORITY_BATCH, "b", 1.0) for i in range(4)]
+    order, _ = _run_admissions(callers)
+    assert [name[0] for name in order] == list("abababab")
+    # FIFO within a flow
+    assert [n for n in order if n[0] == "a"] == ["a0", "a1", "a2", "a3"]
+
+
+def test_weights_share_admissions_proportionally():
+    callers = [(f"a{i}", PRIORITY_BATCH, "a", 2.0) for i in range(6)]
+    callers += [(f"b{i}", PRIORITY_BATCH, "b", 1.0) for i in range(6)]
+    order, _ = _run_admissions(callers)
+    assert [name[0] for name in order[:6]].count("a") == 4
+
+
+def test_priority_class_beats_fair_share():
+    order, _ = _run_admissions([
+        ("batch-a", PRIORITY_BATCH, "a", 100.0),
+        ("interactive-b", PRIORITY_INTERACTIVE, "b", 0.01),
+    ])
+    assert order == ["interactive-b", "batch-a"]
+
+
+def test_scheduling_context_supplies_priority_and_flow():
+    limiter = GateLimiter()
+    limiter.holding.set()
+    scheduler = PriorityScheduler(limiter)
+    with scheduling(PRIORITY_BACKGROUND, flow="nightly"):
+        scheduler.acquire()
+    status = scheduler.get_status()
+    assert status[PRIORITY_BACKGROUND]["admitted"] == 1
+    assert status[PRIORITY_INTERACTIVE]["admitted"] == 0
+
+
+def test_idle_flows_are_forgotten():
+    limiter = GateLimiter()
+    limiter.holding.set()
+    scheduler = PriorityScheduler(limiter)
+    for i in range(50):
+        scheduler.acquire(PRIORITY_BATCH, f"job-{i}", 1.0)
+    assert scheduler._flow_vtime == {}
+
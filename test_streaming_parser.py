@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental parser that pulls quality items out of a streamed response
+"""
+
+import json
+
+import pytest
+
+from compact_schema import expand_compact_item, quality_codes
+from streaming_parser import IncrementalAssessmentParser, MalformedStreamError
+
+ITEMS = [
+    {"quality": "Leadership", "level": "HIGH", "reasoning": 'Said "follow me", then {led} [the] group'},
+    {"quality": "Social warmth", "level": "MIDDLE", "reasoning": "Back\\slash and\nnewline"},
+    {"quality": "Tension", "level": "LOW", "reasoning": "Calm été"},
+]
+RESPONSE = json.dumps({"assessments": ITEMS, "summary": "ok"})
+
+
+def _feed_all(parser, text, size):
+    emitted = []
+    for i in range(0, len(text), size):
+        emitted.extend(parser.feed(text[i:i + size]))
+    return emitted
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 50, len(RESPONSE)])
+def test_items_are_emitted_once_at_any_chunk_size(size):
+    parser = IncrementalAssessmentParser()
+    emitted = _feed_all(parser, RESPONSE, size)
+    assert emitted == ITEMS
+    assert parser.items == ITEMS
+    assert parser.array_closed
+    assert parser.text == RESPONSE
+    # Text after the array (the summary, trailing noise) never re-emits items
+    assert parser.feed(' trailing') == []
+    assert parser.items == ITEMS
+
+
+def test_item_is_emitted_when_its_closing_brace_arrives():
+    parser = IncrementalAssessmentParser()
+    first = json.dumps(ITEMS[0])
+    assert parser.feed('{"assessments": [' + first[:-1]) == []
+    assert parser.feed(first[-1]) == [ITEMS[0]]
+    assert parser.feed(", ") == []
+    assert not parser.array_closed
+
+
+def test_chunk_boundary_inside_an_escape():
+    text = json.dumps({"assessments": [{"quality": "Leadership", "level": "HIGH", "reasoning": 'a \\" } ] b'}]})
+    cut = text.index("\\\\") + 1
+    parser = IncrementalAssessmentParser()
+    assert parser.feed(text[:cut]) == []
+    assert parser.feed(text[cut:])[0]["reasoning"] == 'a \\" } ] b'
+
+
+def test_key_split_across_chunks_and_code_fence():
+    parser = IncrementalAssessmentParser()
+    text = "```json\n" + RESPONSE + "\n```"
+    cut = text.index("assess") + 3
+    assert parser.feed(text[:cut]) == []
+    assert parser.feed(text[cut:]) == ITEMS
+
+
+def test_preamble_limit():
+    parser = IncrementalAssessmentParser(max_preamble_chars=50)
+    parser.feed('{"summary": "')
+    with pytest.raises(MalformedStreamError, match="No \"assessments\" array"):
+        parser.feed("x" * 60)
+
+
+def test_summary_before_assessments_within_the_limit():
+    parser = IncrementalAssessmentParser(max_preamble_chars=100)
+    assert parser.feed('{"summary": "short", "assessments": [' + json.dumps(ITEMS[0]) + "]}") == [ITEMS[0]]
+
+
+@pytest.mark.parametrize("text,match", [
+    ("Sure, here is the assessment", "does not start with a JSON object"),
+    ("```python\n{", "code fence language"),
+    ('{"assessments": {"quality": "x"}}', "not a JSON array"),
+    ('{"assessments": ["Leadership"]}', "Unexpected"),
+    ('{"assessments": [{"quality": "Leadership"}]}', "missing quality/level"),
+])
+def test_clearly_malformed_streams_fail_early(text, match):
+    with pytest.raises(MalformedStreamError, match=match):
+        IncrementalAssessmentParser().feed(text)
+
+
+def test_compact_mode():
+    codes = quality_codes()
+    parser = IncrementalAssessmentParser(array_key="a", item_parser=lambda entry: expand_compact_item(entry, codes))
+    text = json.dumps({"a": [["LE", "H", "led [the] group"], ["SW", "m", "kind"]], "s": "ok"})
+    emitted = _feed_all(parser, text, 4)
+    assert emitted == [
+        {"quality": "Leadership", "level": "HIGH", "reasoning": "led [the] group"},
+        {"quality": "Social warmth", "level": "MIDDLE", "reasoning": "kind"},
+    ]
+    assert parser.array_closed
+
+
+def test_compact_mode_rejects_unknown_codes():
+    parser = IncrementalAssessmentParser(array_key="a", item_parser=lambda entry: expand_compact_item(entry))
+    with pytest.raises(MalformedStreamError, match="Unknown quality code"):
+        parser.feed('{"a": [["ZZ", "H", "?"]]}')
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tests for per-assessment token usage and cost in the usage ledger
+"""
+
+import types
+
+import pytest
+
+from usage_ledger import UsageLedger, add_message_usage, call_cost, new_usage
+
+
+def _message(input_tokens, output_tokens):
+    return types.SimpleNamespace(usage_metadata={"input_tokens": input_tokens, "output_tokens": output_tokens})
+
+
+def test_each_call_is_priced_at_its_own_model(tmp_path):
+    usage = new_usage()
+    add_message_usage(usage, _message(1_000_000, 0), "gemini-2.5-pro")
+    # The router fell back to a cheaper model for the second attempt
+    add_message_usage(usage, _message(1_000_000, 1_000_000), "gemini-2.0-flash")
+    assert usage["model"] == "gemini-2.0-flash"
+    assert usage["prompt_tokens"] == 2_000_000 and usage["output_tokens"] == 1_000_000
+    expected = call_cost("gemini-2.5-pro", 1_000_000, 0) + call_cost("gemini-2.0-flash", 1_000_000, 1_000_000)
+    assert usage["cost_usd"] == pytest.approx(expected)
+    assert expected != pytest.approx(call_cost("gemini-2.0-flash", 2_000_000, 1_000_000))
+
+    ledger = UsageLedger(str(tmp_path / "ledger.sqlite3"))
+    ledger.record("observations", usage, "ok", 1.0)
+    assert ledger.summary()["cost_usd"] == pytest.approx(expected)
+
+
+def test_output_tokens_are_estimated_without_metadata():
+    usage = new_usage()
+    add_message_usage(usage, types.SimpleNamespace(), "gemini-2.5-flash", "x" * 400)
+    assert usage["llm_calls"] == 1 and usage["prompt_tokens"] == 0
+    assert usage["output_tokens"] > 0
+    assert usage["cost_usd"] == pytest.approx(call_cost("gemini-2.5-flash", 0, usage["output_tokens"]))
+
+
+def test_unknown_models_cost_nothing():
+    usage = new_usage()
+    add_message_usage(usage, _message(1000, 1000), "fake-model")
+    assert usage["cost_usd"] == 0.0
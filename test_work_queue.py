@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite work queue: leases, expired-lease reclaim, retries, dead tasks and deferral
+"""
+
+import pytest
+
+import work_queue
+from work_queue import TASK_DEAD, TASK_DONE, TASK_LEASED, TASK_PENDING, WorkQueue
+
+STUDENTS = [{"name": f"Student {i}", "observations": f"Observation {i}"} for i in range(3)]
+
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock(work_queue)
+
+
+def _queue(tmp_path, **kwargs):
+    kwargs.setdefault("visibility_timeout", 60)
+    kwargs.setdefault("max_attempts", 3)
+    kwargs.setdefault("retry_backoff", 10)
+    return WorkQueue(str(tmp_path / "queue.sqlite3"), **kwargs)
+
+
+def _status(queue, task_id):
+    return queue._connect().execute("SELECT * FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+
+
+def test_tasks_are_leased_once_in_order(tmp_path, clock):
+    queue = _queue(tmp_path)
+    batch_id = queue.enqueue_batch(STUDENTS)
+    leased = [queue.lease("w1", batch_id) for _ in STUDENTS]
+    assert [t["payload"]["name"] for t in leased] == [s["name"] for s in STUDENTS]
+    assert all(t["attempts"] == 1 for t in leased)
+    assert queue.lease("w2", batch_id) is None
+    assert queue.batch_status(batch_id)["counts"][TASK_LEASED] == 3
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(tmp_path, clock):
+    queue = _queue(tmp_path, visibility_timeout=60)
+    batch_id = queue.enqueue_batch(STUDENTS[:1])
+    task = queue.lease("w1", batch_id)
+    clock.now += 30
+    assert queue.lease("w2", batch_id) is None
+
+    clock.now += 31
+    reclaimed = queue.lease("w2", batch_id)
+    assert reclaimed["task_id"] == task["task_id"]
+    assert reclaimed["attempts"] == 2
+    # The stalled worker lost its lease: its heartbeat and late result are ignored
+    assert not queue.heartbeat(task["task_id"], "w1")
+    assert not queue.complete(task["task_id"], "w1", {"name": "late"})
+    assert queue.complete(task["task_id"], "w2", {"name": "Student 0"})
+    assert _status(queue, task["task_id"])["status"] == TASK_DONE
+
+
+def test_heartbeat_keeps_the_lease(tmp_path, clock):
+    queue = _queue(tmp_path, visibility_timeout=60)
+    batch_id = queue.enqueue_batch(STUDENTS[:1])
+    task = queue.lease("w1", batch_id)
+    clock.now += 50
+    assert queue.heartbeat(task["task_id"], "w1")
+    clock.now += 50
+    assert queue.lease("w2", batch_id) is None
+
+
+def test_lease_expiring_on_final_attempt_marks_task_dead(tmp_path, clock):
+    queue = _queue(tmp_path, visibility_timeout=60, max_attempts=2)
+    batch_id = queue.enqueue_batch(STUDENTS[:1])
+    task = queue.lease("w1", batch_id)
+    clock.now += 61
+    assert queue.lease("w2", batch_id)["attempts"] == 2
+    clock.now += 61
+    assert queue.lease("w3", batch_id) is None
+
+    row = _status(queue, task["task_id"])
+    assert row["status"] == TASK_DEAD
+    assert "final attempt (2/2)" in row["error"]
+    status = queue.batch_status(batch_id)
+    assert status["finished"] and status["counts"][TASK_DEAD] == 1
+    assert queue.batch_results(batch_id)[0]["error"] == row["error"]
+
+
+def test_fail_retries_after_backoff_then_goes_dead(tmp_path, clock):
+    queue = _queue(tmp_path, max_attempts=2, retry_backoff=10)
+    batch_id = queue.enqueue_batch(STUDENTS[:1])
+    task = queue.lease("w1", batch_id)
+    assert queue.fail(task["task_id"], "w1", "boom") == TASK_PENDING
+    clock.now += 5
+    assert queue.lease("w1", batch_id) is None
+    clock.now += 6
+    task = queue.lease("w1", batch_id)
+    assert task["attempts"] == 2
+    assert queue.fail(task["task_id"], "w1", "boom again") == TASK_DEAD
+    assert queue.fail(task["task_id"], "w1", "boom again") == "lost"
+    assert queue.remaining(batch_id) == 0
+
+
+def test_defer_refunds_the_attempt(tmp_path, clock):
+    queue = _queue(tmp_path, max_attempts=1)
+    batch_id = queue.enqueue_batch(STUDENTS[:1])
+    task = queue.lease("w1", batch_id)
+    assert not queue.defer(task["task_id"], "w2", 30, "circuit open")
+    assert queue.defer(task["task_id"], "w1", 30, "circuit open")
+
+    row = _status(queue, task["task_id"])
+    assert row["status"] == TASK_PENDING
+    assert row["attempts"] == 0
+    clock.now += 20
+    assert queue.lease("w1", batch_id) is None
+    clock.now += 11
+    # Still on its first (and only) attempt, so a failure now is final rather than a lost task
+    task = queue.lease("w1", batch_id)
+    assert task["attempts"] == 1
+    assert queue.fail(task["task_id"], "w1", "boom") == TASK_DEAD
+
+
+def test_batch_results_keep_student_order(tmp_path, clock):
+    queue = _queue(tmp_path)
+    batch_id = queue.enqueue_batch(STUDENTS)
+    tasks = [queue.lease("w1", batch_id) for _ in STUDENTS]
+    for task in reversed(tasks[1:]):
+        queue.complete(task["task_id"], "w1", {"name": task["payload"]["name"], "assessment": {"summary": "ok"}})
+    results = queue.batch_results(batch_id)
+    assert [r["name"] for r in results] == [s["name"] for s in STUDENTS]
+    assert "error" in results[0] and "assessment" not in results[0]
+    assert results[1]["assessment"] == {"summary": "ok"}
+    assert not queue.batch_status(batch_id)["finished"]
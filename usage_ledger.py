@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Token usage and cost ledger
+Every assessment writes one row (model, prompt/output tokens, retries,
+fallback calls, latency, outcome) to a SQLite ledger. Recent averages from
+the ledger, together with the configured rate limits, give pre-flight
+estimates of tokens, cost and wall-clock time for a batch.
+
+Usage:
+    python usage_ledger.py summary [--days 7]
+    python usage_ledger.py estimate students.csv
+"""
+
+import time
+import sqlite3
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+from context_builder import count_tokens
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    model TEXT,
+    outcome TEXT NOT NULL,
+    observation_tokens INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    llm_calls INTEGER NOT NULL DEFAULT 0,
+    retries INTEGER NOT NULL DEFAULT 0,
+    fallback_calls INTEGER NOT NULL DEFAULT 0,
+    latency REAL NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_assessments_ts ON assessments (ts);
+"""
+
+# Used until the ledger has history: prompt overhead besides the observations, output size, call latency
+_DEFAULT_PROMPT_OVERHEAD = 2100
+_DEFAULT_OUTPUT_TOKENS = {"verbose": 900, "compact": 150}
+_DEFAULT_LATENCY = 8.0
+
+
+def new_usage() -> Dict[str, Any]:
+    """Per-assessment usage counters filled in while an assessment runs"""
+    return {"model": None, "prompt_tokens": 0, "output_tokens": 0, "llm_calls": 0, "retries": 0,
+            "fallback_calls": 0, "model_seconds": 0.0, "cost_usd": 0.0}
+
+
+def add_message_usage(usage: Dict[str, Any], message, model: Optional[str] = None, text: Optional[str] = None):
+    """Add one model response's token usage (usage_metadata, or an estimate from its text).
+
+    The call is priced at its own model's rate, so an assessment whose calls
+    went to different models (router fallback, hedging) is costed correctly;
+    ``usage["model"]`` is the model of the last call.
+    """
+    metadata = getattr(message, "usage_metadata", None) or {}
+    prompt_tokens = metadata.get("input_tokens", 0)
+    if metadata.get("output_tokens"):
+        output_tokens = metadata["output_tokens"]
+    else:
+        output_tokens = count_tokens(text) if text else 0
+    usage["llm_calls"] += 1
+    usage["model"] = model or usage["model"]
+    usage["prompt_tokens"] += prompt_tokens
+    usage["output_tokens"] += output_tokens
+    usage["cost_usd"] = usage.get("cost_usd", 0.0) + call_cost(model or usage["model"], prompt_tokens, output_tokens)
+
+
+def _pricing() -> Dict[str, Any]:
+    try:
+        from config import MODEL_PRICING
+        return MODEL_PRICING
+    except ImportError:
+        return {}
+
+
+def call_cost(model: Optional[str], prompt_tokens: int, output_tokens: int) -> float:
+    """USD cost of a call from MODEL_PRICING (per million input/output tokens); 0 for unknown models"""
+    price = _pricing().get(model or "")
+    if not price:
+        return 0.0
+    return (prompt_tokens * price[0] + output_tokens * price[1]) / 1e6
+
+
+class UsageLedger:
+    """SQLite ledger of per-assessment token usage"""
+
+    def __init__(self, db_path: str = "usage_ledger.sqlite3"):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, observations: str, usage: Dict[str, Any], outcome: str, latency: float, source: str = "llm"):
+        """Store one assessment; ``usage`` comes from new_usage(), ``latency`` is time spent in model calls"""
+        self._connect().execute(
+            "INSERT INTO assessments (ts, source, model, outcome, observation_tokens, prompt_tokens, output_tokens, "
+            "llm_calls, retries, fallback_calls, latency, cost_usd) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (time.time(), source, usage.get("model"), outcome, count_tokens(observations or ""),
+             usage["prompt_tokens"], usage["output_tokens"], usage["llm_calls"], usage["retries"],
+             usage["fallback_calls"], latency, usage.get("cost_usd", 0.0))
+        )
+
+    def summary(self, since: Optional[float] = None) -> Dict[str, Any]:
+        """Totals since a timestamp (default: last 24 hours)"""
+        since = time.time() - 86400 if since is None else since
+        row = self._connect().execute(
+            "SELECT COUNT(*) AS assessments, SUM(source = 'llm') AS llm_assessments, "
+            "COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens, COALESCE(SUM(output_tokens), 0) AS output_tokens, "
+            "COALESCE(SUM(llm_calls), 0) AS llm_calls, COALESCE(SUM(retries), 0) AS retries, "
+            "COALESCE(SUM(fallback_calls), 0) AS fallback_calls, COALESCE(SUM(cost_usd), 0) AS cost_usd, "
+            "SUM(outcome = 'error') AS errors FROM assessments WHERE ts >= ?",
+            (since,)
+        ).fetchone()
+        summary = {k: (row[k] or 0) for k in row.keys()}
+        summary["by_model"] = {
+            r["model"]: {"assessments": r["n"], "prompt_tokens": r["p"], "output_tokens": r["o"], "cost_usd": r["c"]}
+            for r in self._connect().execute(
+                "SELECT model, COUNT(*) AS n, SUM(prompt_tokens) AS p, SUM(output_tokens) AS o, SUM(cost_usd) AS c "
+                "FROM assessments WHERE ts >= ? AND source = 'llm' AND model IS NOT NULL GROUP BY model", (since,)
+            )
+        }
+        return summary
+
+    def recent_averages(self, window: int = 200) -> Optional[Dict[str, float]]:
+        """Per-assessment averages over the last ``window`` assessments, or None without history"""
+        rows = self._connect().execute(
+            "SELECT * FROM assessments ORDER BY id DESC LIMIT ?", (window,)
+        ).fetchall()
+        llm = [r for r in rows if r["source"] == "llm" and r["llm_calls"] > 0]
+        if not llm:
+            return None
+        n = len(llm)
+        # Share of answered students the local tier handled; errors and deferrals answered nobody
+        answered = [r for r in rows if r["outcome"] not in ("error", "deferred")]
+        local = sum(1 for r in answered if r["source"] != "llm")
+        return {
+            "samples": n,
+            "local_share": local / len(answered) if answered else 0.0,
+            "prompt_overhead": max(0.0, sum(r["prompt_tokens"] / r["llm_calls"] - r["observation_tokens"] for r in llm) / n),
+            "output_tokens": sum(r["output_tokens"] for r in llm) / n,
+            "llm_calls": sum(r["llm_calls"] for r in llm) / n,
+            "retries": sum(r["retries"] for r in llm) / n,
+            "latency": sum(r["latency"] for r in llm) / n,
+            "model": llm[0]["model"],
+        }
+
+
+def estimate_batch(observations_list: List[str], ledger: Optional[UsageLedger] = None,
+                   model: Optional[str] = None) -> Dict[str, Any]:
+    """Pre-flight estimate of tokens, cost and wall-clock time for assessing a batch.
+
+    Averages come from the ledger's recent history (defaults until there is
+    some); time assumes the students of one batch run one after another,
+    each call paced by the rate limiter.
+    """
+    try:
+        from config import (USAGE_ESTIMATE_WINDOW, MAX_REQUESTS_PER_MINUTE, MAX_REQUESTS_PER_DAY,
+                            RATE_LIMIT_DELAY, GEMINI_MODEL, USE_COMPACT_RESPONSE_FORMAT)
+    except ImportError:
+        USAGE_ESTIMATE_WINDOW, MAX_REQUESTS_PER_MINUTE, MAX_REQUESTS_PER_DAY = 200, 10, 500
+        RATE_LIMIT_DELAY, GEMINI_MODEL, USE_COMPACT_RESPONSE_FORMAT = 3.0, "gemini-1.5-flash", False
+    ledger = ledger if ledger is not None else get_usage_ledger()
+    averages = ledger.recent_averages(USAGE_ESTIMATE_WINDOW) if ledger is not None else None
+
+    observations_list = [str(o) for o in observations_list if isinstance(o, str) and o.strip()]
+    if averages is not None:
+        basis = f"last {averages['samples']} Gemini assessments"
+        overhead, output, calls = averages["prompt_overhead"], averages["output_tokens"], averages["llm_calls"]
+        latency, llm_share = averages["latency"], 1 - averages["local_share"]
+        model = model or averages["model"]
+    else:
+        basis = "defaults (no usage history yet)"
+        overhead = _DEFAULT_PROMPT_OVERHEAD
+        output = _DEFAULT_OUTPUT_TOKENS["compact" if USE_COMPACT_RESPONSE_FORMAT else "verbose"]
+        calls, latency, llm_share = 1.0, _DEFAULT_LATENCY, 1.0
+        model = model or GEMINI_MODEL
+
+    students = len(observations_list)
+    llm_students = students * llm_share
+    prompt_tokens = llm_share * calls * sum(overhead + count_tokens(o) for o in observations_list)
+    output_tokens = llm_students * output
+    total_calls = llm_students * calls
+    try:
+        from rate_limiter import get_rate_limiter
+        status = get_rate_limiter().get_status()
+    except Exception:
+        status = {}
+    # A key pool reports its limits summed over the healthy keys
+    keys = max(1, sum(1 for k in status.get("keys", []) if k["healthy"]))
+    per_minute = status.get("max_per_minute", MAX_REQUESTS_PER_MINUTE)
+    # Each call takes its latency, but never less than the limiter's spacing
+    per_call = max(latency / max(calls, 1.0), RATE_LIMIT_DELAY / keys, 60.0 / max(1, per_minute))
+    remaining_today = max(0, status.get("max_per_day", MAX_REQUESTS_PER_DAY) - status.get("daily_requests", 0))
+    return {
+        "students": students,
+        "basis": basis,
+        "model": model,
+        "llm_calls": round(total_calls),
+        "prompt_tokens": int(prompt_tokens),
+        "output_tokens": int(output_tokens),
+        "cost_usd": call_cost(model, prompt_tokens, output_tokens),
+        "seconds": total_calls * per_call,
+        "daily_quota_remaining": remaining_today,
+        "exceeds_daily_quota": total_calls > remaining_today,
+    }
+
+
+# Global usage ledger
+_usage_ledger = None
+_usage_ledger_lock = threading.Lock()
+
+def get_usage_ledger() -> Optional[UsageLedger]:
+    """Get the global usage ledger (None when USAGE_LEDGER_PATH is empty)"""
+    global _usage_ledger
+    with _usage_ledger_lock:
+        if _usage_ledger is None:
+            try:
+                from config import USAGE_LEDGER_PATH
+            except ImportError:
+                USAGE_LEDGER_PATH = "usage_ledger.sqlite3"
+            if USAGE_LEDGER_PATH:
+                _usage_ledger = UsageLedger(USAGE_LEDGER_PATH)
+    return _usage_ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token usage ledger and batch estimates")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_summary = sub.add_parser("summary", help="Usage totals")
+    p_summary.add_argument("--days", type=float, default=1.0)
+    p_estimate = sub.add_parser("estimate", help="Pre-flight estimate for a CSV with an Observations column")
+    p_estimate.add_argument("csv_path")
+    args = parser.parse_args()
+
+    ledger = get_usage_ledger()
+    if args.command == "summary":
+        s = ledger.summary(time.time() - args.days * 86400)
+        print(f"Last {args.days:g} day(s): {s['assessments']} assessments ({s['llm_assessments']} via Gemini, {s['errors']} errors)")
+        print(f"Calls: {s['llm_calls']} ({s['retries']} retries, {s['fallback_calls']} fallback calls)")
+        print(f"Tokens: {s['prompt_tokens']:,} prompt, {s['output_tokens']:,} output; cost ${s['cost_usd']:.4f}")
+        for model, m in sorted(s["by_model"].items()):
+            print(f"  {model}: {m['assessments']} assessments, {m['prompt_tokens']:,} + {m['output_tokens']:,} tokens, ${m['cost_usd']:.4f}")
+    elif args.command == "estimate":
+        import pandas as pd
+        df = pd.read_csv(args.csv_path)
+        e = estimate_batch(df["Observations"].tolist())
+        print(f"{e['students']} students, based on {e['basis']} ({e['model']})")
+        print(f"~{e['llm_calls']} Gemini calls, {e['prompt_tokens']:,} prompt + {e['output_tokens']:,} output tokens")
+        print(f"~${e['cost_usd']:.4f}, ~{e['seconds'] / 60:.1f} minutes")
+        if e["exceeds_daily_quota"]:
+            print(f"Warning: exceeds the {e['daily_quota_remaining']} requests left in today's quota")
+
+
+if __name__ == "__main__":
+    main()
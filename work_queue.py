@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+SQLite work queue for sharded batch assessment
+A batch is enqueued as one task per student. Any number of worker processes
+(on this machine, or on several machines sharing the database file) lease
+tasks, run assess_student_personality and write results back. A merge step
+produces the usual batch_assessment_* exports.
+
+Usage:
+    python work_queue.py enqueue students.csv [--label LABEL]
+    python work_queue.py work --workers 4 [--api-key-env GOOGLE_API_KEY,GOOGLE_API_KEY_2] [--exit-when-empty]
+    python work_queue.py status [BATCH_ID]
+    python work_queue.py merge BATCH_ID [--force]
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+TASK_PENDING = "pending"
+TASK_LEASED = "leased"
+TASK_DONE = "done"
+TASK_DEAD = "dead"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    label TEXT,
+    total INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    merged_at REAL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (batch_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks (status, available_at, lease_expires);
+"""
+
+
+def _queue_settings() -> Dict[str, Any]:
+    try:
+        from config import (WORK_QUEUE_PATH, WORK_QUEUE_VISIBILITY_TIMEOUT, WORK_QUEUE_MAX_ATTEMPTS,
+                            WORK_QUEUE_RETRY_BACKOFF, WORK_QUEUE_JOURNAL_MODE)
+        return {
+            "path": WORK_QUEUE_PATH,
+            "visibility_timeout": WORK_QUEUE_VISIBILITY_TIMEOUT,
+            "max_attempts": WORK_QUEUE_MAX_ATTEMPTS,
+            "retry_backoff": WORK_QUEUE_RETRY_BACKOFF,
+            "journal_mode": WORK_QUEUE_JOURNAL_MODE,
+        }
+    except ImportError:
+        return {
+            "path": "work_queue.sqlite3",
+            "visibility_timeout": 300,
+            "max_attempts": 3,
+            "retry_backoff": 30,
+            "journal_mode": "WAL",
+        }
+
+
+class WorkQueue:
+    """Lease-based task queue stored in a single SQLite file"""
+
+    def __init__(self, db_path: Optional[str] = None, visibility_timeout: Optional[float] = None,
+                 max_attempts: Optional[int] = None, retry_backoff: Optional[float] = None,
+                 journal_mode: Optional[str] = None):
+        settings = _queue_settings()
+        self.db_path = db_path or settings["path"]
+        self.visibility_timeout = visibility_timeout if visibility_timeout is not None else settings["visibility_timeout"]
+        self.max_attempts = max_attempts if max_attempts is not None else settings["max_attempts"]
+        self.retry_backoff = retry_backoff if retry_backoff is not None else settings["retry_backoff"]
+        self.journal_mode = journal_mode or settings["journal_mode"]
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; autocommit mode with explicit transactions"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            # WAL is fastest on one machine; use DELETE when the file sits on a network share
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def enqueue_batch(self, students: List[Dict[str, Any]], label: Optional[str] = None) -> str:
+        """Add one task per student and return the new batch ID"""
+        batch_id = datetime.now().strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:6]
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO batches (batch_id, label, total, created_at) VALUES (?, ?, ?, ?)",
+                (batch_id, label or f"{len(students)} students", len(students), now)
+            )
+            conn.executemany(
+                "INSERT INTO tasks (batch_id, position, payload, status, available_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(batch_id, i, json.dumps(student, ensure_ascii=False), TASK_PENDING, now, now) for i, student in enumerate(students)]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return batch_id
+
+    def lease(self, worker_id: str, batch_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Claim the next available task (pending, or leased with an expired lease)"""
+        conn = self._connect()
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                query = (
+                    "SELECT * FROM tasks WHERE ((status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?))"
+                    + (" AND batch_id = ?" if batch_id else "")
+                    + " ORDER BY task_id LIMIT 1"
+                )
+                params = [TASK_PENDING, now, TASK_LEASED, now] + ([batch_id] if batch_id else [])
+                row = conn.execute(query, params).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                if row["status"] == TASK_LEASED and row["attempts"] >= self.max_attempts:
+                    # The previous worker died or stalled on its final attempt
+                    conn.execute(
+                        "UPDATE tasks SET status = ?, lease_owner = NULL, lease_expires = NULL, error = ?, updated_at = ? WHERE task_id = ?",
+                        (TASK_DEAD, f"Lease expired on final attempt ({row['attempts']}/{self.max_attempts})", now, row["task_id"])
+                    )
+                    conn.execute("COMMIT")
+                    continue
+                conn.execute(
+                    "UPDATE tasks SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE task_id = ?",
+                    (TASK_LEASED, worker_id, now + self.visibility_timeout, now, row["task_id"])
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            task = dict(row)
+            task["attempts"] += 1
+            task["payload"] = json.loads(task["payload"])
+            return task
+
+    def heartbeat(self, task_id: int, worker_id: str) -> bool:
+        """Extend a lease that is still owned by this worker"""
+        cur = self._connect().execute(
+            "UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE task_id = ? AND status = ? AND lease_owner = ?",
+            (time.time() + self.visibility_timeout, time.time(), task_id, TASK_LEASED, worker_id)
+        )
+        return cur.rowcount == 1
+
+    def complete(self, task_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Store a result; ignored if the lease was lost to another worker"""
+        cur = self._connect().execute(
+            "UPDATE tasks SET status = ?, result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE task_id = ? AND status = ? AND lease_owner = ?",
+            (TASK_DONE, json.dumps(result, ensure_ascii=False), time.time(), task_id, TASK_LEASED, worker_id)
+        )
+        return cur.rowcount == 1
+
+    def defer(self, task_id: int, worker_id: str, delay: float, error: str) -> bool:
+        """Put a task back without using up an attempt (Gemini was unavailable, not the task at fault)"""
+        now = time.time()
+        cur = self._connect().execute(
+            "UPDATE tasks SET status = ?, error = ?, available_at = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+            "lease_expires = NULL, updated_at = ? WHERE task_id = ? AND status = ? AND lease_owner = ?",
+            (TASK_PENDING, error, now + delay, now, task_id, TASK_LEASED, worker_id)
+        )
+        return cur.rowcount == 1
+
+    def fail(self, task_id: int, worker_id: str, error: str, result: Optional[Dict[str, Any]] = None) -> str:
+        """Release a failed task for retry, or mark it dead once attempts are exhausted"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT attempts FROM tasks WHERE task_id = ? AND status = ? AND lease_owner = ?",
+                (task_id, TASK_LEASED, worker_id)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return "lost"
+            now = time.time()
+            status = TASK_DEAD if row["attempts"] >= self.max_attempts else TASK_PENDING
+            conn.execute(
+                "UPDATE tasks SET status = ?, error = ?, result = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE task_id = ?",
+                (status, error, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 now + self.retry_backoff * row["attempts"], now, task_id)
+            )
+            conn.execute("COMMIT")
+            return status
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def batch_status(self, batch_id: str) -> Dict[str, Any]:
+        """Task counts per status for one batch"""
+        conn = self._connect()
+        batch = conn.execute("SELECT * FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        if batch is None:
+            raise KeyError(f"Unknown batch: {batch_id}")
+        counts = {TASK_PENDING: 0, TASK_LEASED: 0, TASK_DONE: 0, TASK_DEAD: 0}
+        for row in conn.execute("SELECT status, COUNT(*) AS n FROM tasks WHERE batch_id = ? GROUP BY status", (batch_id,)):
+            counts[row["status"]] = row["n"]
+        return {
+            "batch_id": batch_id,
+            "label": batch["label"],
+            "total": batch["total"],
+            "counts": counts,
+            "finished": counts[TASK_DONE] + counts[TASK_DEAD] == batch["total"],
+            "merged_at": batch["merged_at"],
+        }
+
+    def remaining(self, batch_id: Optional[str] = None) -> int:
+        """Tasks that are still pending (including retries waiting on backoff) or leased"""
+        query = "SELECT COUNT(*) FROM tasks WHERE status IN (?, ?)" + (" AND batch_id = ?" if batch_id else "")
+        params = [TASK_PENDING, TASK_LEASED] + ([batch_id] if batch_id else [])
+        return self._connect().execute(query, params).fetchone()[0]
+
+    def list_batches(self) -> List[str]:
+        return [row["batch_id"] for row in self._connect().execute("SELECT batch_id FROM batches ORDER BY created_at DESC")]
+
+    def batch_results(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Batch result records in original student order (unfinished tasks become error records)"""
+        records = []
+        for row in self._connect().execute("SELECT * FROM tasks WHERE batch_id = ? ORDER BY position", (batch_id,)):
+            if row["result"]:
+                record = json.loads(row["result"])
+            else:
+                student = json.loads(row["payload"])
+                record = {
+                    'student_id': student.get('id') or f"student_{row['position']+1}",
+                    'name': student.get('name', f"Student {row['position']+1}"),
+                    'observations': student.get('observations', ''),
+                }
+            if row["status"] != TASK_DONE:
+                record['error'] = row["error"] or f"Task not finished (status: {row['status']})"
+                record.pop('assessment', None)
+            records.append(record)
+        return records
+
+    def mark_merged(self, batch_id: str):
+        self._connect().execute("UPDATE batches SET merged_at = ? WHERE batch_id = ?", (time.time(), batch_id))
+
+
+def _record_error(record: Dict[str, Any]) -> Optional[str]:
+    """Retryable failure message for a result record, if any"""
+    if record.get('error'):
+        return record['error']
+    assessment = record.get('assessment')
+    if isinstance(assessment, dict) and assessment.get('error'):
+        return assessment['error']
+    return None
+
+
+def run_worker(db_path: Optional[str] = None, worker_id: Optional[str] = None, api_key_env: Optional[str] = None,
+               batch_id: Optional[str] = None, exit_when_empty: bool = False, poll_interval: float = 2.0,
+               system=None):
+    """Lease and assess students until the queue is empty (or forever)"""
+    from job_queue import assess_student_record
+    from priority_scheduler import PRIORITY_BACKGROUND, scheduling
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    if api_key_env:
+        # Each worker can draw on its own API key's quota
+        os.environ["GOOGLE_API_KEY"] = os.environ.get(api_key_env, "")
+    queue = WorkQueue(db_path)
+    if system is None:
+        from personality_assessment import PersonalityAssessmentSystem
+        system = PersonalityAssessmentSystem()
+        system.setup_vector_database()
+    print(f"[{worker_id}] Worker ready (queue: {queue.db_path})")
+
+    processed = 0
+    while True:
+        task = queue.lease(worker_id, batch_id=batch_id)
+        if task is None:
+            if exit_when_empty and queue.remaining(batch_id) == 0:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        # Keep the lease alive while a slow (rate-limited) assessment runs
+        stop = threading.Event()
+
+        def _heartbeat():
+            while not stop.wait(queue.visibility_timeout / 3):
+                if not queue.heartbeat(task["task_id"], worker_id):
+                    break
+
+        beat = threading.Thread(target=_heartbeat, daemon=True)
+        beat.start()
+        try:
+            student = task["payload"]
+            print(f"[{worker_id}] Assessing {student.get('name', '')} (batch {task['batch_id']}, #{task['position']+1}, attempt {task['attempts']})")
+            with scheduling(PRIORITY_BACKGROUND, flow=task["batch_id"]):
+                record = assess_student_record(system, student, task["position"])
+        finally:
+            stop.set()
+            beat.join()
+
+        error = _record_error(record)
+        assessment = record.get('assessment') or {}
+        if assessment.get('deferred'):
+            # Circuit open: wait it out instead of burning attempts
+            delay = max(assessment.get('retry_after') or 0.0, poll_interval)
+            queue.defer(task["task_id"], worker_id, delay, error)
+            print(f"[{worker_id}] Deferred for {delay:.0f}s: Gemini unavailable")
+            continue
+        if error and student.get('observations'):
+            outcome = queue.fail(task["task_id"], worker_id, error, result=record)
+            print(f"[{worker_id}] Failed ({outcome}): {error[:120]}")
+        elif not queue.complete(task["task_id"], worker_id, record):
+            print(f"[{worker_id}] Lease lost for task {task['task_id']}; result discarded")
+        processed += 1
+    print(f"[{worker_id}] Queue empty, processed {processed} tasks")
+    return processed
+
+
+def spawn_workers(n: int, db_path: Optional[str] = None, api_key_envs: Optional[List[str]] = None,
+                  batch_id: Optional[str] = None, exit_when_empty: bool = True) -> List[multiprocessing.Process]:
+    """Start N worker processes, spreading the given API key variables round-robin"""
+    processes = []
+    for i in range(n):
+        api_key_env = api_key_envs[i % len(api_key_envs)] if api_key_envs else None
+        proc = multiprocessing.Process(
+            target=run_worker,
+            kwargs={
+                "db_path": db_path,
+                "worker_id": f"{socket.gethostname()}-w{i+1}",
+                "api_key_env": api_key_env,
+                "batch_id": batch_id,
+                "exit_when_empty": exit_when_empty,
+            },
+            daemon=False
+        )
+        proc.start()
+        processes.append(proc)
+    return processes
+
+
+def merge_batch(batch_id: str, db_path: Optional[str] = None, output_dir: Optional[str] = None,
+                force: bool = False) -> Dict[str, str]:
+    """Write a finished batch to the usual batch_assessment_* export files"""
+    from batch_export import BatchExportSession
+
+    queue = WorkQueue(db_path)
+    status = queue.batch_status(batch_id)
+    if not status["finished"] and not force:
+        raise RuntimeError(f"Batch {batch_id} is not finished: {status['counts']} (use force to merge anyway)")
+    # The full batch ID (timestamp plus random suffix) keeps same-second batches from overwriting each other
+    with BatchExportSession(batch_id, output_dir=output_dir) as export_session:
+        for record in queue.batch_results(batch_id):
+            export_session.write(record)
+    queue.mark_merged(batch_id)
+    return export_session.paths
+
+
+def main():
+    """Command line entry point for the work queue"""
+    parser = argparse.ArgumentParser(description="SQLite work queue for sharded batch assessment")
+    parser.add_argument("--db", default=None, help="Queue database file (default: WORK_QUEUE_PATH)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_enqueue = sub.add_parser("enqueue", help="Enqueue a CSV with Name, Observations columns")
+    p_enqueue.add_argument("csv_path")
+    p_enqueue.add_argument("--label", default=None)
+
+    p_work = sub.add_parser("work", help="Run worker processes")
+    p_work.add_argument("--workers", type=int, default=1)
+    p_work.add_argument("--api-key-env", default="", help="Comma-separated env vars holding API keys, assigned round-robin")
+    p_work.add_argument("--batch", default=None, help="Only work on this batch")
+    p_work.add_argument("--exit-when-empty", action="store_true")
+
+    p_status = sub.add_parser("status", help="Show batch progress")
+    p_status.add_argument("batch_id", nargs="?")
+
+    p_merge = sub.add_parser("merge", help="Write batch_assessment_* files for a finished batch")
+    p_merge.add_argument("batch_id")
+    p_merge.add_argument("--force", action="store_true", help="Merge even if tasks are unfinished")
+
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        import pandas as pd
+        df = pd.read_csv(args.csv_path)
+        students = [
+            {'id': f"student_{idx+1}", 'name': row['Name'], 'observations': row.get('Observations', '')}
+            for idx, row in df.iterrows()
+        ]
+        batch_id = WorkQueue(args.db).enqueue_batch(students, label=args.label)
+        print(f"Enqueued {len(students)} students as batch {batch_id}")
+    elif args.command == "work":
+        api_key_envs = [k.strip() for k in args.api_key_env.split(",") if k.strip()]
+        if args.workers <= 1:
+            run_worker(args.db, api_key_env=api_key_envs[0] if api_key_envs else None,
+                       batch_id=args.batch, exit_when_empty=args.exit_when_empty)
+        else:
+            processes = spawn_workers(args.workers, args.db, api_key_envs, args.batch, args.exit_when_empty)
+            for proc in processes:
+                proc.join()
+    elif args.command == "status":
+        queue = WorkQueue(args.db)
+        for batch_id in ([args.batch_id] if args.batch_id else queue.list_batches()):
+            status = queue.batch_status(batch_id)
+            print(f"{batch_id}  {status['label']}  {status['counts']}  {'finished' if status['finished'] else 'in progress'}")
+    elif args.command == "merge":
+        paths = merge_batch(args.batch_id, args.db, force=args.force)
+        for fmt, path in paths.items():
+            print(f"{fmt}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Synthetic observation workload generator
+Builds student observation corpora from the reference-sheet phrases in
+CSVReferenceProcessor for scale testing (10k-1M students). Rows are written
+one at a time in the batch upload format (Name, Observations), so memory
+stays flat however many students are generated.
+
+Usage:
+    python workload_generator.py --students 10000 --out synthetic_10k.csv
+    python workload_generator.py --students 1000000 --format jsonl --out synthetic_1m.jsonl
+    python workload_generator.py --students 500 --lengths lognormal --mean-sentences 4 \\
+        --duplicate-rate 0.3 --name-format first_last --with-labels --out sample.csv
+"""
+
+import csv
+import json
+import math
+import random
+import argparse
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from csv_reference_processor import CSVReferenceProcessor
+from label_normalizer import INVALID_ID, get_label_normalizer
+
+LENGTH_DISTRIBUTIONS = ("poisson", "lognormal", "uniform", "fixed")
+NAME_FORMATS = ("full", "first_last", "first", "id")
+
+FIRST_NAMES = [
+    "Mangesh", "Swaraj", "Balaji", "Shlok", "Shravni", "Anvita", "Sangharsh", "Samarth", "Pooja", "Rutuja",
+    "Omkar", "Sakshi", "Vaishnavi", "Pranav", "Aarti", "Siddhi", "Ganesh", "Priti", "Rohit", "Snehal",
+    "Aditya", "Komal", "Prathamesh", "Shraddha", "Vishal", "Tejaswini", "Akash", "Gauri", "Sanket", "Nikita",
+]
+FATHER_NAMES = [
+    "Pandurang", "Umesh", "Shivaji", "Balaji", "Maruti", "Sandip", "Jaypal", "Anil", "Dattatray", "Sunil",
+    "Vitthal", "Ramesh", "Dnyaneshwar", "Ashok", "Prakash", "Santosh", "Bhagwan", "Rajendra", "Vilas", "Kailas",
+]
+SURNAMES = [
+    "Parit", "Chauhan", "Palnate", "Pethkar", "Honraw", "Bawkar", "Sonkamble", "Dhule", "Jadhav", "Pawar",
+    "Shinde", "Kamble", "Gaikwad", "More", "Kale", "Deshmukh", "Patil", "Mane", "Salunkhe", "Waghmare",
+]
+# How sentences are joined in the real observer notes (often without a space)
+SENTENCE_JOINS = [". ", ".", ". ", " ", ".\n", ", "]
+
+
+class WorkloadGenerator:
+    """Stream synthetic (name, observations, labels) rows built from reference phrases.
+
+    Each student gets a number of sentences drawn from ``lengths`` (mean
+    ``mean_sentences``), each sentence a reference descriptor of a distinct
+    quality. ``duplicate_rate`` repeats an earlier student's observations
+    verbatim, and the noise rates add the quirks of the real uploads: padded
+    names and notes, lower-cased sentences, adjacent-letter typos and blank
+    observations.
+    """
+
+    def __init__(self, phrases: List[Tuple[str, str, str]], seed: Optional[int] = None,
+                 lengths: str = "poisson", mean_sentences: float = 3.0, max_sentences: int = 8,
+                 duplicate_rate: float = 0.1, name_format: str = "full", whitespace_rate: float = 0.3,
+                 typo_rate: float = 0.02, lowercase_rate: float = 0.2, empty_rate: float = 0.0,
+                 duplicate_pool: int = 10000):
+        if not phrases:
+            raise ValueError("No reference phrases to generate observations from")
+        if lengths not in LENGTH_DISTRIBUTIONS:
+            raise ValueError(f"Unknown length distribution {lengths!r}; expected one of {', '.join(LENGTH_DISTRIBUTIONS)}")
+        if name_format not in NAME_FORMATS:
+            raise ValueError(f"Unknown name format {name_format!r}; expected one of {', '.join(NAME_FORMATS)}")
+        self.phrases = phrases
+        self.rng = random.Random(seed)
+        self.lengths = lengths
+        self.mean_sentences = mean_sentences
+        self.max_sentences = max_sentences
+        self.duplicate_rate = duplicate_rate
+        self.name_format = name_format
+        self.whitespace_rate = whitespace_rate
+        self.typo_rate = typo_rate
+        self.lowercase_rate = lowercase_rate
+        self.empty_rate = empty_rate
+        self.duplicate_pool = duplicate_pool
+        self._previous: List[Tuple[str, List[str]]] = []
+
+    @classmethod
+    def from_reference_sheet(cls, reference_processor: Optional[CSVReferenceProcessor] = None, **kwargs) -> "WorkloadGenerator":
+        """Generator over every (label, quality, phrase) of the reference sheet"""
+        processor = reference_processor or CSVReferenceProcessor()
+        normalizer = get_label_normalizer()
+        phrases = []
+        for quality, levels in processor.load_reference_data().items():
+            q_id = normalizer.quality_id(quality)
+            for level_name, texts in levels.items():
+                l_id = normalizer.level_id(level_name)
+                if q_id == INVALID_ID or l_id == INVALID_ID:
+                    continue
+                label = normalizer.label(q_id, l_id)
+                phrases.extend((label, quality, t.strip().rstrip(".")) for t in texts if t.strip())
+        return cls(phrases, **kwargs)
+
+    def _sentence_count(self) -> int:
+        mean = self.mean_sentences
+        if self.lengths == "fixed":
+            n = round(mean)
+        elif self.lengths == "uniform":
+            n = self.rng.randint(1, max(1, round(2 * mean - 1)))
+        elif self.lengths == "lognormal":
+            n = round(self.rng.lognormvariate(math.log(max(mean, 1.0)) - 0.18, 0.6))
+        else:
+            # Knuth's method; fine for the small means used here
+            limit, n, p = math.exp(-mean), 0, 1.0
+            while True:
+                p *= self.rng.random()
+                if p <= limit:
+                    break
+                n += 1
+        return max(1, min(self.max_sentences, n))
+
+    def _name(self, index: int) -> str:
+        if self.name_format == "id":
+            return f"Student {index + 1:07d}"
+        first, surname = self.rng.choice(FIRST_NAMES), self.rng.choice(SURNAMES)
+        if self.name_format == "first":
+            return first
+        if self.name_format == "first_last":
+            return f"{first} {surname}"
+        return f"{first} {self.rng.choice(FATHER_NAMES)} {surname}"
+
+    def _typo(self, text: str) -> str:
+        if len(text) < 4:
+            return text
+        i = self.rng.randrange(len(text) - 1)
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+    def _pad(self, text: str) -> str:
+        if self.rng.random() >= self.whitespace_rate:
+            return text
+        return " " * self.rng.randint(0, 2) + text + " " * self.rng.randint(1, 2)
+
+    def _observations(self) -> Tuple[str, List[str]]:
+        count = self._sentence_count()
+        chosen, seen = [], set()
+        for _ in range(count * 3):
+            label, quality, phrase = self.rng.choice(self.phrases)
+            if quality not in seen:
+                seen.add(quality)
+                chosen.append((label, phrase))
+            if len(chosen) == count:
+                break
+        sentences = []
+        for _, phrase in chosen:
+            if self.rng.random() < self.lowercase_rate:
+                phrase = phrase[:1].lower() + phrase[1:]
+            if self.rng.random() < self.typo_rate * len(phrase.split()):
+                phrase = self._typo(phrase)
+            sentences.append(phrase)
+        text = sentences[0]
+        for sentence in sentences[1:]:
+            text += self.rng.choice(SENTENCE_JOINS) + sentence
+        return text + ".", [label for label, _ in chosen]
+
+    def rows(self, count: int) -> Iterator[Dict[str, object]]:
+        """Yield ``count`` rows: {"Name", "Observations", "labels"}"""
+        for index in range(count):
+            name = self._pad(self._name(index))
+            if self.rng.random() < self.empty_rate:
+                yield {"Name": name, "Observations": "", "labels": []}
+                continue
+            if self._previous and self.rng.random() < self.duplicate_rate:
+                observations, labels = self.rng.choice(self._previous)
+            else:
+                observations, labels = self._observations()
+                if len(self._previous) < self.duplicate_pool:
+                    self._previous.append((observations, labels))
+                else:
+                    self._previous[self.rng.randrange(self.duplicate_pool)] = (observations, labels)
+            yield {"Name": name, "Observations": self._pad(observations), "labels": labels}
+
+
+def write_workload(generator: WorkloadGenerator, count: int, path: str, fmt: str = "csv",
+                   with_labels: bool = False) -> int:
+    """Write ``count`` generated students to CSV or JSONL in the batch upload format"""
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = None
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(["Name", "Observations"] + (["Generated Labels"] if with_labels else []))
+        for row in generator.rows(count):
+            if writer is not None:
+                writer.writerow([row["Name"], row["Observations"]] + ([json.dumps(row["labels"])] if with_labels else []))
+            else:
+                record = {"Name": row["Name"], "Observations": row["Observations"]}
+                if with_labels:
+                    record["Generated Labels"] = row["labels"]
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            written += 1
+            if written % 100000 == 0:
+                print(f"  {written:,} students written")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic student observations for scale testing")
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--out", default=None, help="Output file (default synthetic_<students>.<format>)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--lengths", choices=LENGTH_DISTRIBUTIONS, default="poisson",
+                        help="Distribution of sentences per student")
+    parser.add_argument("--mean-sentences", type=float, default=3.0)
+    parser.add_argument("--max-sentences", type=int, default=8)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1, help="Share of students reusing earlier observations")
+    parser.add_argument("--name-format", choices=NAME_FORMATS, default="full")
+    parser.add_argument("--whitespace-rate", type=float, default=0.3, help="Share of fields padded with spaces")
+    parser.add_argument("--typo-rate", type=float, default=0.02, help="Chance per word of a swapped-letter typo")
+    parser.add_argument("--lowercase-rate", type=float, default=0.2)
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="Share of students with blank observations")
+    parser.add_argument("--with-labels", action="store_true",
+                        help="Add the quality-level labels of the phrases used (ground truth for evaluation)")
+    args = parser.parse_args()
+
+    generator = WorkloadGenerator.from_reference_sheet(
+        seed=args.seed,
+        lengths=args.lengths,
+        mean_sentences=args.mean_sentences,
+        max_sentences=args.max_sentences,
+        duplicate_rate=args.duplicate_rate,
+        name_format=args.name_format,
+        whitespace_rate=args.whitespace_rate,
+        typo_rate=args.typo_rate,
+        lowercase_rate=args.lowercase_rate,
+        empty_rate=args.empty_rate,
+    )
+    out = args.out or f"synthetic_{args.students}.{args.format}"
+    print(f"Generating {args.students:,} students from {len(generator.phrases)} reference phrases...")
+    written = write_workload(generator, args.students, out, args.format, args.with_labels)
+    print(f"Wrote {written:,} students to {out}")
+
+
+if __name__ == "__main__":
+    main()